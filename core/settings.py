@@ -82,6 +82,72 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 USER_DATA_ROOT = os.path.join(MEDIA_ROOT, "user_data")
 
+# ---------------- PHARMAL-NET ----------------
+# Private working area for jobs/caches (kept out of MEDIA_ROOT, which is publicly served)
+PHARMALNET_WORK_ROOT = os.environ.get("PHARMALNET_WORK_ROOT", str(BASE_DIR / "pharmalnet_work"))
+# Training processes per web worker
+PHARMALNET_JOB_WORKERS = int(os.environ.get("PHARMALNET_JOB_WORKERS", "2"))
+# Per-job memory budget (RSS growth) for training jobs and predictions; 0 disables
+PHARMALNET_JOB_MEMORY_MB = int(os.environ.get("PHARMALNET_JOB_MEMORY_MB", "4096"))
+# Enforce that budget on prediction requests as well. RSS is sampled per process, so switch this
+# off (0) under threaded / async web workers, where concurrent requests would count against each other
+PHARMALNET_PREDICT_MEMORY_BUDGET = os.environ.get("PHARMALNET_PREDICT_MEMORY_BUDGET", "1") == "1"
+# Runs of a job whose worker process dies before it gives up (e.g. killed by the OOM killer)
+PHARMALNET_JOB_MAX_ATTEMPTS = int(os.environ.get("PHARMALNET_JOB_MAX_ATTEMPTS", "3"))
+# Default prediction backend: eager | torchscript | quantized
+PHARMALNET_INFERENCE_BACKEND = os.environ.get("PHARMALNET_INFERENCE_BACKEND", "eager")
+# Loaded models kept in memory per web worker (LRU over registered model ids)
+PHARMALNET_MODEL_CACHE_SIZE = int(os.environ.get("PHARMALNET_MODEL_CACHE_SIZE", "4"))
+# Rows encoded + predicted per chunk when streaming CSV / NDJSON prediction output
+PHARMALNET_PREDICT_CHUNK_ROWS = int(os.environ.get("PHARMALNET_PREDICT_CHUNK_ROWS", "5000"))
+# Single-pair predictions: max pairs per micro-batch and max time the first one waits for company
+PHARMALNET_MICROBATCH_MAX_SIZE = int(os.environ.get("PHARMALNET_MICROBATCH_MAX_SIZE", "64"))
+PHARMALNET_MICROBATCH_MAX_WAIT_MS = int(os.environ.get("PHARMALNET_MICROBATCH_MAX_WAIT_MS", "5"))
+# Torch threads per web worker for predictions (cores shared between WEB_CONCURRENCY workers)
+PHARMALNET_INFERENCE_THREADS = int(os.environ.get(
+    "PHARMALNET_INFERENCE_THREADS",
+    str(max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", "1"))))
+))
+# Predictions whose drug has no training compound at least this Tanimoto-similar are flagged out of domain
+PHARMALNET_AD_THRESHOLD = float(os.environ.get("PHARMALNET_AD_THRESHOLD", "0.35"))
+# Stop training after this many epochs without val-loss improvement (0 disables)
+PHARMALNET_EARLY_STOPPING_PATIENCE = int(os.environ.get("PHARMALNET_EARLY_STOPPING_PATIENCE", "3"))
+# Longest a job event stream stays open before the client reconnects (keep under the web worker timeout)
+PHARMALNET_SSE_MAX_SECONDS = int(os.environ.get("PHARMALNET_SSE_MAX_SECONDS", "20"))
+# Evaluation plots of more test points than this are drawn as a hexbin density instead of a scatter
+PHARMALNET_PLOT_DENSITY_THRESHOLD = int(os.environ.get("PHARMALNET_PLOT_DENSITY_THRESHOLD", "5000"))
+# Save a resumable checkpoint every N epochs
+PHARMALNET_CHECKPOINT_EVERY = int(os.environ.get("PHARMALNET_CHECKPOINT_EVERY", "1"))
+# Parallel trials of a hyperparameter search (defaults to one per core)
+PHARMALNET_SEARCH_WORKERS = int(os.environ.get("PHARMALNET_SEARCH_WORKERS", str(os.cpu_count() or 1)))
+# Size bound of the on-disk Morgan / Conjoint_triad feature cache (LRU eviction past it)
+PHARMALNET_FEATURE_CACHE_MB = int(os.environ.get("PHARMALNET_FEATURE_CACHE_MB", "512"))
+# Processes encoding SMILES / protein sequences in parallel (1 = serial). Per process: every web
+# worker and job process that encodes a large batch starts its own pool of this size, each child
+# loading DeepPurpose/torch, and the job memory budget only sees the parent's RSS
+PHARMALNET_FEATURIZE_WORKERS = int(os.environ.get("PHARMALNET_FEATURIZE_WORKERS", "2"))
+# Idle time after which a process' encoding pool is stopped (it is also stopped after every job)
+PHARMALNET_FEATURIZE_IDLE_SECONDS = int(os.environ.get("PHARMALNET_FEATURIZE_IDLE_SECONDS", "60"))
+# Unique inputs below which encoding stays in-process (pool hand-off isn't worth it)
+PHARMALNET_FEATURIZE_MIN_PARALLEL = int(os.environ.get("PHARMALNET_FEATURIZE_MIN_PARALLEL", "2000"))
+# Chunked uploads: largest (and default) chunk size, and largest file accepted
+PHARMALNET_UPLOAD_CHUNK_MB = int(os.environ.get("PHARMALNET_UPLOAD_CHUNK_MB", "8"))
+PHARMALNET_UPLOAD_MAX_MB = int(os.environ.get("PHARMALNET_UPLOAD_MAX_MB", "10240"))
+# Temp workspaces: size quota per request / job, sweep interval, and age at which a leftover is orphaned
+PHARMALNET_WORKSPACE_QUOTA_MB = int(os.environ.get("PHARMALNET_WORKSPACE_QUOTA_MB", "4096"))
+PHARMALNET_JANITOR_INTERVAL_SECONDS = int(os.environ.get("PHARMALNET_JANITOR_INTERVAL_SECONDS", "600"))
+PHARMALNET_JANITOR_GRACE_SECONDS = int(os.environ.get("PHARMALNET_JANITOR_GRACE_SECONDS", "300"))
+PHARMALNET_WORKSPACE_MAX_AGE_HOURS = int(os.environ.get("PHARMALNET_WORKSPACE_MAX_AGE_HOURS", "48"))
+# How long the janitor keeps finished jobs (status, events, plot) and completed uploads
+PHARMALNET_JOB_RETENTION_HOURS = int(os.environ.get("PHARMALNET_JOB_RETENTION_HOURS", "168"))
+PHARMALNET_UPLOAD_RETENTION_HOURS = int(os.environ.get("PHARMALNET_UPLOAD_RETENTION_HOURS", "168"))
+# Stored prediction results (paging / download) expire this long after the prediction
+PHARMALNET_RESULT_TTL_HOURS = int(os.environ.get("PHARMALNET_RESULT_TTL_HOURS", "72"))
+# Working-memory budget for chunked CSV ingestion during training
+PHARMALNET_INGEST_MEMORY_MB = int(os.environ.get("PHARMALNET_INGEST_MEMORY_MB", "256"))
+# Load the ML stack when the WSGI/ASGI app starts instead of on the first Pharmal-Net request
+PHARMALNET_WARMUP = os.environ.get("PHARMALNET_WARMUP", "0") == "1"
+
 # ---------------- AUTHENTICATION REDIRECTS ----------------
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
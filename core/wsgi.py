@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Optional: load the ML stack now instead of on the first Pharmal-Net request
+from portal.ml.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
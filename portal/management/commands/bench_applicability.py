@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from portal.ml import applicability
+
+
+def random_fingerprints(rng, rows, n_bits=1024, density=0.05):
+    return (rng.random((rows, n_bits)) < density).astype(np.uint8)
+
+
+def brute_force(queries, train):
+    """Reference: dense float matmul Tanimoto."""
+    q, t = queries.astype(np.float64), train.astype(np.float64)
+    common = q @ t.T
+    union = q.sum(axis=1)[:, None] + t.sum(axis=1)[None, :] - common
+    return (common / np.maximum(union, 1)).max(axis=1)
+
+
+class Command(BaseCommand):
+    help = "Time nearest-neighbour Tanimoto search of prediction queries against a training set."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--train", type=int, nargs="+", default=[1000, 5000, 20000])
+        parser.add_argument("--queries", type=int, default=100000)
+        parser.add_argument("--unique", type=int, default=20000, help="Distinct compounds among the queries")
+        parser.add_argument("--threads", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        pool = random_fingerprints(rng, options["unique"])
+        queries = pool[rng.integers(0, len(pool), options["queries"])]
+
+        self.stdout.write(f"{'train':>8} | {'queries':>8} | {'seconds':>8} | {'queries/s':>10}")
+        for n_train in options["train"]:
+            train = random_fingerprints(rng, n_train)
+            index = applicability.TanimotoIndex(applicability.pack(train))
+
+            start = time.perf_counter()
+            similarity = index.nearest(queries, threads=options["threads"])
+            seconds = time.perf_counter() - start
+            self.stdout.write(f"{n_train:>8} | {len(queries):>8} | {seconds:>8.2f} | {len(queries) / seconds:>10,.0f}")
+
+            # Sanity: matches the dense computation on a sample
+            assert np.allclose(similarity[:200], brute_force(queries[:200], train), atol=1e-6)
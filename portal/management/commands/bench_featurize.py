@@ -0,0 +1,71 @@
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from DeepPurpose import utils
+
+from portal.ml.feature_cache import FeatureCache
+from portal.ml.featurize import data_process
+
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+SMILES_FRAGMENTS = ["C", "CC", "O", "N", "c1ccccc1", "C(=O)", "Cl", "F", "CN", "OC"]
+
+
+def synthetic_dataset(rows, n_drugs, n_targets, seed=0):
+    """High-redundancy DTI rows: n_drugs SMILES × n_targets sequences sampled to `rows` pairs."""
+    rng = random.Random(seed)
+    drugs = ["".join(rng.choice(SMILES_FRAGMENTS) for _ in range(rng.randint(4, 12))) for _ in range(n_drugs)]
+    targets = ["".join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(300, 800))) for _ in range(n_targets)]
+    return [rng.choice(drugs) for _ in range(rows)], [rng.choice(targets) for _ in range(rows)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark DeepPurpose's utils.data_process against the dedup-aware featurize.data_process "
+        "(Morgan / Conjoint_triad) on the same high-redundancy frame."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--drugs", type=int, default=2000)
+        parser.add_argument("--targets", type=int, default=30)
+
+    def handle(self, *args, **options):
+        X_drug, X_target = synthetic_dataset(options["rows"], options["drugs"], options["targets"])
+        y = [0.0] * len(X_drug)
+        self.stdout.write(
+            f"📊 {len(X_drug)} rows, {len(set(X_drug))} unique SMILES, {len(set(X_target))} unique targets"
+        )
+
+        # Baseline: DeepPurpose already encodes unique values only and maps them back with a dict
+        start = time.perf_counter()
+        baseline = utils.data_process(
+            X_drug, X_target, y, drug_encoding="Morgan", target_encoding="Conjoint_triad", split_method="no_split"
+        )
+        baseline_s = time.perf_counter() - start
+
+        # Cold cache in a throwaway directory, so the cache doesn't flatter the first run
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = FeatureCache(f"{cache_dir}/features.sqlite3", max_bytes=2 ** 40)
+            timings = []
+            for _ in ("cold", "warm"):
+                start = time.perf_counter()
+                ours = data_process(
+                    X_drug, X_target, y, drug_encoding="Morgan", target_encoding="Conjoint_triad",
+                    split_method="no_split", cache=cache
+                )
+                timings.append(time.perf_counter() - start)
+
+        same = all(
+            (a == b).all()
+            for column in ("drug_encoding", "target_encoding")
+            for a, b in zip(baseline[column], ours[column])
+        )
+        cold_s, warm_s = timings
+        self.stdout.write(
+            f"utils.data_process {baseline_s:8.2f}s | featurize.data_process cold cache {cold_s:8.2f}s "
+            f"({baseline_s / max(cold_s, 1e-9):5.1f}x), warm cache {warm_s:8.2f}s "
+            f"({baseline_s / max(warm_s, 1e-9):5.1f}x) | identical={same}"
+        )
@@ -0,0 +1,53 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from portal.ml.featurize import DRUG_ENCODERS, TARGET_ENCODERS, encode_values
+from .bench_featurize import synthetic_dataset
+
+
+def worker_counts(max_workers):
+    """1, 2, 4, … up to max_workers (always included)."""
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+class Command(BaseCommand):
+    help = "Scaling of parallel Morgan / Conjoint_triad encoding from 1 to N worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drugs", type=int, default=20000, help="Unique SMILES to encode")
+        parser.add_argument("--targets", type=int, default=2000, help="Unique protein sequences to encode")
+        parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        drugs, _ = synthetic_dataset(options["drugs"], options["drugs"], 1)
+        _, targets = synthetic_dataset(options["targets"], 1, options["targets"])
+        columns = [
+            ("Morgan", DRUG_ENCODERS["Morgan"], list(dict.fromkeys(drugs))),
+            ("Conjoint_triad", TARGET_ENCODERS["Conjoint_triad"], list(dict.fromkeys(targets))),
+        ]
+
+        self.stdout.write(f"{'encoding':>15} | {'inputs':>7} | {'workers':>7} | {'seconds':>8} | {'speedup':>7} | identical")
+        for encoding, encoder, values in columns:
+            serial = None
+            for workers in worker_counts(options["max_workers"]):
+                # Warm the pool first: worker start-up is paid once per process, not per request
+                encode_values(encoder, values[:workers], workers=workers, min_parallel=0)
+
+                start = time.perf_counter()
+                encoded = encode_values(encoder, values, workers=workers, min_parallel=0)
+                seconds = time.perf_counter() - start
+
+                if serial is None:
+                    serial, serial_s = encoded, seconds
+                same = all(np.array_equal(a, b) for a, b in zip(serial, encoded))
+                self.stdout.write(
+                    f"{encoding:>15} | {len(values):>7} | {workers:>7} | {seconds:>8.2f}"
+                    f" | {serial_s / max(seconds, 1e-9):>6.1f}x | {same}"
+                )
@@ -0,0 +1,72 @@
+import os
+import time
+import zipfile
+import tempfile
+import statistics
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from DeepPurpose import DTI as models
+
+from portal.ml import inference
+from portal.ml.featurize import data_process
+from .bench_featurize import synthetic_dataset
+
+
+def load_model_zip(zip_path, extract_dir):
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(extract_dir)
+    for root, _, files in os.walk(extract_dir):
+        if any(f.endswith(".pt") for f in files) and any(f.endswith(".pkl") for f in files):
+            return models.model_pretrained(root)
+    raise CommandError(f"No model files (.pt / .pkl) found in {zip_path}")
+
+
+class Command(BaseCommand):
+    help = "Compare latency, throughput and accuracy drift of the inference backends on one model ZIP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model_zip", help="Trained Pharmal-Net model ZIP")
+        parser.add_argument("--rows", type=int, default=5000, help="Rows for the throughput run")
+        parser.add_argument("--latency-runs", type=int, default=50, help="Single-row predictions per backend")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as extract_dir:
+            model = load_model_zip(options["model_zip"], extract_dir)
+
+            X_drug, X_target = synthetic_dataset(options["rows"], n_drugs=options["rows"], n_targets=20)
+            X = data_process(
+                X_drug, X_target, [0] * len(X_drug),
+                drug_encoding=model.drug_encoding,
+                target_encoding=model.target_encoding,
+                split_method="no_split"
+            )
+            single = X.iloc[:1].reset_index(drop=True)
+
+            reference = None
+            self.stdout.write(
+                f"{'backend':>12} | {'p50 latency ms':>14} | {'p95 latency ms':>14} | {'rows/s':>10} | max |Δ| vs eager"
+            )
+            for backend in inference.BACKENDS:
+                inference.predict(model, single, backend=backend)  # build + warm up
+
+                latencies = []
+                for _ in range(options["latency_runs"]):
+                    start = time.perf_counter()
+                    inference.predict(model, single, backend=backend)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                y_pred = np.asarray(inference.predict(model, X, backend=backend))
+                throughput = len(X) / (time.perf_counter() - start)
+
+                if reference is None:
+                    reference = y_pred
+                drift = float(np.max(np.abs(y_pred - reference))) if len(y_pred) else 0.0
+
+                latencies.sort()
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                self.stdout.write(
+                    f"{backend:>12} | {statistics.median(latencies):>14.2f} | {p95:>14.2f} |"
+                    f" {throughput:>10.0f} | {drift:.5f}"
+                )
@@ -0,0 +1,83 @@
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from portal.ml.ingest import load_training_frame
+from .bench_featurize import synthetic_dataset
+
+
+def legacy_clean(file_path, Smiles, Protein, value_name):
+    """The original whole-file read + clean from protein_smiles_uploads, for comparison."""
+    df = pd.read_csv(file_path)
+    df = df.dropna(subset=[Smiles, Protein, value_name]).copy()
+    df["seq_len"] = df[Protein].astype(str).apply(len)
+    df = df[df[value_name].astype(float) > 0].copy()
+    df["normalized"] = np.log10(df[value_name].astype(float))
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    df.dropna(inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def write_dataset(path, rows, extra_columns):
+    """ChEMBL-like export: SMILES, sequence, value and a number of unrelated columns."""
+    X_drug, X_target = synthetic_dataset(rows, n_drugs=max(1, rows // 5), n_targets=50)
+    rng = random.Random(1)
+    data = {
+        "Smiles": X_drug,
+        "seq1": X_target,
+        "Value": [rng.choice([rng.uniform(0.1, 10000), 0, -1]) for _ in range(rows)],
+    }
+    for i in range(extra_columns):
+        data[f"extra_{i}"] = [f"annotation_{rng.randint(0, 10 ** 6)}" for _ in range(rows)]
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+class Command(BaseCommand):
+    help = "Report peak memory of whole-file vs. chunked training CSV ingestion per dataset size."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+        parser.add_argument("--extra-columns", type=int, default=20)
+        parser.add_argument("--budget-mb", type=int, default=64)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>9} | {'file MB':>8} | {'legacy peak MB':>14} | {'chunked peak MB':>15} | rows kept")
+        for rows in options["sizes"]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "dataset.csv")
+                write_dataset(path, rows, options["extra_columns"])
+                file_mb = os.path.getsize(path) / (1024 * 1024)
+
+                legacy, legacy_s, legacy_peak = measure(lambda: legacy_clean(path, "Smiles", "seq1", "Value"))
+                (chunked, _), chunked_s, chunked_peak = measure(
+                    lambda: load_training_frame(path, "Smiles", "seq1", "Value", memory_budget_mb=options["budget_mb"])
+                )
+
+                same = (
+                    len(legacy) == len(chunked)
+                    and np.allclose(legacy["normalized"].to_numpy(), chunked["normalized"].to_numpy())
+                    and (legacy["seq1"].astype(str).to_numpy() == chunked["seq1"].to_numpy()).all()
+                )
+                self.stdout.write(
+                    f"{rows:>9} | {file_mb:>8.1f} | {legacy_peak:>9.1f} ({legacy_s:4.1f}s) |"
+                    f" {chunked_peak:>10.1f} ({chunked_s:4.1f}s) | {len(chunked)} (identical={same})"
+                )
@@ -0,0 +1,70 @@
+import gzip
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from portal.ml import columnar
+from .bench_featurize import synthetic_dataset
+
+
+def legacy_json(df):
+    """The predict API's JSON path: per-cell make_json_safe, preview + full_data, one JSON blob."""
+    def make_json_safe(val):
+        try:
+            if pd.isna(val) or val in [np.inf, -np.inf]:
+                return None
+            if isinstance(val, (np.generic, np.ndarray)):
+                return val.item() if hasattr(val, "item") else str(val)
+            return val
+        except Exception:
+            return str(val)
+
+    safe_full = df.map(make_json_safe).to_dict(orient="records")
+    return json.dumps({"preview": safe_full[:5], "full_data": safe_full}, cls=DjangoJSONEncoder).encode()
+
+
+def predictions_json(y_pred):
+    return json.dumps({"predicted": [float(x) for x in y_pred]}).encode()
+
+
+def timed(fn, runs):
+    best, payload = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        payload = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, payload
+
+
+class Command(BaseCommand):
+    help = "Compare encode time and payload size of JSON vs. columnar float32 prediction responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+        parser.add_argument("--runs", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8} | {'format':>22} | {'encode ms':>10} | {'bytes':>12} | {'gzip bytes':>11}")
+        for rows in options["rows"]:
+            smiles, proteins = synthetic_dataset(rows, n_drugs=max(1, rows // 10), n_targets=20)
+            y_pred = np.random.default_rng(0).normal(6.0, 1.5, rows)
+            df = pd.DataFrame({"Smiles": smiles, "seq1": proteins, "Predicted": y_pred})
+
+            cases = [
+                ("JSON (full rows)", lambda: legacy_json(df)),
+                ("JSON (predictions)", lambda: predictions_json(y_pred)),
+                ("columnar float32", lambda: columnar.encode_columns({"Predicted": y_pred}, {"rows": rows})),
+            ]
+            for name, fn in cases:
+                ms, payload = timed(fn, options["runs"])
+                self.stdout.write(
+                    f"{rows:>8} | {name:>22} | {ms:>10.1f} | {len(payload):>12,} | {len(gzip.compress(payload)):>11,}"
+                )
+
+            # Sanity: the columnar payload round-trips to the float32 predictions
+            _, cols = columnar.decode_columns(columnar.encode_columns({"Predicted": y_pred}))
+            assert np.allclose(cols["Predicted"], y_pred.astype(np.float32), equal_nan=True)
@@ -0,0 +1,82 @@
+import sys
+import json
+import statistics
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+HEAVY_MODULES = ("torch", "DeepPurpose", "sklearn", "matplotlib", "pandas", "rdkit")
+
+# Runs in a fresh interpreter: boot Django + load the URLconf (what a worker does before
+# serving its first page), optionally followed by the Pharmal-Net warm-up.
+CHILD = """
+import os, sys, json, time, resource
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", {settings_module!r})
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot = time.perf_counter() - start
+if {warm}:
+    from portal.ml.warmup import warm_up
+    warm_up()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "boot_seconds": boot,
+    "peak_rss_mb": peak / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(warm, runs):
+    results = []
+    for _ in range(runs):
+        code = CHILD.format(settings_module=settings.SETTINGS_MODULE, warm=warm, heavy=HEAVY_MODULES)
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, cwd=str(settings.BASE_DIR)
+        )
+        if out.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{out.stderr}")
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "ms": statistics.median(r["seconds"] for r in results) * 1000,
+        "rss": statistics.median(r["peak_rss_mb"] for r in results),
+        "heavy": results[-1]["heavy"],
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure worker startup time and RSS, with and without the Pharmal-Net ML stack loaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario (median is reported)")
+        parser.add_argument("--max-startup-ms", type=float, help="Fail if a cold worker boot takes longer")
+        parser.add_argument("--max-rss-mb", type=float, help="Fail if a cold worker boot uses more memory")
+
+    def handle(self, *args, **options):
+        cold = measure(warm=False, runs=options["runs"])
+        warm = measure(warm=True, runs=options["runs"])
+
+        self.stdout.write(f"{'scenario':>22} | {'startup ms':>10} | {'peak RSS MB':>11} | heavy modules loaded")
+        for name, r in (("worker boot (lazy)", cold), ("boot + ML warm-up", warm)):
+            self.stdout.write(
+                f"{name:>22} | {r['ms']:>10.0f} | {r['rss']:>11.1f} | {', '.join(r['heavy']) or '-'}"
+            )
+
+        # ✅ Regression guard: plain pages must not pull in the ML stack
+        problems = []
+        leaked = cold["heavy"]
+        if leaked:
+            problems.append(f"worker boot imports {', '.join(leaked)}")
+        if options["max_startup_ms"] and cold["ms"] > options["max_startup_ms"]:
+            problems.append(f"startup {cold['ms']:.0f} ms > {options['max_startup_ms']:.0f} ms")
+        if options["max_rss_mb"] and cold["rss"] > options["max_rss_mb"]:
+            problems.append(f"RSS {cold['rss']:.1f} MB > {options['max_rss_mb']:.1f} MB")
+        if problems:
+            raise CommandError("Startup regression: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("✅ Worker boot stays free of the ML stack"))
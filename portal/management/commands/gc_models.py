@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from portal.ml import registry
+
+
+class Command(BaseCommand):
+    help = "Delete model artifacts no user manifest refers to (and stale staging leftovers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+        parser.add_argument("--stale-hours", type=float, default=24,
+                            help="Age after which an unfinished registration counts as abandoned")
+
+    def handle(self, *args, **options):
+        report = registry.collect_garbage(dry_run=options["dry_run"], stale_seconds=options["stale_hours"] * 3600)
+        for name in report["removed"]:
+            self.stdout.write(f"  {'would remove' if options['dry_run'] else 'removed'} {name}")
+        self.stdout.write(
+            f"{report['live']} live models, {len(report['removed'])} removed, "
+            f"{report['bytes_reclaimed'] / 1e6:.1f} MB reclaimed"
+        )
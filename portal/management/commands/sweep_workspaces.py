@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from portal.ml import workspace
+
+
+class Command(BaseCommand):
+    help = "Remove orphaned workspaces, expired jobs / uploads and unreferenced blobs now; print workspace disk metrics."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age-hours", type=int, default=None,
+                            help="Age past which a workspace counts as orphaned even if its process is alive")
+
+    def handle(self, *args, **options):
+        report = workspace.sweep(options["max_age_hours"])
+        stats = workspace.stats()
+        self.stdout.write(
+            f"Removed {report['removed']} ({report['bytes_reclaimed'] / 1e6:.1f} MB reclaimed); "
+            f"{stats['active']} workspaces in use, {stats['bytes_in_use'] / 1e6:.1f} MB"
+        )
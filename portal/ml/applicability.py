@@ -0,0 +1,132 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .library import BIT_ENCODINGS
+
+
+# ✅ Training-set fingerprints shipped inside the model ZIP (np.packbits rows, one per unique SMILES)
+TRAIN_FINGERPRINTS = "train_fingerprints.npy"
+
+# Columns added to prediction output
+COLUMNS = ("AD_similarity", "AD_out_of_domain")
+
+# Queries compared per step (keeps the per-word buffers small enough to stay in cache)
+QUERY_BLOCK = 64
+
+
+def save_training_fingerprints(model_dir, train, drug_encoding):
+    """Store the unique training compounds' fingerprints next to the model files."""
+    if drug_encoding not in BIT_ENCODINGS or not len(train):
+        return None
+    unique = train.drop_duplicates("SMILES")
+    fingerprints = np.stack([np.asarray(v) for v in unique["drug_encoding"]])
+    path = os.path.join(model_dir, TRAIN_FINGERPRINTS)
+    np.save(path, pack(fingerprints))
+    print(f"🧭 Saved {len(unique)} training fingerprints for applicability-domain checks")
+    return path
+
+
+def pack(fingerprints):
+    """0/1 fingerprint matrix → rows of uint64 words (bit-packed, zero-padded to 64 bits)."""
+    packed = np.packbits(np.asarray(fingerprints, dtype=np.uint8), axis=1)
+    padded = np.zeros((len(packed), -(-packed.shape[1] // 8) * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+
+def _popcount(words, out=None):
+    if hasattr(np, "bitwise_count"):   # numpy ≥ 2.0: hardware popcount
+        return np.bitwise_count(words, out=out)
+    bits = np.unpackbits(words.view(np.uint8), axis=-1)
+    counts = bits.reshape(*words.shape, 64).sum(axis=-1, dtype=np.uint8)
+    if out is None:
+        return counts
+    out[...] = counts
+    return out
+
+
+class TanimotoIndex:
+    """
+    Nearest-neighbour Tanimoto similarity of query fingerprints to the training set.
+
+    |A ∩ B| is a popcount of AND-ed 64-bit words. The training words are stored
+    transposed (word × compound) and queries go through in small blocks, so every
+    word step is one cache-friendly vectorised AND + popcount into reused buffers.
+    """
+
+    def __init__(self, packed):
+        packed = np.asarray(packed, dtype=np.uint64)
+        self.words = np.ascontiguousarray(packed.T)
+        self.counts = _popcount(packed).sum(axis=1, dtype=np.int32)
+
+    def nearest(self, fingerprints, threads=1):
+        """Max Tanimoto similarity (0..1) of each query row to any training compound."""
+        queries = pack(fingerprints)
+        if not len(queries) or not self.words.shape[1]:
+            return np.zeros(len(queries), dtype=np.float32)
+
+        # Identical query fingerprints are scored once
+        unique, inverse = np.unique(queries, axis=0, return_inverse=True)
+        best = np.zeros(len(unique), dtype=np.float32)
+
+        # numpy releases the GIL inside these ufuncs, so query ranges run in parallel threads
+        parts = max(1, min(threads, len(unique) // QUERY_BLOCK))
+        bounds = np.linspace(0, len(unique), parts + 1).astype(int)
+        if parts == 1:
+            self._nearest_range(unique, best, 0, len(unique))
+        else:
+            with ThreadPoolExecutor(max_workers=parts) as pool:
+                list(pool.map(lambda i: self._nearest_range(unique, best, bounds[i], bounds[i + 1]), range(parts)))
+        return best[inverse.reshape(-1)]
+
+    def _nearest_range(self, unique, best, first, last):
+        n_train = self.words.shape[1]
+        query_counts = _popcount(unique[first:last]).sum(axis=1, dtype=np.int32)
+        both = np.empty((QUERY_BLOCK, n_train), dtype=np.uint64)
+        bits = np.empty((QUERY_BLOCK, n_train), dtype=np.uint8)
+        common = np.empty((QUERY_BLOCK, n_train), dtype=np.int32)
+        union = np.empty((QUERY_BLOCK, n_train), dtype=np.int32)
+        similarity = np.empty((QUERY_BLOCK, n_train), dtype=np.float32)
+
+        for start in range(first, last, QUERY_BLOCK):
+            q = unique[start:min(start + QUERY_BLOCK, last)]
+            n = len(q)
+            common[:n] = 0
+            for w in range(self.words.shape[0]):
+                np.bitwise_and(q[:, w, None], self.words[w][None, :], out=both[:n])
+                np.add(common[:n], _popcount(both[:n], out=bits[:n]), out=common[:n])
+            # Tanimoto = |A ∩ B| / (|A| + |B| - |A ∩ B|); two empty fingerprints count as 0
+            np.add(query_counts[start - first:start - first + n, None], self.counts[None, :], out=union[:n])
+            np.subtract(union[:n], common[:n], out=union[:n])
+            np.maximum(union[:n], 1, out=union[:n])
+            np.divide(common[:n], union[:n], out=similarity[:n])
+            similarity[:n].max(axis=1, out=best[start:start + n])
+
+
+def index_for(model, model_dir):
+    """TanimotoIndex of a model's training set (cached on the loaded model), or None."""
+    if "_applicability" not in model.__dict__:
+        path = os.path.join(model_dir, TRAIN_FINGERPRINTS) if model_dir else None
+        model.__dict__["_applicability"] = (
+            TanimotoIndex(np.load(path)) if path and os.path.exists(path) else None
+        )
+    return model.__dict__["_applicability"]
+
+
+def flag(index, drug_fingerprints, threshold):
+    """(similarity, out_of_domain) arrays for a batch of encoded drugs."""
+    fingerprints = np.stack([np.asarray(v) for v in drug_fingerprints]) if len(drug_fingerprints) else np.zeros((0, 0))
+    similarity = index.nearest(fingerprints, threads=settings.PHARMALNET_INFERENCE_THREADS)
+    return similarity, similarity < threshold
+
+
+def add_columns(df, index, drug_fingerprints, threshold):
+    """Append AD_similarity / AD_out_of_domain columns to a prediction frame."""
+    similarity, out_of_domain = flag(index, drug_fingerprints, threshold)
+    df[COLUMNS[0]] = pd.Series(similarity, index=df.index).round(4)
+    df[COLUMNS[1]] = pd.Series(out_of_domain, index=df.index)
+    return df
@@ -0,0 +1,97 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import inference, applicability
+from .featurize import data_process
+
+
+# ✅ Streamed output formats → content type
+STREAM_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ClosingStream:
+    """
+    Response body that runs `on_close` when it is closed. Django (and any WSGI server)
+    closes the body when the response ends, also when the client left before the first
+    chunk — when a generator's own finally block never runs.
+    """
+
+    def __init__(self, iterable, on_close):
+        self.iterable = iterable
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, "close"):
+                self.iterable.close()
+        finally:
+            self.on_close()
+
+
+def read_header(csv_path):
+    """Column names of a CSV without reading its rows."""
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def predict_chunks(model, csv_path, smiles_col, protein_col, backend="eager", chunk_rows=5000, as_text=False,
+                   domain=None):
+    """
+    Read the CSV `chunk_rows` rows at a time, encode + predict each chunk and yield it
+    with a "Predicted" column. Memory is bounded by the chunk, not the file.
+    With as_text the input columns keep their exact CSV text (empty stays empty).
+    domain=(TanimotoIndex, threshold) adds the applicability-domain columns.
+    """
+    read_options = {"dtype": str, "keep_default_na": False} if as_text else {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, **read_options):
+        X_pred = data_process(
+            X_drug=chunk[smiles_col].astype(str).tolist(),
+            X_target=chunk[protein_col].astype(str).tolist(),
+            y=[0] * len(chunk),
+            drug_encoding=model.drug_encoding,
+            target_encoding=model.target_encoding,
+            split_method="no_split"
+        )
+        y_pred = np.asarray(inference.predict(model, X_pred, backend=backend), dtype=np.float64)
+        # inf is not valid JSON / meaningful CSV → empty like other missing values
+        y_pred[~np.isfinite(y_pred)] = np.nan
+        chunk["Predicted"] = y_pred
+        if domain:
+            index, threshold = domain
+            applicability.add_columns(chunk, index, X_pred["drug_encoding"].tolist(), threshold)
+        yield chunk
+
+
+def stream_predictions(model, csv_path, smiles_col, protein_col, output_format, backend="eager", chunk_rows=5000,
+                       domain=None):
+    """
+    Generator of CSV / NDJSON text for a StreamingHttpResponse. Rows go out as soon as
+    their chunk is predicted. A failure mid-stream can no longer change the HTTP status,
+    so it is reported as a final error record (NDJSON) or comment line (CSV).
+    """
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for chunk in predict_chunks(model, csv_path, smiles_col, protein_col, backend, chunk_rows, domain=domain):
+            if output_format == "csv":
+                yield chunk.to_csv(index=False, header=(rows == 0))
+            else:
+                yield chunk.to_json(orient="records", lines=True, force_ascii=False)
+            rows += len(chunk)
+        if output_format == "csv" and rows == 0:
+            yield ",".join(read_header(csv_path) + ["Predicted"] + (list(applicability.COLUMNS) if domain else [])) + "\n"
+        print(f"✅ Streamed {rows} predictions as {output_format} in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"❌ Streaming prediction failed after {rows} rows:", e)
+        if output_format == "csv":
+            yield f"# error after {rows} rows: {e}\n"
+        else:
+            yield json.dumps({"error": str(e), "rows_written": rows}) + "\n"
@@ -0,0 +1,90 @@
+import json
+import struct
+
+import numpy as np
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+
+# ✅ Opt-in binary response: send `Accept: application/vnd.pharmalnet.columns` to get it.
+#
+# Layout (all little-endian):
+#   b"PNC1"                magic + format version
+#   uint32                 length of the JSON header
+#   JSON header            {"meta": {...}, "columns": [{"name", "dtype", "length", "offset"}, ...]}
+#   column data            raw float32 arrays, each starting on an 8-byte boundary
+#                          (offsets are from the start of the payload, so a browser can
+#                          use `new Float32Array(buffer, offset, length)` without copying)
+#
+# Missing / non-finite values are NaN.
+MEDIA_TYPE = "application/vnd.pharmalnet.columns"
+MAGIC = b"PNC1"
+ALIGN = 8
+
+
+def wants_columnar(request):
+    """True when the client asked for the columnar format in its Accept header."""
+    return MEDIA_TYPE in request.headers.get("Accept", "")
+
+
+def _pad(size):
+    return -size % ALIGN
+
+
+def encode_columns(columns, meta=None):
+    """Pack {name: sequence of numbers} + a JSON-safe meta dict into one payload."""
+    arrays = {}
+    for name, values in columns.items():
+        # One vectorised cast (None → NaN), no per-value Python work
+        array = np.array(values, dtype="<f4")
+        array[~np.isfinite(array)] = np.nan
+        arrays[name] = array
+
+    # The header holds the offsets, whose values depend on the header length → fixed point
+    offsets, header = {}, b""
+    while True:
+        start = len(MAGIC) + 4 + len(header)
+        start += _pad(start)
+        position = start
+        for name, array in arrays.items():
+            offsets[name] = position
+            position += array.nbytes + _pad(array.nbytes)
+        new_header = json.dumps({
+            "meta": meta or {},
+            "columns": [
+                {"name": name, "dtype": "float32", "length": len(array), "offset": offsets[name]}
+                for name, array in arrays.items()
+            ],
+        }).encode("utf-8")
+        if len(new_header) == len(header):
+            header = new_header
+            break
+        header = new_header
+
+    parts = [MAGIC, struct.pack("<I", len(header)), header]
+    size = len(MAGIC) + 4 + len(header)
+    parts.append(b"\0" * _pad(size))
+    for array in arrays.values():
+        data = array.tobytes()
+        parts.append(data)
+        parts.append(b"\0" * _pad(len(data)))
+    return b"".join(parts)
+
+
+def decode_columns(payload):
+    """Inverse of encode_columns(): returns (meta, {name: float32 array})."""
+    if payload[:4] != MAGIC:
+        raise ValueError("Not a Pharmal-Net columnar payload.")
+    (header_len,) = struct.unpack_from("<I", payload, 4)
+    header = json.loads(payload[8:8 + header_len])
+    columns = {
+        col["name"]: np.frombuffer(payload, dtype="<f4", count=col["length"], offset=col["offset"])
+        for col in header["columns"]
+    }
+    return header["meta"], columns
+
+
+def columnar_response(columns, meta=None, status=200):
+    response = HttpResponse(encode_columns(columns, meta), content_type=MEDIA_TYPE, status=status)
+    patch_vary_headers(response, ["Accept"])
+    return response
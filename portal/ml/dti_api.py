@@ -1,84 +1,900 @@
 import os
-import tempfile
 import zipfile
-import shutil
+import json
+import time
+import random
 import pandas as pd
-from django.http import JsonResponse
-from django.conf import settings  # ✅ For MEDIA_URL + MEDIA_ROOT
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse
+from django.urls import reverse
+from django.conf import settings
 
 # ✅ DeepPurpose imports
 from DeepPurpose import utils, DTI as models
-from .dti_processor import protein_smiles_uploads
+from .dti_processor import protein_smiles_uploads, prepare_dataset, evaluate_and_package, DEFAULT_HPARAMS
+from .featurize import data_process, encode_matrix
+from .feature_cache import get_feature_cache
+from . import jobs, hpsearch, inference, registry, batch_predict, microbatch, columnar, results, screening, library, applicability, uploads, workspace, plots
+from .memory import MemoryTracker, MemoryBudgetExceeded
+
+
+# ---------------- UPLOADED INPUTS ----------------
+def _has_input(request, field):
+    """A file for `field` came as multipart, or as the id of a chunked upload (`<field>_upload_id`)."""
+    return bool(request.FILES.get(field) or request.POST.get(f"{field}_upload_id"))
+
+
+def _save_input(request, field, dest_path, ws=None):
+    """
+    Put the file for `field` at dest_path (which the caller may later delete) and return
+    its original filename. A completed chunked upload is hard-linked, not copied; a
+    multipart file written into workspace `ws` counts against its quota.
+    Raises uploads.UploadNotFound for an unknown / incomplete upload id.
+    """
+    upload_id = request.POST.get(f"{field}_upload_id")
+    if upload_id:
+        return uploads.link_upload(upload_id, request.user.id, dest_path)["filename"]
+
+    source = request.FILES[field]
+    if ws is not None:
+        ws.write(dest_path, source.chunks())
+        return source.name
+    with open(dest_path, "wb") as f:
+        for chunk in source.chunks():
+            f.write(chunk)
+    return source.name
+
+
+def _save_job_input(request, field, job_id, filename):
+    """
+    Save the file for `field` into the job's work folder, under the workspace quota, and
+    return its path. An input over quota fails the job before it is queued.
+    """
+    ws = workspace.Workspace("job", path=jobs.work_path(job_id))
+    try:
+        _save_input(request, field, ws.file(filename), ws)
+    except workspace.WorkspaceQuotaExceeded as e:
+        jobs.finish_job(job_id, jobs.JOB_FAILED, error=str(e))
+        raise
+    return ws.file(filename)
 
 
 # ---------------- PHARMAL-NET TRAIN API ----------------
 def pharmalnet_train_api(request):
-    """Handle DTI training request, return model metrics + ZIP for download"""
+    """Queue a DTI training job and return its id right away (poll the job endpoints for results)"""
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method"}, status=400)
 
     try:
-        csv_file = request.FILES.get("dataset")
         smiles_col = request.POST.get("smiles_col")
         protein_col = request.POST.get("protein_col")
         value_col = request.POST.get("value_col")
-        model_name = request.POST.get("model_name", "pharmalnet_model")
+        model_name = request.POST.get("model_name") or "pharmalnet_model"
 
-        if not csv_file or not smiles_col or not protein_col or not value_col:
+        if not _has_input(request, "dataset") or not smiles_col or not protein_col or not value_col:
             return JsonResponse({"error": "Please upload CSV and fill all required fields"}, status=400)
 
-        # ✅ Save uploaded CSV temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-            for chunk in csv_file.chunks():
-                tmp_file.write(chunk)
-            tmp_path = tmp_file.name
+        # ✅ Optional hyperparameter search (JSON search space) instead of a single training run
+        search_space = request.POST.get("search_space", "").strip()
+        search_trials = request.POST.get("search_trials", "").strip()
+        if search_space:
+            try:
+                search_space = hpsearch.parse_search_space(search_space)
+                search_trials = hpsearch.parse_trial_count(search_trials)
+            except ValueError as e:
+                return JsonResponse({"error": f"Invalid hyperparameter search: {e}"}, status=400)
+
+        # ✅ Early stopping patience in epochs (0 = always train every epoch)
+        patience = request.POST.get("patience", "").strip()
+        try:
+            patience = int(patience) if patience else settings.PHARMALNET_EARLY_STOPPING_PATIENCE
+        except ValueError:
+            return JsonResponse({"error": "Patience must be a whole number of epochs"}, status=400)
+
+        if request.POST.get("dataset_upload_id"):
+            uploads.uploaded_file(request.POST["dataset_upload_id"], request.user.id)
+
+        job_id, _ = jobs.create_job("search" if search_space else "train", request.user.id)
 
-        # ✅ Run training pipeline
-        model_dir, zip_path, metrics, y_true, y_pred, graph_path = protein_smiles_uploads(
-            file_path=tmp_path,
+        # ✅ Save uploaded CSV inside the job's work folder (the worker process reads it from there)
+        dataset_path = _save_job_input(request, "dataset", job_id, "dataset.csv")
+
+        jobs.update_job(job_id, params={
+            "dataset_path": dataset_path,
+            "model_name": model_name,
+            "smiles_col": smiles_col,
+            "protein_col": protein_col,
+            "value_col": value_col,
+            "search_space": search_space or None,
+            "search_trials": search_trials or None,
+            "patience": patience,
+        })
+        jobs.submit_job(job_id)
+
+        return JsonResponse({
+            "message": "⏳ Hyperparameter search queued." if search_space else "⏳ Training job queued.",
+            "job_id": job_id,
+            "status": jobs.JOB_QUEUED,
+            "status_url": reverse("pharmalnet_job_status", args=[job_id]),
+            "result_url": reverse("pharmalnet_job_result", args=[job_id]),
+            "events_url": reverse("pharmalnet_job_events", args=[job_id]),
+        }, status=202)
+
+    except uploads.UploadNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except workspace.WorkspaceQuotaExceeded as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    except Exception as e:
+        print("❌ Error in pharmalnet_train_api:", e)
+        return JsonResponse({"error": f"Internal server error: {e}"}, status=500)
+
+
+def run_training_job(job_id, job_dir, params):
+    """
+    Training job handler — runs inside the job worker process (see jobs.JOB_HANDLERS).
+    A resumed job reuses the stored split seed and continues from the checkpoint in its work folder.
+    """
+    model_name = params["model_name"]
+    feature_cache = get_feature_cache()
+    cache_snapshot = feature_cache.counters()
+
+    if not params.get("seed"):
+        params["seed"] = random.randint(1, 9999)
+        jobs.update_job(job_id, params=params)
+
+    # ✅ Run training pipeline (model files, ZIP and plot data in a workspace removed afterwards)
+    with workspace.Workspace("train") as ws:
+        model_dir, zip_path, metrics, y_true, y_pred, plot_data_path = protein_smiles_uploads(
+            file_path=params["dataset_path"],
             model_name=model_name,
-            Smiles=smiles_col,
-            Protein=protein_col,
-            value_name=value_col
+            Smiles=params["smiles_col"],
+            Protein=params["protein_col"],
+            value_name=params["value_col"],
+            progress=lambda event, **data: jobs.emit_event(job_id, event, **data),
+            memory_budget_mb=settings.PHARMALNET_INGEST_MEMORY_MB,
+            seed=params["seed"],
+            checkpoint_path=os.path.join(jobs.work_path(job_id), "checkpoint.pt"),
+            checkpoint_every=settings.PHARMALNET_CHECKPOINT_EVERY,
+            patience=params.get("patience"),
+            workdir=ws.path
         )
 
         if not metrics:
-            return JsonResponse({"error": "Training failed. Please verify dataset or columns."}, status=500)
+            raise RuntimeError("Training failed. Please verify dataset or columns.")
 
-        # ✅ Build model ZIP URL (make it downloadable through /media/)
-        model_zip_url = None
-        if zip_path and os.path.exists(zip_path):
-            # Create media directory (persistent) if not exists
-            media_model_dir = os.path.join(settings.MEDIA_ROOT, "pharmalnet_models")
-            os.makedirs(media_model_dir, exist_ok=True)
+        ws.check_quota()
+        _keep_file(plot_data_path, job_dir)
+        return {
+            **_training_result(
+                model_name, zip_path, metrics, y_true, y_pred, _plot_stage(job_id, job_dir),
+                jobs.read_job(job_id)["owner"]
+            ),
+            "feature_cache": feature_cache.counters(since=cache_snapshot)
+        }
 
-            # Copy the ZIP file to the media folder
-            zip_filename = f"{model_name}_trained_model.zip"
-            media_zip_path = os.path.join(media_model_dir, zip_filename)
-            shutil.copy(zip_path, media_zip_path)
 
-            # Build downloadable media URL
-            model_zip_url = settings.MEDIA_URL.rstrip("/") + f"/pharmalnet_models/{zip_filename}"
+def run_search_job(job_id, job_dir, params):
+    """
+    Hyperparameter search job handler: successive halving over the requested space,
+    then the best trial is evaluated and packaged like a normal training run.
+    """
+    progress = lambda event, **data: jobs.emit_event(job_id, event, **data)
 
-        # ✅ Return all response data
-        return JsonResponse({
-            "message": "✅ Model trained successfully!",
-            "metrics": metrics,
-            "graph_url": graph_path,
-            "model_zip": model_zip_url,   # ✅ frontend button can download directly
-            "graph_data": {
-                "actual": y_true,
-                "predicted": y_pred
-            }
+    # Same split on resume, so trial checkpoints stay valid
+    if not params.get("seed"):
+        params["seed"] = random.randint(1, 9999)
+        jobs.update_job(job_id, params=params)
+
+    train, val, test = prepare_dataset(
+        params["dataset_path"], params["smiles_col"], params["protein_col"], params["value_col"],
+        progress, memory_budget_mb=settings.PHARMALNET_INGEST_MEMORY_MB, seed=params["seed"]
+    )
+
+    trials = hpsearch.sample_trials(params["search_space"], params.get("search_trials"))
+    print(f"🔬 Hyperparameter search: {len(trials)} trials")
+    progress("stage", stage="search", trials=len(trials))
+
+    leaderboard = hpsearch.successive_halving(
+        os.path.join(jobs.work_path(job_id), "search"), train, val, trials,
+        max_epochs=DEFAULT_HPARAMS["train_epoch"],
+        workers=settings.PHARMALNET_SEARCH_WORKERS,
+        progress=progress
+    )
+
+    best = leaderboard[0]
+    if best["status"] != "completed":
+        raise RuntimeError("All hyperparameter search trials failed.")
+    print(f"🏆 Best trial {best['trial']}: {best['params']} (val loss {best['val_loss']})")
+
+    model = models.model_pretrained(best["model_dir"])
+    with workspace.Workspace("train") as ws:
+        model_dir, zip_path, metrics, y_true, y_pred, plot_data_path = evaluate_and_package(
+            model, test, params["model_name"], progress, train=train, workdir=ws.path
+        )
+        ws.check_quota()
+        _keep_file(plot_data_path, job_dir)
+        result = _training_result(
+            params["model_name"], zip_path, metrics, y_true, y_pred, _plot_stage(job_id, job_dir),
+            jobs.read_job(job_id)["owner"]
+        )
+
+    return {
+        **result,
+        "best_params": best["params"],
+        # model_dir is a server path → keep it out of the response
+        "leaderboard": [{k: v for k, v in entry.items() if k != "model_dir"} for entry in leaderboard],
+    }
+
+
+def _keep_file(path, job_dir):
+    """Move a workspace file the job result refers to (the evaluation plot data) into the job folder."""
+    if not path or not os.path.exists(path):
+        return path
+    kept = os.path.join(job_dir, os.path.basename(path))
+    os.replace(path, kept)
+    return kept
+
+
+def _plot_stage(job_id, job_dir):
+    """
+    Draw the evaluation plot of a job as its own stage and return the URL serving it.
+    A failed render doesn't fail the job: the plot endpoint draws it on first request.
+    """
+    jobs.emit_event(job_id, "stage", stage="plot")
+    try:
+        plots.render_plot(job_dir)
+    except Exception as e:
+        print("❌ Plot rendering failed:", e)
+    return reverse("pharmalnet_job_plot", args=[job_id])
+
+
+def _file_chunks(path, chunk_size=1024 * 1024):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def _training_result(model_name, zip_path, metrics, y_true, y_pred, graph_url, owner_id=None):
+    """Register the model ZIP in the artifact store and build the JSON result of a training job"""
+    model_zip_url = None
+    model_id = None
+    if zip_path and os.path.exists(zip_path) and owner_id is not None:
+        # ✅ Stored once by content hash (hard link, no copy), downloaded through the store
+        zip_filename = f"{model_name}_trained_model.zip"
+        model_id, _ = registry.register_model_file(zip_path, owner_id, zip_filename)
+        os.remove(zip_path)
+        model_zip_url = reverse("pharmalnet_model_download", args=[model_id])
+
+    return {
+        "message": "✅ Model trained successfully!",
+        "metrics": metrics,
+        "graph_url": graph_url,   # ✅ served by the job plot endpoint, not a server path
+        "model_zip": model_zip_url,   # ✅ frontend button can download directly
+        "model_id": model_id,
+        "graph_data": {
+            "actual": y_true,
+            "predicted": y_pred
+        }
+    }
+
+
+# ---------------- PHARMAL-NET VIRTUAL SCREENING API ----------------
+def pharmalnet_screen_api(request):
+    """
+    Queue a virtual screening job: a compound library CSV × a target panel, scored with a
+    registered model; the job result holds the top_k hits per target.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    try:
+        library_id = request.POST.get("library_id") or None
+        model_id = request.POST.get("model_id")
+        smiles_col = request.POST.get("smiles_col") or "Smiles"
+        id_col = request.POST.get("id_col") or None
+        backend = request.POST.get("backend") or settings.PHARMALNET_INFERENCE_BACKEND
+
+        if not (_has_input(request, "library") or library_id) or not model_id:
+            return JsonResponse({"error": "Please upload a compound library CSV (or pick a library) and choose a model"}, status=400)
+        if backend not in inference.BACKENDS:
+            return JsonResponse({
+                "error": f"Unknown inference backend '{backend}'. Choose one of: {', '.join(inference.BACKENDS)}"
+            }, status=400)
+        try:
+            registry.model_dir_for(model_id, request.user.id)
+            if library_id:
+                library.owned_library(library_id, request.user.id)
+            elif request.POST.get("library_upload_id"):
+                uploads.uploaded_file(request.POST["library_upload_id"], request.user.id)
+            targets = screening.parse_targets(request.POST.get("targets"))
+            top_k = int(request.POST.get("top_k") or 100)
+            if top_k < 1:
+                raise ValueError("top_k must be at least 1.")
+        except (registry.ModelNotFound, library.LibraryNotFound, uploads.UploadNotFound) as e:
+            return JsonResponse({"error": str(e)}, status=404)
+        except ValueError as e:
+            return JsonResponse({"error": f"Invalid screening request: {e}"}, status=400)
+
+        job_id, _ = jobs.create_job("screen", request.user.id)
+        library_path = None
+        if not library_id:
+            library_path = _save_job_input(request, "library", job_id, "library.csv")
+
+        jobs.update_job(job_id, params={
+            "library_path": library_path,
+            "library_id": library_id,
+            "model_id": model_id,
+            "smiles_col": smiles_col,
+            "id_col": id_col,
+            "targets": targets,
+            "top_k": top_k,
+            "largest": request.POST.get("rank", "highest") != "lowest",
+            "backend": backend,
         })
+        jobs.submit_job(job_id)
 
+        return JsonResponse({
+            "message": "⏳ Screening job queued.",
+            "job_id": job_id,
+            "status": jobs.JOB_QUEUED,
+            "status_url": reverse("pharmalnet_job_status", args=[job_id]),
+            "result_url": reverse("pharmalnet_job_result", args=[job_id]),
+            "events_url": reverse("pharmalnet_job_events", args=[job_id]),
+        }, status=202)
+
+    except workspace.WorkspaceQuotaExceeded as e:
+        return JsonResponse({"error": str(e)}, status=413)
     except Exception as e:
-        print("❌ Error in pharmalnet_train_api:", e)
+        print("❌ Error in pharmalnet_screen_api:", e)
         return JsonResponse({"error": f"Internal server error: {e}"}, status=500)
 
 
+def run_screening_job(job_id, job_dir, params):
+    """Screening job handler: stream the library through the model, top-k per target."""
+    progress = lambda event, **data: jobs.emit_event(job_id, event, **data)
+    model = registry.load_model(params["model_id"], jobs.read_job(job_id)["owner"])
+
+    # ✅ A stored library is already encoded; an uploaded CSV is encoded batch by batch
+    if params.get("library_id"):
+        index = library.LibraryIndex(params["library_id"])
+        if index.meta["encoding"] != model.drug_encoding:
+            raise ValueError(
+                f"Library holds {index.meta['encoding']} fingerprints but the model uses {model.drug_encoding}."
+            )
+        batches = index.batches(settings.PHARMALNET_PREDICT_CHUNK_ROWS)
+    else:
+        batches = screening.csv_library_batches(
+            params["library_path"], params["smiles_col"], params.get("id_col"),
+            batch_rows=settings.PHARMALNET_PREDICT_CHUNK_ROWS, drug_encoding=model.drug_encoding
+        )
+
+    progress("stage", stage="screen", targets=len(params["targets"]))
+    result = screening.screen(
+        model,
+        [tuple(t) for t in params["targets"]],
+        batches,
+        top_k=params["top_k"],
+        largest=params["largest"],
+        backend=params["backend"],
+        progress=progress
+    )
+    return {"message": "✅ Screening finished!", "model_id": params["model_id"], **result}
+
+
+# ---------------- PHARMAL-NET COMPOUND LIBRARY API ----------------
+def pharmalnet_libraries_api(request, library_id=None):
+    """
+    GET: the user's compound libraries.
+    POST: queue encoding of an uploaded SMILES CSV into a new library, or (with
+    library_id) appended to an existing one.
+    """
+    if request.method == "GET" and library_id is None:
+        return JsonResponse({"libraries": library.list_libraries(request.user.id)})
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    if not _has_input(request, "library"):
+        return JsonResponse({"error": "Please upload a compound library CSV"}, status=400)
+
+    try:
+        source_name = (
+            uploads.uploaded_file(request.POST["library_upload_id"], request.user.id)[1]["filename"]
+            if request.POST.get("library_upload_id") else request.FILES["library"].name
+        )
+        if library_id:
+            library_id = library.owned_library(library_id, request.user.id)["library_id"]
+        else:
+            library_id = library.create_library(
+                request.user.id,
+                request.POST.get("name") or source_name,
+                request.POST.get("drug_encoding") or "Morgan"
+            )
+    except (library.LibraryNotFound, uploads.UploadNotFound) as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    job_id, _ = jobs.create_job("library", request.user.id)
+    try:
+        source_path = _save_job_input(request, "library", job_id, "compounds.csv")
+    except workspace.WorkspaceQuotaExceeded as e:
+        return JsonResponse({"error": str(e)}, status=413)
+
+    jobs.update_job(job_id, params={
+        "library_id": library_id,
+        "source_path": source_path,
+        "smiles_col": request.POST.get("smiles_col") or "Smiles",
+        "id_col": request.POST.get("id_col") or None,
+    })
+    jobs.submit_job(job_id)
+
+    return JsonResponse({
+        "message": "⏳ Library encoding queued.",
+        "library_id": library_id,
+        "job_id": job_id,
+        "status": jobs.JOB_QUEUED,
+        "status_url": reverse("pharmalnet_job_status", args=[job_id]),
+        "result_url": reverse("pharmalnet_job_result", args=[job_id]),
+        "events_url": reverse("pharmalnet_job_events", args=[job_id]),
+    }, status=202)
+
+
+def run_library_job(job_id, job_dir, params):
+    """Library job handler: encode the uploaded compounds once and append them to the index."""
+    meta = library.read_library(params["library_id"])
+    jobs.emit_event(job_id, "stage", stage="encode_library")
+    count = library.append_compounds(
+        params["library_id"],
+        lambda first_row: screening.csv_library_batches(
+            params["source_path"], params["smiles_col"], params.get("id_col"),
+            batch_rows=settings.PHARMALNET_PREDICT_CHUNK_ROWS,
+            drug_encoding=meta["encoding"],
+            first_row=first_row
+        ),
+        progress=lambda event, **data: jobs.emit_event(job_id, event, **data)
+    )
+    return {"message": "✅ Library updated!", "library_id": params["library_id"], "count": count}
+
+
+# ---------------- PHARMAL-NET CHUNKED UPLOAD API ----------------
+# 1. POST uploads/ with filename, size (+ optional sha256, chunk_size) → upload_id, chunk_size
+# 2. PUT uploads/<id>/chunks/<n>/ with the raw bytes and an X-Chunk-SHA256 header, any order
+# 3. GET uploads/<id>/ lists the missing chunks (resume after a dropped connection)
+# 4. POST uploads/<id>/complete/ → the file is stored by content hash
+# Train / predict / screen / libraries then take dataset_upload_id, model_upload_id or
+# library_upload_id instead of a multipart file, as often as needed.
+def pharmalnet_uploads_api(request, upload_id=None):
+    """GET: the user's uploads, or one upload's status. POST: start a new upload."""
+    try:
+        if upload_id is not None:
+            if request.method != "GET":
+                return JsonResponse({"error": "Invalid request method"}, status=400)
+            return JsonResponse(uploads.status(uploads.owned_upload(upload_id, request.user.id)))
+
+        if request.method == "GET":
+            return JsonResponse({"uploads": [uploads.status(m) for m in uploads.list_uploads(request.user.id)]})
+        if request.method != "POST":
+            return JsonResponse({"error": "Invalid request method"}, status=400)
+
+        try:
+            size = int(request.POST.get("size", ""))
+            chunk_size = int(request.POST["chunk_size"]) if request.POST.get("chunk_size") else None
+        except ValueError:
+            return JsonResponse({"error": "size and chunk_size must be whole numbers of bytes."}, status=400)
+
+        meta = uploads.create_upload(
+            request.user.id, request.POST.get("filename"), size,
+            sha256=request.POST.get("sha256") or None, chunk_size=chunk_size
+        )
+        return JsonResponse({
+            **uploads.status(meta),
+            "status_url": reverse("pharmalnet_upload", args=[meta["upload_id"]]),
+            "complete_url": reverse("pharmalnet_upload_complete", args=[meta["upload_id"]]),
+        }, status=200 if meta["status"] == uploads.UPLOAD_COMPLETE else 201)
+
+    except uploads.UploadNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+def pharmalnet_upload_chunk_api(request, upload_id, index):
+    """PUT one chunk: raw request body, sha256 of the body in the X-Chunk-SHA256 header."""
+    if request.method != "PUT":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    try:
+        # Read from the request stream: never the whole body in memory
+        meta = uploads.write_chunk(upload_id, request.user.id, index, request, request.headers.get("X-Chunk-SHA256"))
+        return JsonResponse(uploads.status(meta))
+    except uploads.UploadNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+def pharmalnet_upload_complete_api(request, upload_id):
+    """POST once every chunk is in: assemble, verify and store the file."""
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    try:
+        meta = uploads.complete_upload(upload_id, request.user.id)
+        return JsonResponse({**uploads.status(meta), "message": "✅ Upload complete!"})
+    except uploads.UploadNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+# ---------------- PHARMAL-NET JOB STATUS / RESULT API ----------------
+def _owned_job(request, job_id):
+    job = jobs.read_job(job_id)
+    if job is None or job["owner"] != request.user.id:
+        return None
+    return job
+
+
+def pharmalnet_job_status_api(request, job_id):
+    """Lightweight status for polling: queued → running → done / failed"""
+    job = _owned_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    # ✅ The process that owned this job died (worker restart) → resume it from its checkpoint
+    if jobs.recover_job(job):
+        job = jobs.read_job(job_id)
+    return JsonResponse(jobs.public_job(job))
+
+
+SSE_POLL_SECONDS = 1
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 2000
+
+
+def _sse_event(event):
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _sse_stream(job_id, last_seq, max_seconds):
+    """
+    Job events after `last_seq`, for at most max_seconds: a stream must not hold a sync
+    web worker for a whole run (nor outlive its timeout). When it ends, EventSource
+    reconnects with Last-Event-ID and the next request picks up from there.
+    """
+    offset = 0
+    started = idle_since = time.monotonic()
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+
+    while True:
+        events, offset = jobs.read_events(job_id, offset)
+        for event in events:
+            if event["seq"] <= last_seq:
+                continue
+            last_seq = event["seq"]
+            idle_since = time.monotonic()
+            yield _sse_event(event)
+
+        job = jobs.read_job(job_id)
+        if job is None or jobs.is_finished(job):
+            # The final status event is written after job.json, so drain once more
+            events, offset = jobs.read_events(job_id, offset)
+            for event in events:
+                if event["seq"] > last_seq:
+                    yield _sse_event(event)
+            return
+
+        # ✅ Same recovery as status polling: a job whose worker died is resumed (or failed)
+        jobs.recover_job(job)
+
+        if time.monotonic() - started >= max_seconds:
+            return
+
+        # ✅ Comment line keeps proxies from closing an idle connection on long epochs
+        if time.monotonic() - idle_since >= SSE_KEEPALIVE_SECONDS:
+            idle_since = time.monotonic()
+            yield ": keep-alive\n\n"
+
+        time.sleep(SSE_POLL_SECONDS)
+
+
+def pharmalnet_job_events_api(request, job_id):
+    """
+    Server-sent events: status, stage and per-epoch loss events, in streams of at most
+    PHARMALNET_SSE_MAX_SECONDS (the client reconnects until the job finishes)
+    """
+    job = _owned_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    # EventSource sends Last-Event-ID on reconnect → resume after that event
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID") or 0)
+    except ValueError:
+        last_seq = 0
+
+    response = StreamingHttpResponse(
+        _sse_stream(job["job_id"], last_seq, settings.PHARMALNET_SSE_MAX_SECONDS),
+        content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # disable nginx buffering
+    return response
+
+
+def pharmalnet_job_result_api(request, job_id):
+    """Metrics, graph and model ZIP of a finished job"""
+    job = _owned_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    if job["status"] == jobs.JOB_FAILED:
+        return JsonResponse({"error": job["error"] or "Job failed", **jobs.public_job(job)}, status=500)
+    if job["status"] != jobs.JOB_DONE:
+        return JsonResponse(jobs.public_job(job), status=202)
+
+    result = {**job["result"], "job_id": job["job_id"], "status": job["status"]}
+
+    # ✅ Accept: application/vnd.pharmalnet.columns → graph data as float32 columns
+    if columnar.wants_columnar(request):
+        graph_data = result.pop("graph_data", None) or {}
+        return columnar.columnar_response(
+            {"actual": graph_data.get("actual") or [], "predicted": graph_data.get("predicted") or []},
+            meta=result
+        )
+    return JsonResponse(result)
+
+
+def pharmalnet_job_plot_api(request, job_id):
+    """Actual-vs-predicted plot of a finished training job (drawn once, then served from disk)"""
+    job = _owned_job(request, job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    if job["status"] != jobs.JOB_DONE:
+        return JsonResponse(jobs.public_job(job), status=202)
+
+    plot_path = plots.render_plot(jobs.job_path(job_id))
+    if plot_path is None:
+        return JsonResponse({"error": "This job has no evaluation plot"}, status=404)
+    response = FileResponse(open(plot_path, "rb"), content_type="image/png")
+    response["Cache-Control"] = "private, max-age=86400"
+    return response
+
+
+
+# ---------------- PHARMAL-NET MODEL REGISTRY API ----------------
+def pharmalnet_models_api(request):
+    """
+    GET: the user's registered models + model cache metrics.
+    POST: register an uploaded model ZIP and return its content-hash id.
+    """
+    if request.method == "GET":
+        return JsonResponse({
+            "models": registry.list_models(request.user.id),
+            "model_cache": registry.get_model_cache().stats(),
+            "workspaces": workspace.stats(),
+        })
+
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    model_file = request.FILES.get("model")
+    upload_id = request.POST.get("model_upload_id")
+    if not upload_id and (not model_file or not model_file.name.lower().endswith(".zip")):
+        return JsonResponse({"error": "Please upload a trained model ZIP."}, status=400)
+
+    try:
+        if upload_id:
+            model_path, upload = uploads.uploaded_file(upload_id, request.user.id)
+            model_id, created = registry.register_model(_file_chunks(model_path), request.user.id, upload["filename"])
+        else:
+            model_id, created = registry.register_model(model_file.chunks(), request.user.id, model_file.name)
+    except uploads.UploadNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "message": "✅ Model registered!" if created else "✅ Model already registered.",
+        "model_id": model_id,
+    }, status=201 if created else 200)
+
+
+def pharmalnet_model_api(request, model_id):
+    """DELETE: remove a model from the user's list (the store reclaims it once nobody uses it)."""
+    if request.method != "DELETE":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    try:
+        registry.unregister_model(model_id, request.user.id)
+    except registry.ModelNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    return JsonResponse({"message": "🗑️ Model removed.", "model_id": model_id})
+
+
+def pharmalnet_model_download_api(request, model_id):
+    """The registered model ZIP, streamed from the artifact store."""
+    try:
+        zip_path = registry.model_zip_for(model_id, request.user.id)
+        name = registry.read_manifest(request.user.id)[model_id.lower()]["name"] or f"{model_id[:12]}.zip"
+    except registry.ModelNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    return FileResponse(open(zip_path, "rb"), as_attachment=True, filename=name, content_type="application/zip")
+
+
+# ---------------- PHARMAL-NET PREDICTION RESULTS API ----------------
+def _owned_result(request, result_id):
+    result = results.read_result(result_id)
+    if result is None or result["owner"] != request.user.id:
+        return None
+    return result
+
+
+def _float_param(request, name):
+    value = request.GET.get(name)
+    return float(value) if value not in (None, "") else None
+
+
+def pharmalnet_result_api(request, result_id):
+    """
+    One page of a stored prediction result:
+    ?offset=0&limit=50&sort=predicted|-predicted&min=&max=
+    """
+    result = _owned_result(request, result_id)
+    if result is None:
+        return JsonResponse({"error": "Result not found"}, status=404)
+
+    try:
+        page = results.query(
+            result_id,
+            offset=int(request.GET.get("offset", 0)),
+            limit=int(request.GET.get("limit", 50)),
+            sort=request.GET.get("sort") or None,
+            min_value=_float_param(request, "min"),
+            max_value=_float_param(request, "max"),
+        )
+    except ValueError as e:
+        return JsonResponse({"error": f"Invalid paging parameters: {e}"}, status=400)
+
+    return JsonResponse({
+        **page,
+        "result_id": result["result_id"],
+        "total_records": result["total_records"],
+        "expires": result["expires"],
+    })
+
+
+def pharmalnet_result_download_api(request, result_id):
+    """The full stored result as a streamed CSV download."""
+    result = _owned_result(request, result_id)
+    if result is None:
+        return JsonResponse({"error": "Result not found"}, status=404)
+
+    response = StreamingHttpResponse(results.iter_csv(result_id), content_type="text/csv")
+    response["Content-Disposition"] = 'attachment; filename="pharmalnet_predictions.csv"'
+    return response
+
 
 # ---------------- PHARMAL-NET PREDICTION API ----------------
+def _check_csv_header(csv_path, smiles_col, protein_col):
+    """(columns, None) for a usable prediction CSV, else (None, error response)."""
+    try:
+        columns = batch_predict.read_header(csv_path)
+    except (ValueError, pd.errors.EmptyDataError) as e:
+        return None, JsonResponse({"error": f"Could not read the CSV: {e}"}, status=400)
+    if smiles_col not in columns or protein_col not in columns:
+        return None, JsonResponse({"error": f"Missing required columns ({smiles_col}, {protein_col})"}, status=400)
+    return columns, None
+
+
+def _domain(model_id, model, owner_id):
+    """(TanimotoIndex, threshold) for a registered model trained with bit fingerprints, else None."""
+    if not model_id:
+        return None
+    index = applicability.index_for(model, registry.model_dir_for(model_id, owner_id))
+    return (index, settings.PHARMALNET_AD_THRESHOLD) if index is not None else None
+
+
+def _reserve_csv_chunk(tracker, csv_path, chunk_rows):
+    """
+    Reserve memory for parsing one chunk of a CSV: about 3× its bytes as a DataFrame,
+    the chunk being chunk_rows rows of the average row size (sampled from the first MB).
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        sample = f.read(1024 * 1024)
+    row_bytes = len(sample) / max(1, sample.count(b"\n"))
+    tracker.reserve(3 * min(size, int(row_bytes * (chunk_rows + 1))), "Reading the prediction CSV")
+
+
+def _stream_prediction_response(request, model, model_id, csv_path, output_format, backend, ws):
+    """Validate the CSV header, then stream its predictions as CSV / NDJSON (`ws` closes with the response)."""
+    smiles_col = request.POST.get("smiles_col") or "Smiles"
+    protein_col = request.POST.get("protein_col") or "seq1"
+
+    _, error = _check_csv_header(csv_path, smiles_col, protein_col)
+    if error:
+        return error
+
+    predictions = batch_predict.stream_predictions(
+        model, csv_path, smiles_col, protein_col, output_format,
+        backend=backend, chunk_rows=settings.PHARMALNET_PREDICT_CHUNK_ROWS,
+        domain=_domain(model_id, model, request.user.id)
+    )
+    # The body is closed with the response, whether or not it was read → the uploaded CSV goes with it
+    response = StreamingHttpResponse(
+        batch_predict.ClosingStream(predictions, on_close=ws.close),
+        content_type=batch_predict.STREAM_FORMATS[output_format]
+    )
+    response["Content-Disposition"] = f'attachment; filename="pharmalnet_predictions.{output_format}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _pair_prediction_response(model_id, model, smiles, protein, backend, domain=None):
+    """One SMILES + protein pair; registered models go through the shared micro-batcher."""
+    if model_id:
+        prediction, batch_size = microbatch.predict_pair(model_id, model, smiles, protein, backend=backend)
+    else:
+        X_pred = data_process(
+            X_drug=[smiles],
+            X_target=[protein],
+            y=[0],
+            drug_encoding=model.drug_encoding,
+            target_encoding=model.target_encoding,
+            split_method="no_split"
+        )
+        prediction, batch_size = float(inference.predict(model, X_pred, backend=backend)[0]), 1
+
+    response = {
+        "message": "✅ Prediction successful!",
+        "prediction": prediction,
+        "model_id": model_id,
+        "backend": backend,
+        "batch_size": batch_size,   # requests served by the same forward pass
+    }
+    if domain:
+        index, threshold = domain
+        similarity, out_of_domain = applicability.flag(
+            index, encode_matrix([smiles], model.drug_encoding), threshold
+        )
+        response["applicability"] = {
+            "similarity": round(float(similarity[0]), 4),
+            "out_of_domain": bool(out_of_domain[0]),
+            "threshold": threshold,
+        }
+    return JsonResponse(response)
+
+
+def pharmalnet_pair_prediction_api(request):
+    """
+    Low-latency single-pair prediction for a registered model:
+    POST model_id, smiles, protein (+ optional backend).
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+
+    model_id = request.POST.get("model_id")
+    smiles = request.POST.get("smiles")
+    protein = request.POST.get("protein")
+    backend = request.POST.get("backend") or settings.PHARMALNET_INFERENCE_BACKEND
+    if not model_id or not smiles or not protein:
+        return JsonResponse({"error": "model_id, smiles and protein are required."}, status=400)
+    if backend not in inference.BACKENDS:
+        return JsonResponse({
+            "error": f"Unknown inference backend '{backend}'. Choose one of: {', '.join(inference.BACKENDS)}"
+        }, status=400)
+
+    try:
+        model = registry.load_model(model_id, request.user.id)
+        return _pair_prediction_response(
+            model_id, model, smiles, protein, backend, domain=_domain(model_id, model, request.user.id)
+        )
+    except registry.ModelNotFound as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except TimeoutError:
+        return JsonResponse({"error": "Prediction timed out, please retry."}, status=503)
+    except Exception as e:
+        print("❌ Error in pharmalnet_pair_prediction_api:", e)
+        return JsonResponse({"error": str(e)}, status=500)
+
+
 def run_pharmalnet_prediction(request):
     """
     Perform ML prediction using DeepPurpose trained model (from ZIP or .pt/.pkl)
@@ -86,177 +902,164 @@ def run_pharmalnet_prediction(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method"}, status=400)
 
+    # ✅ Per-stage peak memory + budget, so a huge upload fails cleanly instead of OOM-killing the worker
+    # (RSS is per process: the budget is off when threaded workers share it, see settings)
+    budget_mb = settings.PHARMALNET_JOB_MEMORY_MB if settings.PHARMALNET_PREDICT_MEMORY_BUDGET else 0
+    tracker = MemoryTracker(budget_mb, label="predict").start()
+    # ✅ Every temp file of this request lives here and is removed with it
+    ws = workspace.Workspace("predict")
+
     try:
+        tracker.stage("load_model")
+        # ✅ Inference backend (eager / torchscript / quantized)
+        backend = request.POST.get("backend") or settings.PHARMALNET_INFERENCE_BACKEND
+        if backend not in inference.BACKENDS:
+            return JsonResponse({
+                "error": f"Unknown inference backend '{backend}'. Choose one of: {', '.join(inference.BACKENDS)}"
+            }, status=400)
+
+        model_id = request.POST.get("model_id")
         model_file = request.FILES.get("model")
-        if not model_file:
+        if not model_id and not _has_input(request, "model"):
             return JsonResponse({"error": "Please upload a trained model file (.zip or .pkl)."}, status=400)
 
-        # ✅ Save uploaded model temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(model_file.name)[1]) as tmp_model:
-            for chunk in model_file.chunks():
-                tmp_model.write(chunk)
-            model_path = tmp_model.name
-
-        # ✅ Handle ZIP model or direct model.pt/config.pkl
-        model_dir = None
-        if model_path.endswith(".zip"):
-            extract_dir = tempfile.mkdtemp(prefix="pharmalnet_model_")
-            with zipfile.ZipFile(model_path, "r") as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-            print("📂 Extracted files structure:")
-            for root, dirs, files in os.walk(extract_dir):
-                print(f"  {root} → {files}")
-
-            # ✅ Automatically detect correct model directory
-            possible_dirs = []
-            for root, dirs, files in os.walk(extract_dir):
-                if any(f.endswith(".pt") for f in files) and any(f.endswith(".pkl") for f in files):
-                    possible_dirs.append(root)
-
-            if possible_dirs:
-                model_dir = possible_dirs[0]
-                print(f"✅ Found model files in: {model_dir}")
-            else:
-                raise ValueError("❌ Could not find model files (.pt / .pkl) in extracted ZIP.")
-        else:
-            model_dir = os.path.dirname(model_path)
+        # ✅ A ZIP upload is registered (content hash) so repeat uploads reuse the loaded model
+        try:
+            if request.POST.get("model_upload_id") and not model_id:
+                model_path, upload = uploads.uploaded_file(request.POST["model_upload_id"], request.user.id)
+                model_id, _ = registry.register_model(_file_chunks(model_path), request.user.id, upload["filename"])
+            elif model_file and model_file.name.lower().endswith(".zip"):
+                model_id, _ = registry.register_model(model_file.chunks(), request.user.id, model_file.name)
+        except uploads.UploadNotFound as e:
+            return JsonResponse({"error": str(e)}, status=404)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
         # ✅ Load pretrained DeepPurpose model
         try:
-            model = models.model_pretrained(model_dir)
-            print(f"✅ Loaded model from: {model_dir}")
+            if model_id:
+                model = registry.load_model(model_id, request.user.id)
+            else:
+                # Bare .pt / .pkl upload (not registrable without its companion file)
+                ws.write(model_file.name, model_file.chunks())
+                model_dir = ws.path
+                model = models.model_pretrained(model_dir)
+                print(f"✅ Loaded model from: {model_dir}")
+        except registry.ModelNotFound as e:
+            return JsonResponse({"error": str(e)}, status=404)
+        except workspace.WorkspaceQuotaExceeded:
+            raise
         except Exception as e:
             print("❌ Model loading error:", e)
             return JsonResponse({"error": f"Failed to load DeepPurpose model: {e}"}, status=500)
 
-        # ✅ CASE 1: CSV Prediction
-        csv_file = request.FILES.get("dataset")
-        if csv_file:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_csv:
-                for chunk in csv_file.chunks():
-                    tmp_csv.write(chunk)
-                csv_path = tmp_csv.name
-
-            df = pd.read_csv(csv_path)
-            print(f"📄 Loaded CSV: {csv_path}")
-            print(f"📊 Columns: {list(df.columns)}")
-
-            smiles_col = request.POST.get("smiles_col", "Smiles")
-            protein_col = request.POST.get("protein_col", "seq1")
-
-            # ✅ Validate columns
-            if smiles_col not in df.columns or protein_col not in df.columns:
-                return JsonResponse({
-                    "error": f"Missing required columns ({smiles_col}, {protein_col})"
-                }, status=400)
-
-            smiles = df[smiles_col].astype(str).dropna().tolist()
-            proteins = df[protein_col].astype(str).dropna().tolist()
-
-            print(f"🧪 SMILES count: {len(smiles)}, Protein count: {len(proteins)}")
-
-            if not smiles or not proteins:
-                return JsonResponse({
-                    "error": "Empty SMILES or Protein sequence provided."
-                }, status=400)
-
-            # ✅ Convert data for DeepPurpose (⚡ FIXED HERE)
+        # ✅ CASE 1: CSV Prediction (multipart file or a chunked upload's id)
+        if _has_input(request, "dataset"):
+            csv_path = ws.file("dataset.csv")
             try:
-                print("🧠 Preparing data for DeepPurpose prediction...")
-
-                # ✅ Add dummy y values for backward compatibility (fixes NoneType error)
-                dummy_y = [0] * len(smiles)
-
-                X_pred = utils.data_process(
-                    X_drug=smiles,
-                    X_target=proteins,
-                    y=dummy_y,  # ✅ added for compatibility
-                    drug_encoding=model.drug_encoding,
-                    target_encoding=model.target_encoding,
-                    split_method="no_split"
-                )
+                filename = _save_input(request, "dataset", csv_path, ws)
+            except uploads.UploadNotFound as e:
+                return JsonResponse({"error": str(e)}, status=404)
+            # ✅ Over-budget CSVs get a 413 before any chunk is parsed
+            _reserve_csv_chunk(tracker, csv_path, settings.PHARMALNET_PREDICT_CHUNK_ROWS)
 
-                print(f"✅ X_pred prepared successfully — Type: {type(X_pred)}")
-
-            except Exception as e:
-                import traceback
-                print("❌ Error during data processing:", e)
-                print(traceback.format_exc())
-                return JsonResponse({"error": f"Data preprocessing failed: {e}"}, status=500)
-
-            if X_pred is None or len(X_pred) == 0:
+            # ✅ format=csv / ndjson: stream chunk by chunk instead of one JSON blob
+            output_format = request.POST.get("format") or "json"
+            if output_format in batch_predict.STREAM_FORMATS:
+                response = _stream_prediction_response(request, model, model_id, csv_path, output_format, backend, ws)
+                if response.streaming:
+                    ws = None   # the response closes it once it's done (or dropped)
+                return response
+            if output_format != "json":
                 return JsonResponse({
-                    "error": "Prediction data processing failed — check SMILES/Protein sequences."
+                    "error": f"Unknown output format '{output_format}'. Choose json, {', '.join(batch_predict.STREAM_FORMATS)}"
                 }, status=400)
 
-            print("🚀 Running prediction...")
-            y_pred = model.predict(X_pred)
+            smiles_col = request.POST.get("smiles_col") or "Smiles"
+            protein_col = request.POST.get("protein_col") or "seq1"
 
-            if y_pred is None:
-                return JsonResponse({
-                    "error": "Model failed to generate predictions. Check data or encodings."
-                }, status=500)
+            # ✅ Validate columns
+            columns, error = _check_csv_header(csv_path, smiles_col, protein_col)
+            if error:
+                return error
 
-            # ✅ Safely convert predictions for JSON serialization
-        import numpy as np
-        df["Predicted"] = [float(x) if pd.notna(x) and not np.isinf(x) else None for x in y_pred]
+            # ✅ Applicability domain: nearest training-compound similarity next to each prediction
+            domain = _domain(model_id, model, request.user.id)
+            if domain:
+                columns = columns + list(applicability.COLUMNS)
 
-        # ✅ Drop any problematic types (like Timestamp, NumPy int/float)
-        def make_json_safe(val):
-            try:
-                if pd.isna(val) or val in [np.inf, -np.inf]:
-                    return None
-                if isinstance(val, (np.generic, np.ndarray)):
-                    return val.item() if hasattr(val, "item") else str(val)
-                return val
-            except:
-                return str(val)
+            # ✅ Predict chunk by chunk into the result store (no whole-file DataFrame)
+            tracker.stage("predict")
+            print(f"🚀 Running prediction ({backend} backend)...")
+            feature_cache = get_feature_cache()
+            cache_snapshot = feature_cache.counters()
+            result_id, total = results.save_predictions(
+                request.user.id,
+                columns,
+                batch_predict.predict_chunks(
+                    model, csv_path, smiles_col, protein_col, backend,
+                    chunk_rows=settings.PHARMALNET_PREDICT_CHUNK_ROWS, as_text=True, domain=domain
+                ),
+                meta={"model_id": model_id, "backend": backend, "filename": filename}
+            )
 
-        safe_preview = df.head(5).applymap(make_json_safe).to_dict(orient="records")
-        safe_full = df.applymap(make_json_safe).to_dict(orient="records")
+            if total == 0:
+                results.delete_result(result_id)
+                return JsonResponse({"error": "Empty SMILES or Protein sequence provided."}, status=400)
+
+            tracker.stage("serialize")
+            summary = {
+                "message": "✅ Prediction successful!",
+                "total_records": total,
+                "backend": backend,
+                "model_id": model_id,
+                "result_id": result_id,
+                "results_url": reverse("pharmalnet_result", args=[result_id]),
+                "download_url": reverse("pharmalnet_result_download", args=[result_id]),
+                "expires": results.read_result(result_id)["expires"],
+                "model_cache": registry.get_model_cache().stats(),
+                "feature_cache": feature_cache.counters(since=cache_snapshot),
+            }
 
-        print(f"✅ Returning {len(df)} predictions safely as JSON.")
+            # ✅ Columnar response: predictions in input row order, no per-row JSON conversion
+            if columnar.wants_columnar(request):
+                return columnar.columnar_response(
+                    {"Predicted": results.load_predicted(result_id)}, meta={**summary, "memory": tracker.stop()}
+                )
 
-        return JsonResponse({
-            "message": "✅ Prediction successful!",
-            "total_records": len(df),
-            "preview": safe_preview,   # shows first 5
-            "full_data": safe_full     # for 'Show More'
-        }, safe=False)
+            print(f"✅ Stored {total} predictions as result {result_id}")
+            return JsonResponse({
+                **summary,
+                "memory": tracker.stop(),
+                "preview": results.query(result_id, limit=5)["rows"],   # first 5; the page fetches more from results_url
+            })
 
         # ✅ CASE 2: Manual SMILES + Protein input
-        
         smiles = request.POST.get("smiles")
         protein = request.POST.get("protein")
 
         if smiles and protein:
-            dummy_y = [0]  # ✅ Added dummy Y for compatibility
-            X_pred = utils.data_process(
-                X_drug=[smiles],
-                X_target=[protein],
-                y=dummy_y,  # ✅ fix added
-                drug_encoding=model.drug_encoding,
-                target_encoding=model.target_encoding,
-                split_method="no_split"
+            tracker.stage("predict")
+            return _pair_prediction_response(
+                model_id, model, smiles, protein, backend, domain=_domain(model_id, model, request.user.id)
             )
 
-            if X_pred is None:
-                return JsonResponse({"error": "Invalid SMILES or Protein input."}, status=400)
-
-            y_pred = model.predict(X_pred)
-            if y_pred is None:
-                return JsonResponse({"error": "Prediction failed due to invalid inputs."}, status=500)
+        return JsonResponse({"error": "No valid input provided (CSV or manual)."}, status=400)
 
-            return JsonResponse({
-                "message": "✅ Prediction successful!",
-                "prediction": float(y_pred[0])
-            })
+    except MemoryBudgetExceeded as e:
+        print("❌ Memory budget exceeded in run_pharmalnet_prediction:", e)
+        return JsonResponse({"error": str(e), "memory": tracker.stop()}, status=413)
 
-        return JsonResponse({"error": "No valid input provided (CSV or manual)."}, status=400)
+    except workspace.WorkspaceQuotaExceeded as e:
+        return JsonResponse({"error": str(e)}, status=413)
 
     except Exception as e:
         print("❌ Error in run_pharmalnet_prediction:", e)
         import traceback
         print(traceback.format_exc())
         return JsonResponse({"error": str(e)}, status=500)
+
+    finally:
+        tracker.stop()
+        if ws is not None:
+            ws.close()
@@ -1,7 +1,6 @@
 import os
 import numpy as np
 import pandas as pd
-import matplotlib
 import tempfile
 import shutil
 import warnings
@@ -9,143 +8,180 @@ import traceback
 import random
 import zipfile
 
-# ✅ Use non-GUI backend for server compatibility
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-
 from sklearn.metrics import mean_squared_error, r2_score
 from DeepPurpose import utils, DTI as models
 
+from .featurize import data_process
+from .ingest import load_training_frame
+from .trainer import train_model
+from .memory import MemoryBudgetExceeded
+from . import applicability, plots
+
 warnings.filterwarnings("ignore")
 
 
+# ✅ Default training hyperparameters (a search can override any of them)
+DEFAULT_HPARAMS = {
+    "cls_hidden_dims": [512, 256],
+    "train_epoch": 10,
+    "LR": 0.0005,
+    "batch_size": 32,
+}
+
+
+def build_config(**hparams):
+    """DeepPurpose config for the Morgan / Conjoint_triad model with hyperparameter overrides."""
+    return utils.generate_config(
+        drug_encoding="Morgan",
+        target_encoding="Conjoint_triad",
+        **{**DEFAULT_HPARAMS, **hparams}
+    )
+
+
+def prepare_dataset(file_path, Smiles, Protein, value_name, progress, memory_budget_mb=256, seed=None):
+    """
+    Load, clean, encode and split a training CSV → (train, val, test) frames.
+    Pass the same seed to get the same split again (e.g. when resuming a job).
+    """
+    progress("stage", stage="load")
+    print(f"✅ Loading dataset: {file_path}")
+
+    # ✅ Load + clean in chunks (only the 3 needed columns, bounded by memory_budget_mb)
+    df, original_rows = load_training_frame(
+        file_path, Smiles, Protein, value_name, memory_budget_mb=memory_budget_mb
+    )
+    progress("stage", stage="clean", rows=original_rows)
+    print("✅ Cleaned rows:", len(df))
+
+    X_drugs = df[Smiles].tolist()
+    X_targets = df[Protein].tolist()
+    y = df["normalized"].tolist()
+
+    # ✅ Random split
+    progress("stage", stage="encode", rows=len(df))
+    seed = seed or random.randint(1, 9999)
+    print(f"🔁 Using random split seed: {seed}")
+
+    train, val, test = data_process(
+        X_drugs, X_targets, y,
+        drug_encoding="Morgan",
+        target_encoding="Conjoint_triad",
+        split_method="random",
+        frac=[0.7, 0.1, 0.2],
+        random_seed=seed
+    )
+    return train, val, test
+
+
+def evaluate_and_package(model, test, model_name, progress, train=None, workdir=None):
+    """
+    Score a trained model on the test split and zip the model folder.
+    With `train`, its drug fingerprints go into the ZIP for applicability-domain checks.
+    Files are written to `workdir` (the caller's workspace), or a new temp folder.
+    Returns (model_dir, zip_path, metrics, y_true, y_pred, plot_data_path); the plot
+    itself is drawn later from plot_data_path (see plots.render_plot).
+    """
+    # ✅ Evaluate
+    progress("stage", stage="evaluate")
+    y_pred = model.predict(test)
+    y_true = pd.Series(test.Label.values)
+
+    r2 = float(r2_score(y_true, y_pred))
+    mse = float(mean_squared_error(y_true, y_pred))
+    corr = float(np.corrcoef(y_true, y_pred)[0, 1])
+    metrics = {"R2": r2, "MSE": mse, "Corr": corr}
+    print(f"📈 R²: {r2:.3f}, MSE: {mse:.3f}, Corr: {corr:.3f}")
+
+    # ✅ Save model to the workspace (or a temp directory)
+    temp_dir = workdir or tempfile.mkdtemp(prefix="pharmalnet_")
+    model_dir = os.path.join(temp_dir, model_name)
+    os.makedirs(model_dir, exist_ok=True)
+
+    model.save_model(model_dir)  # ⬅️ saves model.pt, config.pkl, result.pkl
+
+    # ✅ Save metrics (+ the points to plot, kept out of the model ZIP)
+    plot_data_path = plots.save_plot_data(temp_dir, y_true, y_pred)
+
+    metrics_path = os.path.join(model_dir, "metrics.txt")
+    with open(metrics_path, "w") as f:
+        for k, v in metrics.items():
+            f.write(f"{k}: {v}\n")
+
+    if train is not None:
+        applicability.save_training_fingerprints(model_dir, train, model.drug_encoding)
+
+    # ✅ Create clean ZIP manually (flat structure, no nested folder)
+    progress("stage", stage="zip")
+    zip_path = os.path.join(temp_dir, f"{model_name}_trained_model.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(model_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                # ⛔ Skip existing or empty zips
+                if file.endswith(".zip") or os.path.getsize(file_path) == 0:
+                    continue
+                arcname = os.path.basename(file_path)  # keep flat structure
+                zipf.write(file_path, arcname)
+
+    print(f"💾 Model folder zipped successfully at: {zip_path}")
+
+    return (
+        model_dir,
+        zip_path,
+        metrics,
+        y_true.tolist() if hasattr(y_true, "tolist") else list(y_true),
+        y_pred if isinstance(y_pred, list) else y_pred.tolist(),
+        plot_data_path
+    )
+
+
 def protein_smiles_uploads(
     file_path,
     model_name="pharmalnet_model",
     Smiles="Smiles",
     Protein="seq1",
-    value_name="Value"
+    value_name="Value",
+    progress=None,
+    memory_budget_mb=256,
+    seed=None,
+    checkpoint_path=None,
+    checkpoint_every=1,
+    patience=None,
+    workdir=None
 ):
+    # progress(event, **data) receives stage / epoch events (e.g. for live job streaming)
+    progress = progress or (lambda event, **data: None)
+
     try:
-        print(f"✅ Loading dataset: {file_path}")
-        df = pd.read_csv(file_path)
-        print("✅ Original rows:", len(df))
-        print(f"📊 Columns found: {list(df.columns)}")
-
-        # ✅ Validate columns
-        if Smiles not in df.columns or Protein not in df.columns or value_name not in df.columns:
-            raise ValueError(f"❌ Column names not found! Available columns: {list(df.columns)}")
-
-        # ✅ Clean dataset
-        df = df.dropna(subset=[Smiles, Protein, value_name]).copy()
-        df["seq_len"] = df[Protein].astype(str).apply(len)
-        df = df[df[value_name].astype(float) > 0].copy()
-        df["normalized"] = np.log10(df[value_name].astype(float))
-        df.replace([np.inf, -np.inf], np.nan, inplace=True)
-        df.dropna(inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        print("✅ Cleaned rows:", len(df))
-
-        X_drugs = df[Smiles].astype(str).tolist()
-        X_targets = df[Protein].astype(str).tolist()
-        y = df["normalized"].astype(float).tolist()
-
-        # ✅ Random split
-        seed = random.randint(1, 9999)
-        print(f"🔁 Using random split seed: {seed}")
-
-        train, val, test = utils.data_process(
-            X_drugs, X_targets, y,
-            drug_encoding="Morgan",
-            target_encoding="Conjoint_triad",
-            split_method="random",
-            frac=[0.7, 0.1, 0.2],
-            random_seed=seed
+        train, val, test = prepare_dataset(
+            file_path, Smiles, Protein, value_name, progress, memory_budget_mb=memory_budget_mb, seed=seed
         )
 
         # ✅ Model config
-        config = utils.generate_config(
-            drug_encoding="Morgan",
-            target_encoding="Conjoint_triad",
-            cls_hidden_dims=[512, 256],
-            train_epoch=10,
-            LR=0.0005,
-            batch_size=32
-        )
+        config = build_config()
 
         model = models.model_initialize(**config)
         print("🚀 Training started...")
-        model.train(train, val, test)
+        progress("stage", stage="train", epochs=config["train_epoch"])
+        # ✅ Early stopping on val loss + checkpoints so an interrupted job resumes mid-training
+        history = train_model(
+            model, train, val,
+            on_epoch=lambda epoch, train_loss, val_loss: progress(
+                "epoch", epoch=epoch, epochs=config["train_epoch"], train_loss=train_loss, val_loss=val_loss
+            ),
+            checkpoint_path=checkpoint_path,
+            checkpoint_every=checkpoint_every,
+            patience=patience
+        )
+        if history and history[-1]["epoch"] < config["train_epoch"]:
+            progress("stage", stage="early_stop", epoch=history[-1]["epoch"])
         print("✅ Training complete!")
 
-        # ✅ Evaluate
-        y_pred = model.predict(test)
-        y_true = pd.Series(test.Label.values)
-
-        r2 = float(r2_score(y_true, y_pred))
-        mse = float(mean_squared_error(y_true, y_pred))
-        corr = float(np.corrcoef(y_true, y_pred)[0, 1])
-        metrics = {"R2": r2, "MSE": mse, "Corr": corr}
-        print(f"📈 R²: {r2:.3f}, MSE: {mse:.3f}, Corr: {corr:.3f}")
-
-        # ✅ Plot Actual vs Predicted
-        plt.figure(figsize=(8, 6))
-        plt.scatter(y_true, y_pred, alpha=0.6, color="#007bff", label="Data Points")
-
-        # Regression line
-        m, b = np.polyfit(y_true, y_pred, 1)
-        plt.plot(y_true, m * np.array(y_true) + b, color="black", linestyle="--", linewidth=1.5, label="Best Fit Line")
-
-        # Ideal diagonal
-        lim_min, lim_max = float(min(y_true.min(), np.min(y_pred))), float(max(y_true.max(), np.max(y_pred)))
-        plt.plot([lim_min, lim_max], [lim_min, lim_max], "r--", linewidth=1, label="Ideal Fit (y=x)")
-
-        plt.xlabel("Actual Values (log10 IC50)")
-        plt.ylabel("Predicted Values (log10 IC50)")
-        plt.title("Actual vs Predicted — Pharmal-Net")
-        plt.legend()
-        plt.tight_layout()
-
-        # ✅ Save model to temp directory
-        temp_dir = tempfile.mkdtemp(prefix="pharmalnet_")
-        model_dir = os.path.join(temp_dir, model_name)
-        os.makedirs(model_dir, exist_ok=True)
-
-        model.save_model(model_dir)  # ⬅️ saves model.pt, config.pkl, result.pkl
-
-        # ✅ Save graph & metrics
-        graph_path = os.path.join(model_dir, "graph.png")
-        plt.savefig(graph_path, dpi=300)
-        plt.close()
-
-        metrics_path = os.path.join(model_dir, "metrics.txt")
-        with open(metrics_path, "w") as f:
-            for k, v in metrics.items():
-                f.write(f"{k}: {v}\n")
-
-        # ✅ Create clean ZIP manually (flat structure, no nested folder)
-        zip_path = os.path.join(temp_dir, f"{model_name}_trained_model.zip")
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(model_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    # ⛔ Skip existing or empty zips
-                    if file.endswith(".zip") or os.path.getsize(file_path) == 0:
-                        continue
-                    arcname = os.path.basename(file_path)  # keep flat structure
-                    zipf.write(file_path, arcname)
-
-        print(f"💾 Model folder zipped successfully at: {zip_path}")
-
-        return (
-            model_dir,
-            zip_path,
-            metrics,
-            y_true.tolist() if hasattr(y_true, "tolist") else list(y_true),
-            y_pred if isinstance(y_pred, list) else y_pred.tolist(),
-            graph_path
-        )
+        return evaluate_and_package(model, test, model_name, progress, train=train, workdir=workdir)
 
+    except MemoryBudgetExceeded:
+        # Let the job report the budget error instead of a generic training failure
+        raise
     except Exception as e:
         print("❌ Error in protein_smiles_uploads:", e)
         print(traceback.format_exc())
@@ -0,0 +1,163 @@
+import os
+import io
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+from django.conf import settings
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def feature_key(encoding, value):
+    """Content address of one encoded input: (encoding name, sha256 of the SMILES / sequence)."""
+    digest = hashlib.sha256(str(value).encode("utf-8")).hexdigest()
+    return f"{encoding}:{digest}"
+
+
+def _dump_array(array):
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+def _load_array(blob):
+    return np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+class FeatureCache:
+    """
+    Disk-backed cache of drug / target encodings shared by every process on the host.
+
+    Entries live in one SQLite file keyed by feature_key(); when the stored bytes
+    exceed max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                " key TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " data BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS features_last_used ON features (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # ---------------- LOOKUP ----------------
+    def get_many(self, encoding, values):
+        """Return {value: array} for every value already cached (and mark them as recently used)."""
+        keys = {feature_key(encoding, v): v for v in values}
+        found = {}
+        if not keys:
+            return found
+
+        with self._connect() as conn:
+            key_list = list(keys)
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, data FROM features WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = _load_array(blob)
+
+            now = time.time()
+            conn.executemany(
+                "UPDATE features SET last_used = ? WHERE key = ?",
+                [(now, feature_key(encoding, v)) for v in found],
+            )
+        return found
+
+    def put_many(self, encoding, encoded):
+        """Store {value: array} and evict least recently used entries past the size bound."""
+        if not encoded:
+            return
+
+        now = time.time()
+        rows = []
+        for value, array in encoded.items():
+            blob = _dump_array(array)
+            rows.append((feature_key(encoding, value), len(blob), now, blob))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO features (key, size, last_used, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM features").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Trim to 90% of the bound so we don't evict again on the very next insert
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM features ORDER BY last_used ASC"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM features WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def get_or_encode(self, encoding, values, encoder, encode_many=None):
+        """
+        Encode a list of distinct inputs, computing only the ones not cached yet.
+        encode_many(encoder, values) → list of arrays can replace the serial loop
+        (e.g. featurize.encode_values, which spreads the misses over a process pool).
+        Returns one array per input value, in order.
+        """
+        cached = self.get_many(encoding, values)
+        missing = [v for v in values if v not in cached]
+        self.hits += len(values) - len(missing)
+        self.misses += len(missing)
+        encode_many = encode_many or (lambda encoder, values: [encoder(v) for v in values])
+        computed = dict(zip(missing, encode_many(encoder, missing)))
+
+        self.put_many(encoding, computed)
+        return [cached[v] if v in cached else computed[v] for v in values]
+
+    # ---------------- STATS ----------------
+    def counters(self, since=None):
+        """Hit / miss / eviction counts, optionally relative to an earlier counters() snapshot."""
+        current = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        if since:
+            current = {k: v - since.get(k, 0) for k, v in current.items()}
+        return current
+
+    def size(self):
+        """(entries, stored bytes) currently on disk."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM features").fetchone()
+
+
+def get_feature_cache():
+    """Process-wide FeatureCache configured from settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeatureCache(
+                os.path.join(str(settings.PHARMALNET_WORK_ROOT), "cache", "features.sqlite3"),
+                max_bytes=settings.PHARMALNET_FEATURE_CACHE_MB * 1024 * 1024,
+            )
+    return _cache
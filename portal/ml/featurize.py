@@ -0,0 +1,188 @@
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from DeepPurpose import utils
+
+from . import memory
+from .feature_cache import get_feature_cache
+
+
+# ✅ Encodings served through the feature cache (per-input encoders from DeepPurpose)
+DRUG_ENCODERS = {
+    "Morgan": utils.smiles2morgan,
+}
+TARGET_ENCODERS = {
+    "Conjoint_triad": utils.protein2ct,
+}
+
+# Approximate bytes of one encoded input (float64 vectors), for memory budget checks
+ENCODED_BYTES = {
+    "Morgan": 1024 * 8,
+    "Conjoint_triad": 343 * 8,
+}
+
+_pool = None
+_pool_workers = 0
+_pool_users = 0
+_idle_timer = None
+_pool_lock = threading.Lock()
+
+
+# ---------------- PARALLEL ENCODING ----------------
+# Every process (web worker, job process) owns its own pool, each holding DeepPurpose and
+# torch → it only lives while in use: stopped after each job (jobs.run_job) and after
+# PHARMALNET_FEATURIZE_IDLE_SECONDS without work.
+def _acquire_pool(workers):
+    """The process' encoding pool, created on first use and kept while a batch uses it."""
+    global _pool, _pool_workers, _pool_users, _idle_timer
+    with _pool_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # ✅ spawn: never fork a process that already has torch threads running
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        _pool_users += 1
+        return _pool
+
+
+def _release_pool():
+    global _pool_users, _idle_timer
+    with _pool_lock:
+        _pool_users -= 1
+        idle = settings.PHARMALNET_FEATURIZE_IDLE_SECONDS
+        if _pool_users == 0 and _pool is not None and idle > 0:
+            _idle_timer = threading.Timer(idle, shutdown_pool, kwargs={"only_idle": True})
+            _idle_timer.daemon = True
+            _idle_timer.start()
+
+
+def shutdown_pool(only_idle=False):
+    """Stop the encoding pool's processes; the next large batch starts a new pool."""
+    global _pool, _idle_timer
+    with _pool_lock:
+        if only_idle and _pool_users:
+            return
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def encode_values(encoder, values, workers=None, min_parallel=None):
+    """
+    [encoder(v) for v in values], with large batches split into chunks across a process
+    pool (PHARMALNET_FEATURIZE_WORKERS). Order and values are the same as the serial loop.
+    """
+    global _pool
+    workers = workers or settings.PHARMALNET_FEATURIZE_WORKERS
+    if min_parallel is None:
+        min_parallel = settings.PHARMALNET_FEATURIZE_MIN_PARALLEL
+    if workers <= 1 or len(values) < min_parallel:
+        return [encoder(v) for v in values]
+
+    # A few chunks per worker evens out slow (long) inputs without per-item IPC
+    chunksize = math.ceil(len(values) / (workers * 4))
+    pool = _acquire_pool(workers)
+    try:
+        return list(pool.map(encoder, values, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A pool process died (e.g. OOM-killed) → fresh pool next time, serial this time
+        print("⚠️ Featurization pool was broken, encoding serially")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return [encoder(v) for v in values]
+    finally:
+        _release_pool()
+
+
+def encode_column(values, encoding, encoder, cache=None):
+    """
+    Encode each distinct SMILES / sequence once and broadcast the result back to every row.
+    DTI datasets repeat a few dozen targets across tens of thousands of rows, so hashing,
+    cache lookups and encoding all scale with the number of unique inputs, not rows.
+    """
+    cache = cache or get_feature_cache()
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=False)
+    memory.reserve(len(uniques) * ENCODED_BYTES.get(encoding, 0), f"{encoding} encoding of {len(uniques)} inputs")
+    encoded = cache.get_or_encode(encoding, uniques.tolist(), encoder, encode_many=encode_values)
+    # Rows sharing an input share one (read-only) array object
+    return [encoded[code] for code in codes], len(uniques)
+
+
+def encode_matrix(values, encoding, encoders=None):
+    """
+    Encode a batch into one float32 matrix (row i = values[i]), deduplicating within the
+    batch but bypassing the feature cache: for streaming large compound libraries, where
+    caching every compound once would only churn the cache.
+    """
+    encoder = (encoders or {**DRUG_ENCODERS, **TARGET_ENCODERS})[encoding]
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=False)
+    memory.reserve(len(uniques) * ENCODED_BYTES.get(encoding, 0), f"{encoding} encoding of {len(uniques)} inputs")
+    encoded = np.stack([np.asarray(v, dtype=np.float32) for v in encode_values(encoder, uniques.tolist())])
+    return encoded[codes]
+
+
+def data_process(
+    X_drug,
+    X_target,
+    y,
+    drug_encoding,
+    target_encoding,
+    split_method="random",
+    frac=(0.7, 0.1, 0.2),
+    random_seed=1,
+    cache=None
+):
+    """
+    Drop-in replacement for DeepPurpose's utils.data_process (DTI mode, 'random' and
+    'no_split' splits) that reads/writes encodings through the shared feature cache
+    (or `cache`). Other encodings fall back to DeepPurpose unchanged.
+    """
+    if drug_encoding not in DRUG_ENCODERS or target_encoding not in TARGET_ENCODERS:
+        return utils.data_process(
+            X_drug, X_target, y,
+            drug_encoding=drug_encoding,
+            target_encoding=target_encoding,
+            split_method=split_method,
+            frac=list(frac),
+            random_seed=random_seed
+        )
+
+    df_data = pd.DataFrame({"SMILES": list(X_drug), "Target Sequence": list(X_target), "Label": list(y)})
+    print(f"in total: {len(df_data)} drug-target pairs")
+
+    cache = cache or get_feature_cache()
+    snapshot = cache.counters()
+
+    df_data["drug_encoding"], n_drugs = encode_column(
+        df_data["SMILES"].tolist(), drug_encoding, DRUG_ENCODERS[drug_encoding], cache
+    )
+    df_data["target_encoding"], n_targets = encode_column(
+        df_data["Target Sequence"].tolist(), target_encoding, TARGET_ENCODERS[target_encoding], cache
+    )
+    print(f"🧬 Encoded {n_drugs} unique drugs, {n_targets} unique targets")
+
+    stats = cache.counters(since=snapshot)
+    print(f"🗃️ Feature cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    if split_method == "no_split":
+        return df_data.reset_index(drop=True)
+
+    if split_method == "random":
+        train, val, test = utils.create_fold(df_data, random_seed, list(frac))
+        return train.reset_index(drop=True), val.reset_index(drop=True), test.reset_index(drop=True)
+
+    raise ValueError(f"Unsupported split method: {split_method}")
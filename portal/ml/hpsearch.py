@@ -0,0 +1,248 @@
+import os
+import math
+import json
+import random
+import pickle
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# ✅ Hyperparameters a search may vary, and the value type of each
+SEARCHABLE = {
+    "cls_hidden_dims": list,
+    "LR": float,
+    "batch_size": int,
+    "decay": float,
+}
+
+_datasets = {}
+
+
+def _check_value(name, value):
+    """Raise ValueError unless `value` is a usable setting of hyperparameter `name`."""
+    kind = SEARCHABLE[name]
+    if kind is list:
+        ok = (
+            isinstance(value, list) and value
+            and all(isinstance(d, int) and not isinstance(d, bool) and d > 0 for d in value)
+        )
+        expected = "a non-empty list of positive layer sizes"
+    elif kind is int:
+        ok = isinstance(value, int) and not isinstance(value, bool) and value > 0
+        expected = "a positive whole number"
+    else:
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        ok = ok and (value > 0 if name == "LR" else value >= 0)
+        expected = "a positive number" if name == "LR" else "a number ≥ 0"
+    if not ok:
+        raise ValueError(f"'{name}' value {json.dumps(value)} is not {expected}.")
+
+
+# ---------------- SEARCH SPACE ----------------
+def parse_search_space(raw):
+    """
+    Validate a search space given as JSON, e.g.
+
+        {"LR": {"low": 1e-4, "high": 1e-2, "log": true},
+         "batch_size": [32, 64],
+         "cls_hidden_dims": [[512, 256], [1024, 512, 256]]}
+
+    A list is a set of choices; {"low", "high", "log"} is a continuous range.
+    """
+    space = json.loads(raw) if isinstance(raw, str) else raw
+    if not isinstance(space, dict) or not space:
+        raise ValueError("Search space must be a non-empty JSON object.")
+
+    for name, values in space.items():
+        if name not in SEARCHABLE:
+            raise ValueError(f"Cannot search over '{name}'. Allowed: {', '.join(SEARCHABLE)}")
+        if isinstance(values, list):
+            if not values:
+                raise ValueError(f"'{name}' has no values to choose from.")
+            for value in values:
+                _check_value(name, value)
+        elif isinstance(values, dict):
+            if SEARCHABLE[name] is not float or "low" not in values or "high" not in values:
+                raise ValueError(f"'{name}' must be a list of values (ranges need 'low' and 'high' and only work for LR / decay).")
+            _check_value(name, values["low"])
+            _check_value(name, values["high"])
+            low, high = float(values["low"]), float(values["high"])
+            if low > high or (values.get("log") and low <= 0):
+                raise ValueError(f"'{name}' range is invalid (low must be ≤ high, and > 0 for log ranges).")
+        else:
+            raise ValueError(f"'{name}' must be a list of values or a {{low, high}} range.")
+    return space
+
+
+def parse_trial_count(raw):
+    """Number of trials from a form field: None when blank, else a whole number ≥ 1."""
+    if raw in (None, ""):
+        return None
+    try:
+        n_trials = int(raw)
+    except ValueError:
+        raise ValueError("The number of trials must be a whole number.") from None
+    if n_trials < 1:
+        raise ValueError("The number of trials must be at least 1.")
+    return n_trials
+
+
+def sample_trials(space, n_trials=None, seed=0):
+    """
+    Trial hyperparameter sets: the full grid when the space is all choices and fits in
+    n_trials, otherwise n_trials random samples.
+    """
+    if n_trials is not None and n_trials < 1:
+        raise ValueError("The number of trials must be at least 1.")
+    rng = random.Random(seed)
+    is_grid = all(isinstance(v, list) for v in space.values())
+
+    if is_grid:
+        grid = [dict(zip(space, combo)) for combo in itertools.product(*space.values())]
+        if n_trials is None or n_trials >= len(grid):
+            return grid
+        return rng.sample(grid, n_trials)
+
+    def draw(values):
+        if isinstance(values, list):
+            return rng.choice(values)
+        low, high = float(values["low"]), float(values["high"])
+        if values.get("log"):
+            return math.exp(rng.uniform(math.log(low), math.log(high)))
+        return rng.uniform(low, high)
+
+    return [{name: draw(values) for name, values in space.items()} for _ in range(n_trials or 8)]
+
+
+# ---------------- TRIAL WORKER ----------------
+def _load_dataset(data_path):
+    # Each worker process unpickles the encoded splits once and reuses them for every rung
+    if data_path not in _datasets:
+        with open(data_path, "rb") as f:
+            _datasets[data_path] = pickle.load(f)
+    return _datasets[data_path]
+
+
+def run_trial(data_path, trial_dir, hparams, max_epochs, until_epoch, threads):
+    """
+    Train one trial up to `until_epoch`, continuing from its checkpoint.
+    Saves the best-so-far model to trial_dir/model and returns its validation loss.
+    """
+    # The training stack is only loaded by the workers that train: the search-space
+    # parsing and rung schedule above import without torch / DeepPurpose
+    import torch
+    from DeepPurpose import DTI as models
+
+    from .dti_processor import build_config
+    from .trainer import train_model
+
+    torch.set_num_threads(threads)
+    train, val = _load_dataset(data_path)
+
+    config = build_config(**hparams, train_epoch=max_epochs)
+    model = models.model_initialize(**config)
+    history = train_model(
+        model, train, val,
+        until_epoch=until_epoch,
+        checkpoint_path=os.path.join(trial_dir, "checkpoint.pt")
+    )
+
+    model_dir = os.path.join(trial_dir, "model")
+    os.makedirs(model_dir, exist_ok=True)
+    model.save_model(model_dir)
+
+    val_losses = [h["val_loss"] for h in history if h["val_loss"] is not None]
+    return min(val_losses) if val_losses else None
+
+
+# ---------------- SUCCESSIVE HALVING ----------------
+def _loss_key(entry):
+    return entry["val_loss"] if entry["val_loss"] is not None else math.inf
+
+
+def next_rung(alive, epochs, max_epochs, eta=3):
+    """
+    After a rung trained `alive` to `epochs`: (survivors, epochs of the next rung), or
+    (survivors, None) once the search is over. Survivors are the best 1/eta by validation
+    loss; a lone survivor goes straight on to max_epochs, so the winner is fully trained.
+    Marks the failed / pruned entries' status.
+    """
+    alive = sorted((e for e in alive if e["status"] != "failed"), key=_loss_key)
+    if not alive or epochs >= max_epochs:
+        return alive, None
+
+    keep = max(1, math.ceil(len(alive) / eta))
+    for entry in alive[keep:]:
+        entry["status"] = "pruned"
+    return alive[:keep], max_epochs if keep == 1 else min(epochs * eta, max_epochs)
+
+
+def successive_halving(
+    search_dir,
+    train,
+    val,
+    trials,
+    max_epochs=10,
+    min_epochs=1,
+    eta=3,
+    workers=None,
+    progress=None
+):
+    """
+    Run trials in parallel, pruning by validation loss: every rung trains the survivors
+    to `epochs` (starting at min_epochs, × eta per rung, capped at max_epochs) and only
+    the best 1/eta go on; the last one left is trained to max_epochs (see next_rung).
+    Returns the leaderboard, best trial first.
+    """
+    progress = progress or (lambda event, **data: None)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(trials)))
+    # Split the cores between trials so parallel trials don't oversubscribe them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    data_path = os.path.join(search_dir, "data.pkl")
+    with open(data_path, "wb") as f:
+        pickle.dump((train, val), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    board = []
+    for trial_id, hparams in enumerate(trials):
+        trial_dir = os.path.join(search_dir, f"trial_{trial_id}")
+        os.makedirs(trial_dir, exist_ok=True)
+        board.append({
+            "trial": trial_id, "params": hparams, "status": "running",
+            "epochs": 0, "val_loss": None, "model_dir": os.path.join(trial_dir, "model"),
+        })
+
+    alive = list(board)
+    # Nothing to prune with a single trial → train it to max_epochs right away
+    epochs = max_epochs if len(board) == 1 else min(min_epochs, max_epochs)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        while True:
+            futures = {
+                pool.submit(
+                    run_trial, data_path, os.path.dirname(entry["model_dir"]),
+                    entry["params"], max_epochs, epochs, threads
+                ): entry
+                for entry in alive
+            }
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    entry["val_loss"] = future.result()
+                except Exception as e:
+                    print(f"❌ Trial {entry['trial']} failed:", e)
+                    entry["status"], entry["error"] = "failed", str(e)
+                entry["epochs"] = epochs
+                progress("trial", trial=entry["trial"], epochs=epochs, val_loss=entry["val_loss"])
+
+            alive, epochs = next_rung(alive, epochs, max_epochs, eta)
+            if epochs is None:
+                break
+            print(f"✂️ Rung done: {len(alive)} trials continue to {epochs} epochs")
+
+    for entry in alive:
+        entry["status"] = "completed"
+
+    # Completed trials first, then by how far a trial got, then by validation loss
+    return sorted(board, key=lambda e: (e["status"] != "completed", -e["epochs"], _loss_key(e)))
@@ -0,0 +1,130 @@
+import copy
+import threading
+
+import numpy as np
+import torch
+from django.conf import settings
+
+from .trainer import make_loader
+
+
+# ✅ Inference backends for a loaded DeepPurpose model:
+#   eager        – the PyTorch network itself, under inference_mode
+#   torchscript  – traced + frozen TorchScript graph (fused ops, no Python overhead per layer)
+#   quantized    – dynamic int8 quantization of the Linear layers (the MLP encoders + head)
+BACKENDS = ("eager", "torchscript", "quantized")
+
+INFERENCE_BATCH_SIZE = 256
+
+_threads_lock = threading.Lock()
+_threads_configured = False
+
+
+def configure_threads():
+    """
+    Pin torch's intra-op threads once per process. With several web workers on one box,
+    the default (one thread per core in every worker) oversubscribes the CPU.
+    """
+    global _threads_configured
+    with _threads_lock:
+        if _threads_configured:
+            return
+        torch.set_num_threads(settings.PHARMALNET_INFERENCE_THREADS)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # already fixed once torch has run parallel work in this process
+        _threads_configured = True
+
+
+def _build(net, backend, example):
+    net = net.eval()
+    if backend == "eager":
+        return net
+
+    if backend == "torchscript":
+        with torch.no_grad():
+            traced = torch.jit.trace(net, example)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+    if backend == "quantized":
+        # Dynamic quantization is CPU-only and works on a copy (the eager net stays float)
+        return torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(net).cpu(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    raise ValueError(f"Unknown inference backend: {backend}. Choose one of: {', '.join(BACKENDS)}")
+
+
+def get_backend(model, backend, example):
+    """Build (once per loaded model) and return the module that serves `backend`."""
+    # Loaded models are shared by concurrent requests (ModelCache): one build per model,
+    # whoever asks first (dict.setdefault is atomic, so they all get the same lock)
+    lock = model.__dict__.setdefault("_inference_lock", threading.Lock())
+    with lock:
+        built = model.__dict__.setdefault("_inference_backends", {})
+        if backend not in built:
+            built[backend] = _build(model.model, backend, example)
+        return built[backend]
+
+
+def _outputs(model, score):
+    # Like DeepPurpose's predict(): a binary classifier's logits become probabilities
+    if getattr(model, "binary", False):
+        score = torch.sigmoid(score)
+    return torch.squeeze(score, 1).cpu().numpy()
+
+
+def predict(model, df, backend="eager", batch_size=INFERENCE_BATCH_SIZE):
+    """
+    Batched prediction over an encoded frame (output of featurize.data_process with
+    split_method='no_split'). Returns a list of floats, like model.predict().
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}. Choose one of: {', '.join(BACKENDS)}")
+
+    configure_threads()
+    device = torch.device("cpu") if backend == "quantized" else model.device
+    module = None
+    outputs = []
+
+    for v_d, v_p, _ in make_loader(df, model.config, shuffle=False, batch_size=batch_size):
+        v_d, v_p = v_d.float().to(device), v_p.float().to(device)
+        if module is None:
+            module = get_backend(model, backend, (v_d, v_p))
+        with torch.inference_mode():
+            score = module(v_d, v_p)
+        outputs.append(_outputs(model, score))
+
+    return np.concatenate(outputs).tolist() if outputs else []
+
+
+def predict_arrays(model, drug_matrix, target_matrix, backend="eager", batch_size=INFERENCE_BATCH_SIZE):
+    """
+    Batched prediction straight from encoded matrices (vector encodings such as Morgan /
+    Conjoint_triad), skipping the DataFrame + DataLoader round trip. A target_matrix with
+    one row is broadcast to every drug. Returns a float32 numpy array.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}. Choose one of: {', '.join(BACKENDS)}")
+
+    configure_threads()
+    device = torch.device("cpu") if backend == "quantized" else model.device
+    drugs = torch.from_numpy(np.ascontiguousarray(drug_matrix, dtype=np.float32))
+    targets = torch.from_numpy(np.ascontiguousarray(target_matrix, dtype=np.float32))
+    module = None
+    outputs = []
+
+    for start in range(0, len(drugs), batch_size):
+        v_d = drugs[start:start + batch_size].to(device)
+        if len(targets) == 1:
+            v_p = targets.to(device).expand(len(v_d), -1)
+        else:
+            v_p = targets[start:start + batch_size].to(device)
+        if module is None:
+            module = get_backend(model, backend, (v_d, v_p))
+        with torch.inference_mode():
+            score = module(v_d, v_p)
+        outputs.append(_outputs(model, score))
+
+    return np.concatenate(outputs).astype(np.float32) if outputs else np.zeros(0, dtype=np.float32)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from . import memory
+
+# Parser buffers + per-chunk intermediates cost a few times the parsed chunk itself
+CHUNK_OVERHEAD_FACTOR = 4
+SAMPLE_ROWS = 1000
+MIN_CHUNK_ROWS = 1000
+
+
+def _chunk_rows(file_path, usecols, dtype, memory_budget_mb):
+    """Rows per chunk so that one parsed chunk (plus overhead) fits the memory budget."""
+    sample = pd.read_csv(file_path, usecols=usecols, dtype=dtype, nrows=SAMPLE_ROWS)
+    if sample.empty:
+        return MIN_CHUNK_ROWS
+    bytes_per_row = max(1, int(sample.memory_usage(deep=True).sum() / len(sample)))
+    budget = memory_budget_mb * 1024 * 1024
+    return max(MIN_CHUNK_ROWS, budget // (bytes_per_row * CHUNK_OVERHEAD_FACTOR))
+
+
+def load_training_frame(file_path, Smiles, Protein, value_name, memory_budget_mb=256):
+    """
+    Read and clean a training CSV in bounded memory.
+
+    Only the SMILES / protein / value columns are parsed, chunk by chunk, and each
+    chunk is cleaned before the next one is read: rows missing any of the three
+    columns, non-positive values and non-finite log10 values are dropped.
+
+    Returns (frame, original row count); the frame has columns [Smiles, Protein,
+    "normalized"] where normalized is log10(value). Repeated SMILES / sequences share
+    a single string object.
+    """
+    header = pd.read_csv(file_path, nrows=0)
+    print(f"📊 Columns found: {list(header.columns)}")
+
+    # ✅ Validate columns
+    if Smiles not in header.columns or Protein not in header.columns or value_name not in header.columns:
+        raise ValueError(f"❌ Column names not found! Available columns: {list(header.columns)}")
+
+    usecols = [Smiles, Protein, value_name]
+    dtype = {Smiles: str, Protein: str, value_name: np.float64}
+    chunksize = _chunk_rows(file_path, usecols, dtype, memory_budget_mb)
+
+    interned = {}
+    total_rows = 0
+    cleaned = []
+
+    for chunk in pd.read_csv(file_path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        total_rows += len(chunk)
+        memory.check()
+
+        chunk = chunk.dropna(subset=usecols)
+        chunk = chunk[chunk[value_name] > 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = np.log10(chunk[value_name].to_numpy())
+        finite = np.isfinite(normalized)
+
+        cleaned.append(pd.DataFrame({
+            Smiles: [interned.setdefault(s, s) for s in chunk[Smiles].to_numpy()[finite]],
+            Protein: [interned.setdefault(p, p) for p in chunk[Protein].to_numpy()[finite]],
+            "normalized": normalized[finite],
+        }))
+
+    print("✅ Original rows:", total_rows)
+
+    if not cleaned:
+        return pd.DataFrame({Smiles: [], Protein: [], "normalized": []}), total_rows
+
+    df = pd.concat(cleaned, ignore_index=True)
+    return df, total_rows
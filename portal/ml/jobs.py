@@ -0,0 +1,388 @@
+import os
+import sys
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import threading
+import traceback
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import memory
+
+
+# ✅ Job kinds → dotted path of the handler that runs inside the worker process.
+# A handler is called as handler(job_id, job_path, params) and returns a JSON-safe dict.
+JOB_HANDLERS = {
+    "train": "portal.ml.dti_api.run_training_job",
+    "search": "portal.ml.dti_api.run_search_job",
+    "screen": "portal.ml.dti_api.run_screening_job",
+    "library": "portal.ml.dti_api.run_library_job",
+}
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_executor = None
+_pool_id = None
+_broken_pools = set()
+_executor_lock = threading.Lock()
+
+
+# ---------------- JOB STORAGE ----------------
+def jobs_root():
+    """Directory holding one sub-folder per job (job.json + job files)."""
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "jobs")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def job_path(job_id):
+    """Return the folder of a job, or None for a malformed job id."""
+    try:
+        job_id = uuid.UUID(str(job_id)).hex
+    except ValueError:
+        return None
+    return os.path.join(jobs_root(), job_id)
+
+
+def work_path(job_id):
+    """
+    The job's inputs and intermediates (uploaded CSV, checkpoints, search trials): kept
+    while it may still be resumed, removed once it is done or failed.
+    """
+    return os.path.join(job_path(job_id), "work")
+
+
+def _write_json(path, data):
+    # Write to a temp file + rename so pollers never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def create_job(kind, owner_id, params=None):
+    """Create a job record in the 'queued' state and return (job_id, job folder)."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job_id = uuid.uuid4().hex
+    path = job_path(job_id)
+    os.makedirs(path, exist_ok=True)
+
+    now = time.time()
+    _write_json(os.path.join(path, "job.json"), {
+        "job_id": job_id,
+        "kind": kind,
+        "owner": owner_id,
+        "status": JOB_QUEUED,
+        "created": now,
+        "updated": now,
+        "params": params or {},
+        "result": None,
+        "error": None,
+    })
+    emit_event(job_id, "status", status=JOB_QUEUED)
+    return job_id, path
+
+
+def read_job(job_id):
+    """Load a job record, or None if it does not exist."""
+    path = job_path(job_id)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "job.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def update_job(job_id, **fields):
+    """Merge fields into a job record (only the owning worker writes after submit)."""
+    job = read_job(job_id)
+    if job is None:
+        return None
+    job.update(fields)
+    job["updated"] = time.time()
+    _write_json(os.path.join(job_path(job_id), "job.json"), job)
+    return job
+
+
+def public_job(job):
+    """Status view of a job, without internal params or the (possibly large) result."""
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "error": job["error"],
+        "memory": job.get("memory"),
+    }
+
+
+# ---------------- JOB EVENTS ----------------
+def _events_path(job_id):
+    return os.path.join(job_path(job_id), "events.ndjson")
+
+
+def emit_event(job_id, event, **data):
+    """
+    Append one progress event (stage / epoch / status) to the job's event log.
+    Web processes (submit, recovery) and the job process may write at the same time:
+    each event is numbered and appended under an exclusive lock, so its line number
+    is a unique event id, in file order.
+    """
+    with open(_events_path(job_id), "ab+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            seq = f.read().count(b"\n") + 1
+            line = json.dumps({"seq": seq, "event": event, "time": time.time(), **data})
+            f.write(line.encode("utf-8") + b"\n")
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    # ✅ Progress events double as memory checkpoints for the running job
+    if event == "stage":
+        memory.stage(data["stage"])
+    else:
+        memory.check()
+
+
+def read_events(job_id, offset=0):
+    """
+    Read complete events written after byte `offset`.
+    Returns (events, new_offset) so a streamer can tail the log cheaply.
+    """
+    try:
+        with open(_events_path(job_id), "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    # Ignore a trailing line that is still being written
+    end = chunk.rfind(b"\n") + 1
+    events = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+    return events, offset + end
+
+
+def is_finished(job):
+    return job["status"] in (JOB_DONE, JOB_FAILED)
+
+
+def finish_job(job_id, status, error=None, **fields):
+    """
+    Record a job's outcome (done / failed) and drop its work folder: only job.json, the
+    events and what the handler moved next to them (e.g. the plot data) are kept.
+    """
+    update_job(job_id, status=status, error=error, finished=time.time(), **fields)
+    if error is None:
+        emit_event(job_id, "status", status=status)
+    else:
+        emit_event(job_id, "status", status=status, error=error)
+    shutil.rmtree(work_path(job_id), ignore_errors=True)
+
+
+# ---------------- WORKER POOL ----------------
+def get_executor():
+    """
+    Lazily create the process pool; returns (executor, pool id). Each web worker owns
+    its own pool, so the total number of concurrent jobs is (web workers ×
+    PHARMALNET_JOB_WORKERS). Creating the pool also picks up jobs orphaned by a
+    previous worker.
+    """
+    global _executor, _pool_id
+    with _executor_lock:
+        created = _executor is None
+        if created:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PHARMALNET_JOB_WORKERS,
+                # ✅ spawn: never fork a web worker that already has torch threads running
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_id = uuid.uuid4().hex
+        executor, pool_id = _executor, _pool_id
+    if created:
+        recover_interrupted_jobs()
+    return executor, pool_id
+
+
+def submit_job(job_id):
+    """Hand a queued job to the process pool; returns its future immediately."""
+    executor, pool_id = get_executor()
+    update_job(job_id, submitted_by=os.getpid(), pool=pool_id)
+    try:
+        future = executor.submit(run_job, job_id)
+    except BrokenProcessPool:
+        return _pool_broken(executor, pool_id).get(job_id)
+    future.add_done_callback(partial(_check_pool, executor, pool_id))
+    return future
+
+
+def _check_pool(executor, pool_id, future):
+    # Done callback of every job future: a dead pool process fails all of the pool's futures
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    with _executor_lock:
+        if pool_id in _broken_pools:
+            return
+        _broken_pools.add(pool_id)
+    # Called from the broken pool's own management thread → resubmit from another one
+    threading.Thread(
+        target=_pool_broken, args=(executor, pool_id), name="job-pool-recovery", daemon=True
+    ).start()
+
+
+def _pool_broken(executor, pool_id):
+    """
+    A pool process was killed (e.g. by the OOM killer), which breaks the whole pool: the
+    jobs it was running and the ones still queued in it are lost. Start a fresh pool and
+    resubmit them — their records name this live process, so recover_job() elsewhere
+    leaves them alone. Returns {job_id: future} of the jobs resubmitted by this call.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            print("⚠️ Job pool was broken, restarting it")
+            _executor = None
+
+    futures = {}
+    for name in os.listdir(jobs_root()):
+        job = read_job(name)
+        if (
+            job is None or is_finished(job)
+            or job.get("submitted_by") != os.getpid() or job.get("pool") != pool_id
+        ):
+            continue
+        # recover_job() elsewhere may also notice a running job's dead worker → same claim
+        owner = job.get("pid") if job["status"] == JOB_RUNNING else f"pool_{pool_id}"
+        futures[job["job_id"]] = _resume(job, owner)
+    return futures
+
+
+# ---------------- RECOVERY ----------------
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _resume(job, owner):
+    """
+    Take a job over from its dead `owner` (a pid, or a broken pool) and submit it again;
+    after PHARMALNET_JOB_MAX_ATTEMPTS started attempts the job is failed instead.
+    Returns the job's future, or None if this call did not resubmit it.
+    """
+    # Several web workers / threads may notice the same dead owner → only one may claim it
+    claim_path = os.path.join(job_path(job["job_id"]), f"recovered_from_{owner}")
+    try:
+        os.close(os.open(claim_path, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return None
+
+    # A job that keeps killing its worker (e.g. the OOM killer) is not retried forever
+    attempts = job.get("attempts", 0)
+    if attempts >= settings.PHARMALNET_JOB_MAX_ATTEMPTS:
+        print(f"❌ Giving up on job {job['job_id']} after {attempts} interrupted attempts")
+        finish_job(
+            job["job_id"], JOB_FAILED,
+            error=f"The job's worker process died {attempts} times (out of memory?), so it was stopped."
+        )
+        return None
+
+    print(f"♻️ Resuming interrupted job {job['job_id']} (owner {owner} is gone)")
+    update_job(job["job_id"], status=JOB_QUEUED)
+    emit_event(job["job_id"], "status", status=JOB_QUEUED, resumed=True)
+    return submit_job(job["job_id"])
+
+
+def recover_job(job):
+    """
+    Re-submit a job whose owning process is gone: a queued job whose web worker died,
+    or a running job whose pool process died. Handlers resume from their checkpoints.
+    After PHARMALNET_JOB_MAX_ATTEMPTS started attempts the job is failed instead.
+    Returns True if this process took the job over.
+    """
+    if job["status"] == JOB_QUEUED:
+        owner_pid = job.get("submitted_by")
+    elif job["status"] == JOB_RUNNING:
+        owner_pid = job.get("pid")
+    else:
+        return False
+
+    if owner_pid is None or _pid_alive(owner_pid):
+        return False
+    return _resume(job, owner_pid) is not None
+
+
+def recover_interrupted_jobs():
+    """Sweep all unfinished jobs and resume the orphaned ones."""
+    recovered = 0
+    for name in os.listdir(jobs_root()):
+        job = read_job(name)
+        if job is not None and not is_finished(job) and recover_job(job):
+            recovered += 1
+    return recovered
+
+
+def _setup_django():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+        django.setup()
+
+
+def run_job(job_id):
+    """Entry point inside the pool process: run the handler and record its outcome."""
+    _setup_django()
+
+    job = read_job(job_id)
+    if job is None:
+        return
+    job = update_job(
+        job_id, status=JOB_RUNNING, started=time.time(), pid=os.getpid(), attempts=job.get("attempts", 0) + 1
+    )
+    emit_event(job_id, "status", status=JOB_RUNNING)
+
+    # ✅ Per-stage peak memory + budget: over-budget jobs fail cleanly instead of being OOM-killed
+    tracker = memory.MemoryTracker(settings.PHARMALNET_JOB_MEMORY_MB, label=f"job {job_id}").start()
+    try:
+        handler = import_string(JOB_HANDLERS[job["kind"]])
+        result = handler(job_id, job_path(job_id), job["params"])
+    except Exception as e:
+        memory_report = tracker.stop()
+        print(f"❌ Job {job_id} failed:", e)
+        print(traceback.format_exc())
+        finish_job(job_id, JOB_FAILED, error=str(e), memory=memory_report)
+    else:
+        memory_report = tracker.stop()
+        result["memory"] = memory_report
+        finish_job(job_id, JOB_DONE, result=result, memory=memory_report)
+    finally:
+        # Don't keep the job's encoding processes alive in this pool process until the next job
+        # (only a process that loaded featurize can have them; importing it here would pull in DeepPurpose)
+        featurize = sys.modules.get(f"{__package__}.featurize")
+        if featurize is not None:
+            featurize.shutdown_pool()
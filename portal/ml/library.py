@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from . import memory
+
+
+# ✅ Encodings whose vectors are bit fingerprints (0/1), and their width in bits
+BIT_ENCODINGS = {
+    "Morgan": 1024,
+}
+
+
+class LibraryNotFound(Exception):
+    """No compound library with this id (or not owned by this user)."""
+
+
+# ---------------- LIBRARY STORAGE ----------------
+# One folder per library; every file is append-only and `count` in meta.json is the commit
+# point (rows past it are leftovers of an interrupted append and get truncated):
+#   fingerprints.bin        count × (n_bits / 8) bytes, np.packbits rows, memory-mapped
+#   smiles.bin / smiles.end  concatenated UTF-8 SMILES + int64 end offset of each row
+#   ids.bin / ids.end        the same for compound ids
+#   meta.json               owner, name, encoding, n_bits, count
+def libraries_root():
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "libraries")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def library_path(library_id):
+    """Return the folder of a library, or None for a malformed library id."""
+    try:
+        library_id = uuid.UUID(str(library_id)).hex
+    except ValueError:
+        return None
+    return os.path.join(libraries_root(), library_id)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def create_library(owner_id, name, encoding="Morgan"):
+    """Create an empty library for `encoding` fingerprints and return its id."""
+    if encoding not in BIT_ENCODINGS:
+        raise ValueError(f"Libraries store bit fingerprints: {', '.join(BIT_ENCODINGS)} (not {encoding}).")
+
+    library_id = uuid.uuid4().hex
+    path = library_path(library_id)
+    os.makedirs(path)
+    for filename in ("fingerprints.bin", "smiles.bin", "smiles.end", "ids.bin", "ids.end"):
+        open(os.path.join(path, filename), "wb").close()
+
+    now = time.time()
+    _write_json(os.path.join(path, "meta.json"), {
+        "library_id": library_id,
+        "owner": owner_id,
+        "name": name,
+        "encoding": encoding,
+        "n_bits": BIT_ENCODINGS[encoding],
+        "count": 0,
+        "created": now,
+        "updated": now,
+    })
+    return library_id
+
+
+def read_library(library_id):
+    path = library_path(library_id)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def owned_library(library_id, owner_id):
+    meta = read_library(library_id)
+    if meta is None or meta["owner"] != owner_id:
+        raise LibraryNotFound(f"Unknown library id: {library_id}")
+    return meta
+
+
+def list_libraries(owner_id):
+    owned = []
+    for library_id in os.listdir(libraries_root()):
+        meta = read_library(library_id)
+        if meta and meta["owner"] == owner_id:
+            owned.append({k: meta[k] for k in ("library_id", "name", "encoding", "count", "created", "updated")})
+    return sorted(owned, key=lambda m: m["created"], reverse=True)
+
+
+# ---------------- APPENDS ----------------
+@contextmanager
+def _locked(path):
+    # One writer per library (across processes); readers only trust the committed count
+    with open(os.path.join(path, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _text_end(path, name, count):
+    if count == 0:
+        return 0
+    return int(np.fromfile(os.path.join(path, f"{name}.end"), dtype="<i8", count=1, offset=(count - 1) * 8)[0])
+
+
+def _append_text(path, name, values, end):
+    encoded = [str(v).encode("utf-8") for v in values]
+    with open(os.path.join(path, f"{name}.bin"), "ab") as f:
+        f.write(b"".join(encoded))
+    ends = end + np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+    with open(os.path.join(path, f"{name}.end"), "ab") as f:
+        f.write(ends.astype("<i8").tobytes())
+    return int(ends[-1]) if len(ends) else end
+
+
+def append_compounds(library_id, make_batches, progress=None):
+    """
+    Append encoded compounds: make_batches(first_row) returns the (ids, smiles,
+    fingerprint matrix) batches (e.g. screening.csv_library_batches), first_row being
+    the library's row of the first new compound — read under the append lock, so
+    concurrent appends never number rows twice. Every batch is committed on its own,
+    so an interrupted append keeps what was written. Returns the new compound count.
+    """
+    progress = progress or (lambda event, **data: None)
+    path = library_path(library_id)
+    with _locked(path):
+        meta = read_library(library_id)
+        row_bytes = meta["n_bits"] // 8
+        count = meta["count"]
+
+        # Drop anything past the last commit (an append that died half-way)
+        smiles_end, ids_end = _text_end(path, "smiles", count), _text_end(path, "ids", count)
+        for filename, size in (
+            ("fingerprints.bin", count * row_bytes),
+            ("smiles.bin", smiles_end), ("smiles.end", count * 8),
+            ("ids.bin", ids_end), ("ids.end", count * 8),
+        ):
+            os.truncate(os.path.join(path, filename), size)
+
+        for ids, smiles, fingerprints in make_batches(count):
+            if fingerprints.shape[1] != meta["n_bits"] or not np.isin(fingerprints, (0, 1)).all():
+                raise ValueError(f"Expected {meta['n_bits']}-bit {meta['encoding']} fingerprints.")
+            with open(os.path.join(path, "fingerprints.bin"), "ab") as f:
+                f.write(np.packbits(fingerprints.astype(np.uint8), axis=1).tobytes())
+            smiles_end = _append_text(path, "smiles", smiles, smiles_end)
+            ids_end = _append_text(path, "ids", ids, ids_end)
+
+            count += len(smiles)
+            meta.update(count=count, updated=time.time())
+            _write_json(os.path.join(path, "meta.json"), meta)
+            memory.check()
+            progress("library", compounds=count)
+
+    print(f"📚 Library {library_id[:12]} now holds {count} compounds")
+    return count
+
+
+# ---------------- READING ----------------
+class LibraryIndex:
+    """Read-only view of a library: memory-mapped packed fingerprints + SMILES / id lookup."""
+
+    def __init__(self, library_id):
+        self.meta = read_library(library_id)
+        self.path = library_path(library_id)
+        self.count = self.meta["count"]
+        self.n_bits = self.meta["n_bits"]
+        row_bytes = self.n_bits // 8
+        if self.count:
+            self.fingerprints = np.memmap(
+                os.path.join(self.path, "fingerprints.bin"), dtype=np.uint8, mode="r", shape=(self.count, row_bytes)
+            )
+        else:
+            self.fingerprints = np.zeros((0, row_bytes), dtype=np.uint8)
+
+    def _text(self, name, start, stop):
+        ends = np.fromfile(os.path.join(self.path, f"{name}.end"), dtype="<i8", count=stop - start, offset=start * 8)
+        first = _text_end(self.path, name, start)
+        with open(os.path.join(self.path, f"{name}.bin"), "rb") as f:
+            f.seek(first)
+            blob = f.read(int(ends[-1]) - first if len(ends) else 0)
+        bounds = np.concatenate([[0], ends - first])
+        return [blob[bounds[k]:bounds[k + 1]].decode("utf-8") for k in range(stop - start)]
+
+    def batches(self, batch_rows=5000):
+        """Yield (ids, smiles, float32 fingerprint matrix) — no featurization needed."""
+        for start in range(0, self.count, batch_rows):
+            stop = min(start + batch_rows, self.count)
+            bits = np.unpackbits(self.fingerprints[start:stop], axis=1, count=self.n_bits)
+            yield self._text("ids", start, stop), self._text("smiles", start, stop), bits.astype(np.float32)
@@ -0,0 +1,153 @@
+import os
+import sys
+import resource
+import threading
+
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+_local = threading.local()
+
+
+class MemoryBudgetExceeded(Exception):
+    """A job needs (or already uses) more memory than its budget allows."""
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # No /proc (e.g. macOS dev box): fall back to the lifetime peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryTracker:
+    """
+    Per-job memory profile and budget.
+
+    A sampler thread records the peak RSS growth (over the RSS when the job started)
+    of every stage. Code running inside the job calls check() at safe points (stage
+    changes, epochs, CSV chunks) and reserve() before large allocations; both raise
+    MemoryBudgetExceeded so the job fails cleanly instead of the OOM killer taking
+    down the whole worker.
+
+    RSS is a process-wide figure: the numbers only belong to one job / request when
+    nothing else runs in the process (a job process, a sync web worker). Child
+    processes (e.g. the featurization pool) are not included.
+    """
+
+    def __init__(self, budget_mb=0, label="job", interval=0.05):
+        self.budget = int(budget_mb * MB) if budget_mb else 0
+        self.label = label
+        self.interval = interval
+        self.baseline = 0
+        self.stage_name = "start"
+        self.stages = {}
+        self.exceeded = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self):
+        self.baseline = rss_bytes()
+        self._thread = threading.Thread(target=self._sample_loop, name=f"memory-{self.label}", daemon=True)
+        self._thread.start()
+        _local.tracker = self
+        return self
+
+    def stop(self):
+        if self._stop.is_set():
+            return self.report()
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+        if getattr(_local, "tracker", None) is self:
+            _local.tracker = None
+        print(f"🧠 Memory [{self.label}]: {self.summary()}")
+        return self.report()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    # ---------------- SAMPLING ----------------
+    def _sample(self):
+        used = rss_bytes() - self.baseline
+        stage = self.stage_name
+        if used > self.stages.get(stage, 0):
+            self.stages[stage] = used
+        if self.budget and used > self.budget and self.exceeded is None:
+            self.exceeded = (stage, used)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    # ---------------- JOB API ----------------
+    def stage(self, name):
+        """Enter a new stage (checks the budget first)."""
+        self.check()
+        self.stage_name = name
+
+    def check(self):
+        if self.exceeded:
+            stage, used = self.exceeded
+            raise MemoryBudgetExceeded(
+                f"Job used {used / MB:.0f} MB during '{stage}', over its {self.budget / MB:.0f} MB memory budget."
+            )
+
+    def reserve(self, nbytes, what):
+        """Fail fast if allocating about `nbytes` more would go over the budget."""
+        self.check()
+        if not self.budget:
+            return
+        used = rss_bytes() - self.baseline
+        if used + nbytes > self.budget:
+            raise MemoryBudgetExceeded(
+                f"{what} needs about {nbytes / MB:.0f} MB; with {used / MB:.0f} MB in use that exceeds "
+                f"the {self.budget / MB:.0f} MB memory budget."
+            )
+
+    # ---------------- REPORT ----------------
+    def report(self):
+        return {
+            "budget_mb": round(self.budget / MB, 1) if self.budget else None,
+            "baseline_mb": round(self.baseline / MB, 1),
+            "peak_mb": round(max(self.stages.values(), default=0) / MB, 1),
+            "stages_peak_mb": {name: round(used / MB, 1) for name, used in self.stages.items()},
+        }
+
+    def summary(self):
+        return ", ".join(f"{name} {used / MB:.0f} MB" for name, used in self.stages.items())
+
+
+# ---------------- ACTIVE TRACKER (no plumbing needed in the pipeline) ----------------
+def active_tracker():
+    return getattr(_local, "tracker", None)
+
+
+def stage(name):
+    """Mark the current job's next stage, if a tracker is active."""
+    tracker = active_tracker()
+    if tracker:
+        tracker.stage(name)
+
+
+def check():
+    """Budget check against the tracker of the current job, if any."""
+    tracker = active_tracker()
+    if tracker:
+        tracker.check()
+
+
+def reserve(nbytes, what):
+    tracker = active_tracker()
+    if tracker:
+        tracker.reserve(nbytes, what)
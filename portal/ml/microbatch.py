@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching of single-pair predictions for one (model, backend).
+
+    Request threads call submit() and block on a Future. A worker thread takes the
+    first waiting pair, gathers more for up to `max_wait` seconds (or until
+    `max_batch` pairs), then encodes + predicts them as one batch. Under load, N
+    concurrent requests cost about one forward pass instead of N; an idle request
+    waits at most `max_wait`.
+
+    The worker exits after `idle_seconds` without requests, so a batcher does not
+    keep a model alive after the model cache has dropped it.
+    """
+
+    def __init__(self, key, model, backend, max_batch, max_wait, idle_seconds=30.0):
+        self.key = key
+        self.model = model
+        self.backend = backend
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.idle_seconds = idle_seconds
+        self.alive = True
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"microbatch-{key[0][:12]}", daemon=True)
+        self._thread.start()
+
+    def submit(self, smiles, protein):
+        future = Future()
+        self._queue.put((smiles, protein, future))
+        return future
+
+    # ---------------- WORKER ----------------
+    def _collect(self):
+        """Block for the first pair, then gather more until the batch is full or max_wait passes."""
+        try:
+            first = self._queue.get(timeout=self.idle_seconds)
+        except queue.Empty:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                with _batchers_lock:
+                    # Re-check under the lock: submit() may have just queued a pair
+                    if self._queue.empty():
+                        self.alive = False
+                        _batchers.pop(self.key, None)
+                        return
+                continue
+            self._predict(batch)
+
+    def predict_pairs(self, pairs):
+        """Encode + predict a batch of (smiles, protein) pairs: one float per pair."""
+        # Encoding / inference load DeepPurpose and torch: only needed once a batch runs
+        from . import inference
+        from .featurize import data_process
+
+        X_pred = data_process(
+            X_drug=[smiles for smiles, _ in pairs],
+            X_target=[protein for _, protein in pairs],
+            y=[0] * len(pairs),
+            drug_encoding=self.model.drug_encoding,
+            target_encoding=self.model.target_encoding,
+            split_method="no_split"
+        )
+        return inference.predict(self.model, X_pred, backend=self.backend)
+
+    def _predict(self, batch):
+        try:
+            y_pred = self.predict_pairs([(smiles, protein) for smiles, protein, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), value in zip(batch, y_pred):
+            future.set_result((float(value), len(batch)))
+
+
+def predict_pair(model_id, model, smiles, protein, backend="eager", timeout=30.0):
+    """
+    Predict one (SMILES, protein) pair through the shared batcher of (model_id, backend).
+    Returns (prediction, size of the batch it ran in).
+    """
+    key = (model_id, backend)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None or not batcher.alive:
+            batcher = _batchers[key] = MicroBatcher(
+                key, model, backend,
+                max_batch=settings.PHARMALNET_MICROBATCH_MAX_SIZE,
+                max_wait=settings.PHARMALNET_MICROBATCH_MAX_WAIT_MS / 1000
+            )
+        future = batcher.submit(smiles, protein)
+    return future.result(timeout=timeout)
+
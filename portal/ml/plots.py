@@ -0,0 +1,93 @@
+import os
+import fcntl
+
+import numpy as np
+from django.conf import settings
+
+
+# ---------------- EVALUATION PLOTS ----------------
+# Evaluation keeps only the points (plot_data.npz, float32); the PNG is a separate stage:
+# rendered once by the job after packaging (or by the first request if that failed) and
+# served from then on. Above PHARMALNET_PLOT_DENSITY_THRESHOLD points, a hexbin density
+# replaces the scatter — 100k overlapping markers are slow to draw and show nothing.
+PLOT_DATA_FILE = "plot_data.npz"
+PLOT_FILE = "graph.png"
+PLOT_DPI = 150
+
+
+def save_plot_data(folder, y_true, y_pred):
+    """Store the actual / predicted values to plot later; returns the file path."""
+    path = os.path.join(folder, PLOT_DATA_FILE)
+    np.savez(
+        path,
+        actual=np.asarray(y_true, dtype=np.float32),
+        predicted=np.asarray(y_pred, dtype=np.float32),
+    )
+    return path
+
+
+def _draw(actual, predicted, out_path, density_threshold):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    lim_min = float(min(actual.min(), predicted.min()))
+    lim_max = float(max(actual.max(), predicted.max()))
+
+    if len(actual) > density_threshold:
+        hb = ax.hexbin(actual, predicted, gridsize=80, bins="log", mincnt=1, cmap="Blues",
+                       extent=(lim_min, lim_max, lim_min, lim_max))
+        fig.colorbar(hb, ax=ax, label="Points per bin (log)")
+    else:
+        ax.scatter(actual, predicted, alpha=0.6, color="#007bff", label="Data Points")
+
+    # Regression line (two end points are enough to draw it)
+    if len(actual) > 1 and np.ptp(actual) > 0:
+        m, b = np.polyfit(actual, predicted, 1)
+        xs = np.array([actual.min(), actual.max()])
+        ax.plot(xs, m * xs + b, color="black", linestyle="--", linewidth=1.5, label="Best Fit Line")
+
+    # Ideal diagonal
+    ax.plot([lim_min, lim_max], [lim_min, lim_max], "r--", linewidth=1, label="Ideal Fit (y=x)")
+
+    ax.set_xlabel("Actual Values (log10 IC50)")
+    ax.set_ylabel("Predicted Values (log10 IC50)")
+    ax.set_title(f"Actual vs Predicted — Pharmal-Net (n={len(actual):,})")
+    ax.legend()
+    fig.tight_layout()
+
+    tmp_path = f"{out_path}.{os.getpid()}.tmp.png"
+    fig.savefig(tmp_path, dpi=PLOT_DPI)
+    plt.close(fig)
+    os.replace(tmp_path, out_path)
+
+
+def render_plot(folder, density_threshold=None):
+    """
+    Path of the plot of folder/plot_data.npz, drawing it on the first call only.
+    Returns None when the folder has no plot data.
+    """
+    data_path = os.path.join(folder, PLOT_DATA_FILE)
+    out_path = os.path.join(folder, PLOT_FILE)
+    if os.path.exists(out_path):
+        return out_path
+    if not os.path.exists(data_path):
+        return None
+
+    # One renderer per plot, whoever asks first (job worker or a web worker)
+    with open(os.path.join(folder, ".plot.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(out_path):
+                with np.load(data_path) as data:
+                    actual, predicted = data["actual"], data["predicted"]
+                if len(actual) == 0:
+                    return None
+                threshold = density_threshold or settings.PHARMALNET_PLOT_DENSITY_THRESHOLD
+                _draw(actual, predicted, out_path, threshold)
+                print(f"🖼️ Rendered evaluation plot ({len(actual)} points, "
+                      f"{'density' if len(actual) > threshold else 'scatter'})")
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return out_path
@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import zipfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ModelNotFound(Exception):
+    """No registered model with this id (or not registered by this user)."""
+
+
+# ---------------- REGISTRY STORAGE ----------------
+# Artifacts are stored once per content, whoever registers them and however often:
+#   models/<sha256>/model.zip      the ZIP as registered (served for downloads)
+#   models/<sha256>/files/...      extracted .pt / .pkl for loading
+#   models/<sha256>/meta.json      model_dir, size, registered
+#   models/manifests/<owner>.json  per-user manifest {model_id: {name, registered}} — the references
+# An artifact no manifest refers to is garbage (see collect_garbage).
+def models_root():
+    """Directory holding one sub-folder per registered model, named by its content hash."""
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "models")
+    os.makedirs(os.path.join(root, "manifests"), exist_ok=True)
+    return root
+
+
+def model_path(model_id):
+    """Return the folder of a registered model, or None for a malformed id."""
+    model_id = str(model_id).lower()
+    if len(model_id) != 64 or any(c not in "0123456789abcdef" for c in model_id):
+        return None
+    return os.path.join(models_root(), model_id)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _locked(name, mode=fcntl.LOCK_EX):
+    # "store" lock: registrations hold it shared, the garbage collector exclusive
+    with open(os.path.join(models_root(), f".{name}.lock"), "w") as lock:
+        fcntl.flock(lock, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _find_model_dir(extract_dir):
+    # Same rule the prediction API always used: the first folder holding a .pt and a .pkl
+    for root, _, files in os.walk(extract_dir):
+        if any(f.endswith(".pt") for f in files) and any(f.endswith(".pkl") for f in files):
+            return root
+    raise ValueError("❌ Could not find model files (.pt / .pkl) in extracted ZIP.")
+
+
+def _install(zip_path, path, model_id):
+    """Extract a model ZIP into `path` (built in a temp folder, then renamed into place)."""
+    staging = tempfile.mkdtemp(prefix=f".{model_id}.", dir=models_root())
+    try:
+        files_dir = os.path.join(staging, "files")
+        try:
+            with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                zip_ref.extractall(files_dir)
+        except zipfile.BadZipFile:
+            raise ValueError("❌ The uploaded model is not a valid ZIP file.")
+
+        model_dir = _find_model_dir(files_dir)
+        os.replace(zip_path, os.path.join(staging, "model.zip"))
+        _write_json(os.path.join(staging, "meta.json"), {
+            "model_id": model_id,
+            "model_dir": os.path.relpath(model_dir, staging),
+            "size": os.path.getsize(os.path.join(staging, "model.zip")),
+            "registered": time.time(),
+        })
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another worker registered the same bytes first; theirs is identical
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+# ---------------- PER-USER MANIFESTS ----------------
+def _manifest_path(owner_id):
+    return os.path.join(models_root(), "manifests", f"{int(owner_id)}.json")
+
+
+def read_manifest(owner_id):
+    """{model_id: {"name", "registered"}} of the models a user registered."""
+    try:
+        with open(_manifest_path(owner_id), encoding="utf-8") as f:
+            return json.load(f)["models"]
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_manifest(owner_id, change):
+    """Apply change(models dict) to a user's manifest under its lock."""
+    with _locked(f"manifest.{int(owner_id)}"):
+        owned = read_manifest(owner_id)
+        change(owned)
+        _write_json(_manifest_path(owner_id), {"owner": owner_id, "models": owned})
+    return owned
+
+
+# ---------------- REGISTRATION ----------------
+def _register(tmp_path, model_id, owner_id, name):
+    path = model_path(model_id)
+    # Shared store lock: the garbage collector can't sweep this artifact between install and manifest
+    with _locked("store", fcntl.LOCK_SH):
+        created = not os.path.isdir(path)
+        try:
+            if created:
+                _install(tmp_path, path, model_id)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        def add(owned):
+            owned.setdefault(model_id, {"name": name, "registered": time.time()})
+        _update_manifest(owner_id, add)
+    return model_id, created
+
+
+def register_model(chunks, owner_id, name=""):
+    """
+    Store a trained model ZIP (given as an iterable of byte chunks, e.g. UploadedFile.chunks())
+    under the sha256 of its bytes, and add it to `owner_id`'s manifest.
+    Registering the same bytes again is cheap and returns the same id.
+
+    Returns (model_id, created).
+    """
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=models_root(), suffix=".zip.part", delete=False) as tmp:
+        for chunk in chunks:
+            digest.update(chunk)
+            tmp.write(chunk)
+    return _register(tmp.name, digest.hexdigest(), owner_id, name)
+
+
+def register_model_file(zip_path, owner_id, name=""):
+    """
+    register_model() for a ZIP already on disk (e.g. fresh from training): the file is
+    hard-linked into the store instead of copied. The caller may delete zip_path afterwards.
+    """
+    digest = hashlib.sha256()
+    with open(zip_path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+
+    tmp_path = os.path.join(models_root(), f".{uuid.uuid4().hex}.zip.part")
+    try:
+        os.link(zip_path, tmp_path)
+    except OSError:
+        shutil.copyfile(zip_path, tmp_path)   # different filesystem
+    return _register(tmp_path, digest.hexdigest(), owner_id, name)
+
+
+def unregister_model(model_id, owner_id):
+    """Drop a model from the user's manifest (its files go at the next collect_garbage)."""
+    model_id = str(model_id).lower()
+    if model_id not in read_manifest(owner_id):
+        raise ModelNotFound(f"Unknown model id: {model_id}")
+    _update_manifest(owner_id, lambda owned: owned.pop(model_id, None))
+
+
+def read_model(model_id):
+    path = model_path(model_id)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def model_dir_for(model_id, owner_id):
+    """Folder with the model's .pt / .pkl files, if `owner_id` registered this model."""
+    meta = read_model(model_id)
+    if meta is None or str(model_id).lower() not in read_manifest(owner_id):
+        raise ModelNotFound(f"Unknown model id: {model_id}")
+    return os.path.join(model_path(model_id), meta["model_dir"])
+
+
+def model_zip_for(model_id, owner_id):
+    """The registered ZIP of a model the user owns (for downloads)."""
+    model_dir_for(model_id, owner_id)
+    return os.path.join(model_path(model_id), "model.zip")
+
+
+def list_models(owner_id):
+    """Models registered by a user, most recently registered first."""
+    owned = []
+    for model_id, entry in read_manifest(owner_id).items():
+        meta = read_model(model_id)
+        if meta:
+            owned.append({
+                "model_id": model_id,
+                "name": entry["name"],
+                "size": meta["size"],
+                "registered": entry["registered"],
+            })
+    return sorted(owned, key=lambda m: m["registered"], reverse=True)
+
+
+# ---------------- GARBAGE COLLECTION ----------------
+def _tree_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+def collect_garbage(dry_run=False, stale_seconds=24 * 3600):
+    """
+    Mark & sweep: every model id in a user manifest is live, every other artifact is
+    removed, as are staging folders / .zip.part files older than stale_seconds (left by
+    a crashed registration). Returns {"live", "removed", "bytes_reclaimed"}.
+    """
+    root = models_root()
+    # Exclusive store lock: no registration is between install and manifest update
+    with _locked("store"):
+        live = set()
+        for filename in os.listdir(os.path.join(root, "manifests")):
+            if filename.endswith(".json"):
+                live.update(read_manifest(filename[:-len(".json")]))
+
+        removed, reclaimed = [], 0
+        now = time.time()
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if model_path(name) is not None:
+                if name in live:
+                    continue
+            elif not (name.startswith(".") and (name.endswith(".zip.part") or os.path.isdir(path))):
+                continue   # manifests/, lock files
+            elif now - os.path.getmtime(path) < stale_seconds:
+                continue
+
+            removed.append(name)
+            reclaimed += _tree_bytes(path) if os.path.isdir(path) else os.path.getsize(path)
+            if dry_run:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    print(f"🧹 Model store GC: {len(live)} live, {len(removed)} removed, {reclaimed / 1e6:.1f} MB reclaimed"
+          + (" (dry run)" if dry_run else ""))
+    return {"live": len(live), "removed": removed, "bytes_reclaimed": reclaimed}
+
+
+# ---------------- LOADED-MODEL CACHE ----------------
+def load_pretrained(model_dir):
+    """DeepPurpose model from a folder of .pt / .pkl files (imported on first load only)."""
+    from DeepPurpose import DTI as models
+    return models.model_pretrained(model_dir)
+
+
+class ModelCache:
+    """
+    Bounded, in-process LRU of loaded DeepPurpose models keyed by model id.
+
+    A loaded model carries its built inference backends (see inference.get_backend),
+    so a hit skips both model_pretrained() and the TorchScript / quantization step.
+    Concurrent requests for the same missing model wait for a single load.
+    """
+
+    def __init__(self, capacity, loader=load_pretrained):
+        self.capacity = max(1, capacity)
+        self.loader = loader
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, model_id, model_dir):
+        model_id = str(model_id).lower()
+        with self._lock:
+            if model_id in self._models:
+                self._models.move_to_end(model_id)
+                self.hits += 1
+                return self._models[model_id]
+            self.misses += 1
+            load_lock = self._loading.setdefault(model_id, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if model_id in self._models:
+                    self._models.move_to_end(model_id)
+                    return self._models[model_id]
+
+            start = time.perf_counter()
+            model = self.loader(model_dir)
+            elapsed = time.perf_counter() - start
+            print(f"📦 Loaded model {model_id[:12]} in {elapsed:.2f}s")
+
+            with self._lock:
+                self.load_seconds += elapsed
+                self._models[model_id] = model
+                while len(self._models) > self.capacity:
+                    evicted, _ = self._models.popitem(last=False)
+                    self.evictions += 1
+                    print(f"♻️ Evicted model {evicted[:12]} from the model cache")
+                self._loading.pop(model_id, None)
+            return model
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "loaded": len(self._models),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "load_seconds": round(self.load_seconds, 3),
+            }
+
+
+def get_model_cache():
+    """Process-wide ModelCache configured from settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ModelCache(settings.PHARMALNET_MODEL_CACHE_SIZE)
+    return _cache
+
+
+def load_model(model_id, owner_id):
+    """Loaded model for a registered id, served from the in-process cache."""
+    return get_model_cache().get(model_id, model_dir_for(model_id, owner_id))
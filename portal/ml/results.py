@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import uuid
+import shutil
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import memory
+
+
+PREDICTED = "Predicted"
+PAGE_MAX = 500
+
+
+# ---------------- RESULT STORAGE ----------------
+# A result is a folder of columns (Arrow-style layout, readable with numpy memory maps):
+#   predicted.npy              float32 prediction per row (NaN when missing)
+#   col_<i>.bin / .offsets.npy  an input column as concatenated UTF-8 text + int64 row offsets
+#   order.npy                  row order by prediction, built on the first sorted page
+#   meta.json                  owner, column names, row count, model / backend, expiry time
+# Results expire PHARMALNET_RESULT_TTL_HOURS after they were saved; the workspace janitor
+# removes them (see expired_results).
+def results_root():
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "results")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def result_path(result_id):
+    """Return the folder of a result, or None for a malformed result id."""
+    try:
+        result_id = uuid.UUID(str(result_id)).hex
+    except ValueError:
+        return None
+    return os.path.join(results_root(), result_id)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _save_npy(path, array):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def save_predictions(owner_id, columns, chunks, meta=None):
+    """
+    Write predicted chunks (DataFrames with the input `columns` + "Predicted", e.g. from
+    batch_predict.predict_chunks) column by column as they arrive.
+    Returns (result_id, total rows).
+    """
+    result_id = uuid.uuid4().hex
+    path = result_path(result_id)
+    os.makedirs(path)
+    columns = [c for c in columns if c != PREDICTED]
+
+    files = [open(os.path.join(path, f"col_{i}.bin"), "wb") for i in range(len(columns))]
+    offsets = [[np.zeros(1, dtype=np.int64)] for _ in columns]
+    ends = [0] * len(columns)
+    predicted = []
+    try:
+        for chunk in chunks:
+            for i, col in enumerate(columns):
+                encoded = [str(v).encode("utf-8") for v in chunk[col].tolist()]
+                files[i].write(b"".join(encoded))
+                row_ends = ends[i] + np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+                offsets[i].append(row_ends)
+                if len(row_ends):
+                    ends[i] = int(row_ends[-1])
+            predicted.append(chunk[PREDICTED].to_numpy(dtype=np.float32))
+            memory.check()
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    finally:
+        for f in files:
+            f.close()
+
+    for i in range(len(columns)):
+        _save_npy(os.path.join(path, f"col_{i}.offsets.npy"), np.concatenate(offsets[i]))
+    predicted = np.concatenate(predicted) if predicted else np.zeros(0, dtype=np.float32)
+    _save_npy(os.path.join(path, "predicted.npy"), predicted)
+
+    created = time.time()
+    _write_json(os.path.join(path, "meta.json"), {
+        **(meta or {}),
+        "result_id": result_id,
+        "owner": owner_id,
+        "created": created,
+        "expires": created + settings.PHARMALNET_RESULT_TTL_HOURS * 3600,
+        "columns": columns,
+        "total_records": int(len(predicted)),
+    })
+    return result_id, len(predicted)
+
+
+def delete_result(result_id):
+    """Remove a stored result now instead of at its expiry (e.g. one that turned out empty)."""
+    path = result_path(result_id)
+    if path is not None:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_result(result_id):
+    """A result's meta, or None if it doesn't exist or has expired."""
+    path = result_path(result_id)
+    if path is None:
+        return None
+    meta = _read_meta(path)
+    if meta is None or meta["expires"] <= time.time():
+        return None
+    return meta
+
+
+def expired_results(stale_seconds, now=None):
+    """
+    Folders of expired results, and of results whose writer died before meta.json
+    (older than stale_seconds) — for the janitor to remove.
+    """
+    now = now or time.time()
+    root = results_root()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        meta = _read_meta(path)
+        if meta is None:
+            try:
+                if now - os.path.getmtime(path) > stale_seconds:
+                    yield path
+            except FileNotFoundError:
+                continue   # deleted meanwhile
+        elif meta["expires"] <= now:
+            yield path
+
+
+def load_predicted(result_id):
+    """Predictions of every row (memory-mapped float32)."""
+    return np.load(os.path.join(result_path(result_id), "predicted.npy"), mmap_mode="r")
+
+
+# ---------------- PAGING ----------------
+def _sort_order(path, predicted):
+    # argsort once per result and keep it: later sorted pages are just slices
+    order_path = os.path.join(path, "order.npy")
+    if os.path.exists(order_path):
+        return np.load(order_path, mmap_mode="r")
+    order = np.argsort(predicted, kind="stable")   # NaN sort last
+    _save_npy(order_path, order)
+    return order
+
+
+def _read_rows(path, column_index, rows):
+    offsets = np.load(os.path.join(path, f"col_{column_index}.offsets.npy"), mmap_mode="r")
+    values = []
+    with open(os.path.join(path, f"col_{column_index}.bin"), "rb") as f:
+        for row in rows:
+            f.seek(offsets[row])
+            values.append(f.read(offsets[row + 1] - offsets[row]).decode("utf-8"))
+    return values
+
+
+def query(result_id, offset=0, limit=50, sort=None, min_value=None, max_value=None):
+    """
+    One page of a stored result.
+
+    sort: None (input order), "predicted" (ascending) or "-predicted" (descending);
+    missing predictions always come last. min_value / max_value keep rows whose
+    prediction lies in the range. Returns {"total", "offset", "limit", "rows"}, with
+    "total" counting the rows that match the filter.
+    """
+    meta = read_result(result_id)
+    path = result_path(result_id)
+    predicted = load_predicted(result_id)
+    limit = max(0, min(limit, PAGE_MAX))
+    offset = max(0, offset)
+
+    if sort in ("predicted", "-predicted"):
+        order = _sort_order(path, predicted)
+        if sort == "-predicted":
+            n_valid = len(predicted) - int(np.isnan(predicted).sum())
+            order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+    elif sort:
+        raise ValueError("sort must be 'predicted' or '-predicted'.")
+    else:
+        order = np.arange(len(predicted))
+
+    if min_value is not None or max_value is not None:
+        values = predicted[order]
+        keep = ~np.isnan(values)
+        if min_value is not None:
+            keep &= values >= min_value
+        if max_value is not None:
+            keep &= values <= max_value
+        order = order[keep]
+
+    page = [int(r) for r in order[offset:offset + limit]]
+    columns = {col: _read_rows(path, i, page) for i, col in enumerate(meta["columns"])}
+    rows = []
+    for n, row in enumerate(page):
+        value = float(predicted[row])
+        rows.append({
+            "row": row,
+            **{col: values[n] for col, values in columns.items()},
+            PREDICTED: None if np.isnan(value) else value,
+        })
+    return {"total": int(len(order)), "offset": offset, "limit": limit, "rows": rows}
+
+
+def iter_csv(result_id, chunk_rows=10000):
+    """The whole result as CSV text, `chunk_rows` rows at a time (for a streamed download)."""
+    meta = read_result(result_id)
+    path = result_path(result_id)
+    predicted = load_predicted(result_id)
+    offsets = [np.load(os.path.join(path, f"col_{i}.offsets.npy"), mmap_mode="r") for i in range(len(meta["columns"]))]
+    files = [open(os.path.join(path, f"col_{i}.bin"), "rb") for i in range(len(meta["columns"]))]
+    try:
+        if not len(predicted):
+            yield ",".join(meta["columns"] + [PREDICTED]) + "\n"
+        for start in range(0, len(predicted), chunk_rows):
+            end = min(start + chunk_rows, len(predicted))
+            data = {}
+            for col, f, off in zip(meta["columns"], files, offsets):
+                # One read per column per chunk, split at the row offsets
+                f.seek(off[start])
+                blob = f.read(off[end] - off[start])
+                bounds = off[start:end + 1] - off[start]
+                data[col] = [blob[bounds[k]:bounds[k + 1]].decode("utf-8") for k in range(end - start)]
+            data[PREDICTED] = predicted[start:end]
+            yield pd.DataFrame(data).to_csv(index=False, header=(start == 0))
+    finally:
+        for f in files:
+            f.close()
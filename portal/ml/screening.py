@@ -0,0 +1,127 @@
+import time
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from . import memory
+
+
+class TopK:
+    """The k best-scoring library compounds for one target (bounded min-heap)."""
+
+    def __init__(self, k, largest=True):
+        self.k = k
+        self.sign = 1.0 if largest else -1.0
+        self._heap = []   # (signed score, library row, id, smiles); the worst kept hit on top
+
+    def push_batch(self, scores, rows, ids, smiles):
+        keys = self.sign * np.asarray(scores, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(keys))
+        # Only the batch's own top k can make it into the overall top k
+        if len(valid) > self.k:
+            valid = valid[np.argpartition(keys[valid], -self.k)[-self.k:]]
+        for i in valid:
+            item = (float(keys[i]), int(rows[i]), ids[i], smiles[i])
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, item)
+            elif item > self._heap[0]:
+                heapq.heapreplace(self._heap, item)
+
+    def hits(self):
+        ranked = sorted(self._heap, reverse=True)
+        return [
+            {"rank": n + 1, "row": row, "id": id_, "smiles": smiles, "score": key * self.sign}
+            for n, (key, row, id_, smiles) in enumerate(ranked)
+        ]
+
+
+def parse_targets(text):
+    """
+    Target panel from a text field: FASTA (">name" header lines) or one sequence per
+    line, optionally as "name<TAB or space>SEQUENCE". Returns [(name, sequence)].
+    """
+    targets, name, seq = [], None, []
+    lines = [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+    if any(line.startswith(">") for line in lines):
+        for line in lines:
+            if line.startswith(">"):
+                if seq:
+                    targets.append((name, "".join(seq)))
+                name, seq = line[1:].strip() or f"target_{len(targets) + 1}", []
+            else:
+                seq.append(line)
+        if seq:
+            targets.append((name, "".join(seq)))
+    else:
+        for line in lines:
+            parts = line.split()
+            name, sequence = (parts[0], parts[-1]) if len(parts) > 1 else (f"target_{len(targets) + 1}", parts[0])
+            targets.append((name, sequence))
+
+    if not targets:
+        raise ValueError("Provide at least one target sequence.")
+    return targets
+
+
+def csv_library_batches(path, smiles_col, id_col=None, batch_rows=5000, drug_encoding="Morgan", first_row=0):
+    """
+    Stream a compound library CSV: yields (ids, smiles, encoded drug matrix) per batch.
+    Only the SMILES / id columns are read; without an id column, ids are row numbers
+    counted from first_row.
+    """
+    from .featurize import encode_matrix
+
+    usecols = [smiles_col] + ([id_col] if id_col and id_col != smiles_col else [])
+    row = first_row
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=str, keep_default_na=False, chunksize=batch_rows):
+        smiles = chunk[smiles_col].tolist()
+        ids = chunk[id_col].tolist() if id_col else [str(r) for r in range(row, row + len(chunk))]
+        row += len(chunk)
+        yield ids, smiles, encode_matrix(smiles, drug_encoding)
+
+
+def screen(model, targets, batches, top_k=100, largest=True, backend="eager", progress=None):
+    """
+    Score every library compound against every target without building the cross product:
+    each target is encoded once, the library streams through in batches, and only the
+    top_k hits per target are kept.
+    """
+    # Encoders / inference pull in DeepPurpose and torch: loaded here, so TopK and
+    # parse_targets import without them
+    from . import inference
+    from .featurize import DRUG_ENCODERS, TARGET_ENCODERS, encode_matrix
+
+    progress = progress or (lambda event, **data: None)
+    if model.drug_encoding not in DRUG_ENCODERS or model.target_encoding not in TARGET_ENCODERS:
+        raise ValueError(
+            f"Screening supports {', '.join(DRUG_ENCODERS)} / {', '.join(TARGET_ENCODERS)} models, "
+            f"not {model.drug_encoding} / {model.target_encoding}."
+        )
+
+    target_vectors = encode_matrix([seq for _, seq in targets], model.target_encoding)
+    boards = [TopK(top_k, largest) for _ in targets]
+
+    start = time.perf_counter()
+    row = 0
+    for ids, smiles, drugs in batches:
+        rows = np.arange(row, row + len(smiles))
+        for t, board in enumerate(boards):
+            scores = inference.predict_arrays(model, drugs, target_vectors[t:t + 1], backend=backend)
+            board.push_batch(scores, rows, ids, smiles)
+        row += len(smiles)
+        memory.check()
+        progress("screen", compounds=row, pairs=row * len(targets))
+
+    seconds = time.perf_counter() - start
+    print(f"🎯 Screened {row} compounds × {len(targets)} targets in {seconds:.1f}s")
+    return {
+        "library_size": row,
+        "seconds": round(seconds, 2),
+        "pairs_per_second": round(row * len(targets) / seconds) if seconds else None,
+        "targets": [
+            {"name": name, "hits": board.hits()}
+            for (name, _), board in zip(targets, boards)
+        ],
+    }
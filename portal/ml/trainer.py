@@ -0,0 +1,138 @@
+import os
+import copy
+import math
+
+import numpy as np
+import torch
+from torch.utils import data
+from DeepPurpose import utils
+
+
+def make_loader(df, config, shuffle, batch_size=None):
+    """DataLoader over an encoded DeepPurpose frame (drug_encoding / target_encoding / Label)."""
+    params = {
+        "batch_size": batch_size or config["batch_size"],
+        "shuffle": shuffle,
+        "num_workers": config.get("num_workers", 0),
+        "drop_last": False,
+    }
+    return data.DataLoader(utils.data_process_loader(df.index.values, df.Label.values, df, **config), **params)
+
+
+def _batch_loss(net, v_d, v_p, label, device):
+    score = net(v_d.float().to(device), v_p.float().to(device))
+    label = torch.as_tensor(np.asarray(label), dtype=torch.float32, device=device)
+    return torch.nn.functional.mse_loss(torch.squeeze(score, 1), label)
+
+
+def evaluate_loss(net, loader, device):
+    """Mean MSE of a network over a DataLoader."""
+    net.eval()
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for v_d, v_p, label in loader:
+            loss = _batch_loss(net, v_d, v_p, label, device)
+            total += loss.item() * len(label)
+            count += len(label)
+    net.train()
+    return total / count if count else None
+
+
+def save_checkpoint(path, net, opt, state):
+    """Atomically write the weights, optimizer and loop state needed to continue training."""
+    tmp_path = f"{path}.tmp"
+    torch.save({"model": net.state_dict(), "optimizer": opt.state_dict(), **state}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_model(
+    model,
+    train,
+    val,
+    on_epoch=None,
+    until_epoch=None,
+    checkpoint_path=None,
+    checkpoint_every=1,
+    patience=None
+):
+    """
+    Epoch loop equivalent to DeepPurpose's model.train() for regression with vector
+    encodings (Morgan / Conjoint_triad), but with a per-epoch hook:
+
+        on_epoch(epoch, train_loss, val_loss)
+
+    Training stops after `until_epoch` (default: config["train_epoch"]), or early once
+    the validation loss has not improved for `patience` epochs. With a checkpoint_path
+    the state is saved every `checkpoint_every` epochs (and at the end), and training
+    continues from an existing checkpoint instead of starting over.
+
+    Like DeepPurpose, the weights with the best validation loss are kept at the end.
+    Returns the per-epoch loss history.
+    """
+    config = model.config
+    device = model.device
+    net = model.model.to(device)
+    net.train()
+
+    opt = torch.optim.Adam(net.parameters(), lr=config["LR"], weight_decay=config.get("decay", 0))
+    train_loader = make_loader(train, config, shuffle=True)
+    val_loader = make_loader(val, config, shuffle=False)
+
+    state = {
+        "epoch": 0,
+        "best_loss": math.inf,
+        "best_state": None,
+        "stale_epochs": 0,   # epochs since the validation loss last improved
+        "stopped": False,    # early-stopped: nothing left to train
+        "history": [],
+    }
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location=device)
+        net.load_state_dict(checkpoint.pop("model"))
+        opt.load_state_dict(checkpoint.pop("optimizer"))
+        state.update(checkpoint)
+        print(f"♻️ Resuming training after epoch {state['epoch']}")
+
+    last_epoch = until_epoch or config["train_epoch"]
+    while not state["stopped"] and state["epoch"] < last_epoch:
+        epoch = state["epoch"] + 1
+
+        total, count = 0.0, 0
+        for v_d, v_p, label in train_loader:
+            loss = _batch_loss(net, v_d, v_p, label, device)
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+            total += loss.item() * len(label)
+            count += len(label)
+
+        train_loss = total / count if count else None
+        val_loss = evaluate_loss(net, val_loader, device)
+        state["epoch"] = epoch
+        state["history"].append({"epoch": epoch, "train_loss": train_loss, "val_loss": val_loss})
+        print(f"📉 Epoch {epoch}: train loss {train_loss}, val loss {val_loss}")
+
+        if val_loss is not None:
+            if val_loss < state["best_loss"]:
+                state["best_loss"] = val_loss
+                state["best_state"] = copy.deepcopy(net.state_dict())
+                state["stale_epochs"] = 0
+            else:
+                state["stale_epochs"] += 1
+
+        if on_epoch:
+            on_epoch(epoch, train_loss, val_loss)
+
+        if patience and state["stale_epochs"] >= patience:
+            state["stopped"] = True
+            print(f"⏹️ Early stopping at epoch {epoch}: no val improvement for {patience} epochs")
+
+        # ✅ Checkpoint the *current* weights so an interrupted run (or a later call) can continue
+        if checkpoint_path and (epoch % checkpoint_every == 0 or epoch == last_epoch or state["stopped"]):
+            save_checkpoint(checkpoint_path, net, opt, state)
+
+    if state["best_state"] is not None:
+        net.load_state_dict(state["best_state"])
+    model.model = net
+    return state["history"]
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+UPLOAD_PENDING = "pending"
+UPLOAD_COMPLETE = "complete"
+
+READ_SIZE = 1024 * 1024
+
+
+class UploadNotFound(Exception):
+    """No upload with this id (or not owned by this user)."""
+
+
+class UploadError(ValueError):
+    """A chunk or upload request the protocol can't accept (bad size, checksum, state)."""
+
+
+# ---------------- UPLOAD STORAGE ----------------
+# Chunked uploads (resumable: chunks can arrive in any order and be re-sent):
+#   uploads/<upload_id>/data.part   the file being assembled, each chunk written at its offset
+#   uploads/<upload_id>/meta.json   owner, filename, size, chunk_size, sha256, received chunk indices
+#   uploads/blobs/<sha256>          completed files, stored once per content (read-only)
+def uploads_root():
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "uploads")
+    os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+    return root
+
+
+def upload_path(upload_id):
+    """Return the folder of an upload, or None for a malformed upload id."""
+    try:
+        upload_id = uuid.UUID(str(upload_id)).hex
+    except ValueError:
+        return None
+    return os.path.join(uploads_root(), upload_id)
+
+
+def blob_path(sha256):
+    return os.path.join(uploads_root(), "blobs", sha256)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _locked(path, name="lock", mode=fcntl.LOCK_EX):
+    # ".lock": meta.json updates — chunks of one upload may arrive in parallel (and in
+    # several web workers). ".data.lock": chunk writes hold it shared, complete_upload
+    # exclusive, so data.part is never written once it is being hashed or is a blob.
+    with open(os.path.join(path, f".{name}"), "w") as lock:
+        fcntl.flock(lock, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_upload(upload_id):
+    path = upload_path(upload_id)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def owned_upload(upload_id, owner_id):
+    meta = read_upload(upload_id)
+    if meta is None or meta["owner"] != owner_id:
+        raise UploadNotFound(f"Unknown upload id: {upload_id}")
+    return meta
+
+
+def status(meta):
+    """Client-facing view of an upload: what's received and what's still missing."""
+    received = set(meta["received"])
+    missing = [i for i in range(meta["chunks"]) if i not in received]
+    return {
+        "upload_id": meta["upload_id"],
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "chunk_size": meta["chunk_size"],
+        "chunks": meta["chunks"],
+        "status": meta["status"],
+        "sha256": meta["sha256"],
+        "received": len(received),
+        "missing": missing,
+        "next_chunk": missing[0] if missing else None,
+    }
+
+
+def list_uploads(owner_id):
+    owned = []
+    for upload_id in os.listdir(uploads_root()):
+        meta = read_upload(upload_id) if upload_id != "blobs" else None
+        if meta and meta["owner"] == owner_id:
+            owned.append(meta)
+    return sorted(owned, key=lambda m: m["created"], reverse=True)
+
+
+# ---------------- PROTOCOL ----------------
+def create_upload(owner_id, filename, size, sha256=None, chunk_size=None):
+    """
+    Start an upload of `size` bytes. With the whole-file sha256 known up front, a file
+    this user already uploaded completes at once (nothing to send).
+    """
+    chunk_size = chunk_size or settings.PHARMALNET_UPLOAD_CHUNK_MB * 1024 * 1024
+    if size < 0 or size > settings.PHARMALNET_UPLOAD_MAX_MB * 1024 * 1024:
+        raise UploadError(f"Uploads must be between 0 and {settings.PHARMALNET_UPLOAD_MAX_MB} MB.")
+    if not 0 < chunk_size <= settings.PHARMALNET_UPLOAD_CHUNK_MB * 1024 * 1024:
+        raise UploadError(f"chunk_size must be between 1 byte and {settings.PHARMALNET_UPLOAD_CHUNK_MB} MB.")
+    if sha256 is not None:
+        sha256 = sha256.lower()
+        if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+            raise UploadError("sha256 must be 64 hex characters.")
+        for meta in list_uploads(owner_id):
+            if meta["status"] == UPLOAD_COMPLETE and meta["sha256"] == sha256 and os.path.exists(blob_path(sha256)):
+                print(f"♻️ Upload {meta['upload_id'][:12]} already holds {sha256[:12]}")
+                return meta
+
+    upload_id = uuid.uuid4().hex
+    path = upload_path(upload_id)
+    os.makedirs(path)
+    with open(os.path.join(path, "data.part"), "wb") as f:
+        f.truncate(size)
+
+    meta = {
+        "upload_id": upload_id,
+        "owner": owner_id,
+        "filename": os.path.basename(filename or "upload"),
+        "size": size,
+        "chunk_size": chunk_size,
+        "chunks": max(1, -(-size // chunk_size)),
+        "sha256": None,   # set once complete
+        "expected_sha256": sha256,
+        "status": UPLOAD_PENDING,
+        "received": [],
+        "created": time.time(),
+        "updated": time.time(),
+    }
+    _write_json(os.path.join(path, "meta.json"), meta)
+    return meta
+
+
+def write_chunk(upload_id, owner_id, index, stream, chunk_sha256):
+    """
+    Store chunk `index` read from a file-like `stream` after checking its length and
+    sha256. Re-sending a chunk overwrites it, so a client resumes by sending whatever
+    status()["missing"] lists.
+    """
+    meta = owned_upload(upload_id, owner_id)
+    if meta["status"] == UPLOAD_COMPLETE:
+        raise UploadError("Upload is already complete.")
+    if not 0 <= index < meta["chunks"]:
+        raise UploadError(f"Chunk index must be between 0 and {meta['chunks'] - 1}.")
+    if not chunk_sha256:
+        raise UploadError("Every chunk needs its sha256 (X-Chunk-SHA256 header).")
+
+    offset = index * meta["chunk_size"]
+    expected = min(meta["chunk_size"], meta["size"] - offset)
+    digest, written = hashlib.sha256(), 0
+    path = upload_path(upload_id)
+
+    with _locked(path, "data.lock", fcntl.LOCK_SH):
+        # Re-checked under the data lock: complete_upload may have finished since
+        if read_upload(upload_id)["status"] == UPLOAD_COMPLETE:
+            raise UploadError("Upload is already complete.")
+        try:
+            fd = os.open(os.path.join(path, "data.part"), os.O_WRONLY)
+        except FileNotFoundError:
+            raise UploadError("Upload is already complete.")
+
+        # Written straight to its place in data.part — no per-chunk files to stitch together later
+        try:
+            while written <= expected:
+                block = stream.read(min(READ_SIZE, expected - written + 1))
+                if not block:
+                    break
+                if written + len(block) > expected:
+                    raise UploadError(f"Chunk {index} is larger than {expected} bytes.")
+                os.pwrite(fd, block, offset + written)
+                digest.update(block)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written != expected:
+            raise UploadError(f"Chunk {index} has {written} bytes, expected {expected}.")
+        if digest.hexdigest() != chunk_sha256.lower():
+            raise UploadError(f"Chunk {index} checksum mismatch, please re-send it.")
+
+        with _locked(path):
+            meta = read_upload(upload_id)
+            if index not in meta["received"]:
+                meta["received"].append(index)
+            meta["updated"] = time.time()
+            _write_json(os.path.join(path, "meta.json"), meta)
+    return meta
+
+
+def complete_upload(upload_id, owner_id):
+    """
+    Hash the assembled file and move it to blobs/<sha256> (kept once per content).
+    Returns the upload's meta, now with status "complete" and the file's sha256.
+    """
+    meta = owned_upload(upload_id, owner_id)
+    if meta["status"] == UPLOAD_COMPLETE:
+        return meta
+
+    path = upload_path(upload_id)
+    # Waits for the chunks being written; later ones find the upload complete
+    with _locked(path, "data.lock"), _locked(path):
+        meta = read_upload(upload_id)
+        if meta["status"] == UPLOAD_COMPLETE:
+            return meta
+        if len(meta["received"]) < meta["chunks"]:
+            raise UploadError(f"{meta['chunks'] - len(meta['received'])} chunk(s) still missing.")
+
+        part = os.path.join(path, "data.part")
+        digest = hashlib.sha256()
+        with open(part, "rb") as f:
+            while block := f.read(READ_SIZE):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        if meta["expected_sha256"] and sha256 != meta["expected_sha256"]:
+            raise UploadError("File checksum does not match the sha256 given when the upload started.")
+
+        target = blob_path(sha256)
+        if os.path.exists(target):
+            os.remove(part)   # same content already stored
+        else:
+            os.chmod(part, 0o444)   # blobs are shared → never modified in place
+            os.replace(part, target)
+
+        meta.update(status=UPLOAD_COMPLETE, sha256=sha256, updated=time.time())
+        _write_json(os.path.join(path, "meta.json"), meta)
+
+    print(f"📦 Upload {upload_id[:12]} complete: {meta['size']} bytes, sha256 {sha256[:12]}")
+    return meta
+
+
+# ---------------- USING UPLOADS ----------------
+def uploaded_file(upload_id, owner_id):
+    """(path of the completed file, meta) — the path is shared, read it but don't modify or remove it."""
+    meta = owned_upload(upload_id, owner_id)
+    if meta["status"] != UPLOAD_COMPLETE or not os.path.exists(blob_path(meta["sha256"])):
+        raise UploadNotFound(f"Upload {upload_id} is not complete.")
+    return blob_path(meta["sha256"]), meta
+
+
+def link_upload(upload_id, owner_id, dest_path):
+    """
+    Make a completed upload available at `dest_path` (a hard link, so no copy; a copy
+    across filesystems). The caller owns dest_path and may delete it. Returns the meta.
+    """
+    source, meta = uploaded_file(upload_id, owner_id)
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    try:
+        os.link(source, dest_path)
+    except OSError:
+        shutil.copyfile(source, dest_path)
+    return meta
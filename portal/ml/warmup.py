@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+
+
+def warm_up():
+    """
+    Import the ML stack (torch, DeepPurpose, sklearn, matplotlib) now, so the first
+    Pharmal-Net request doesn't pay for it.
+
+    Called from the WSGI/ASGI entry points when PHARMALNET_WARMUP is on. Under
+    `gunicorn --preload` this runs once in the master and the forked workers share
+    the loaded pages; otherwise every worker warms up while booting.
+    """
+    start = time.perf_counter()
+    from . import dti_api  # noqa: F401
+
+    # Torch threads are left to the first prediction: thread pools must not exist before a fork
+    print(f"🔥 Pharmal-Net ML stack loaded in {time.perf_counter() - start:.2f}s")
+
+
+def warm_up_if_enabled():
+    if settings.PHARMALNET_WARMUP:
+        warm_up()
@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import jobs, results, uploads
+
+
+MB = 1024 * 1024
+
+_metrics = {"created": 0, "closed": 0, "swept": 0, "bytes_reclaimed": 0}
+_metrics_lock = threading.Lock()
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """A workspace would grow past its size quota."""
+
+
+# ---------------- WORKSPACES ----------------
+# Every temp file of a request or job lives in its own folder under
+#   <PHARMALNET_WORK_ROOT>/workspaces/<kind>-<id>/   (+ .workspace.json: pid, created)
+# and the folder is removed when the scope ends. Whatever a killed process leaves
+# behind is swept by the janitor.
+def workspaces_root():
+    root = os.path.join(str(settings.PHARMALNET_WORK_ROOT), "workspaces")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _tree_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+def _count(**deltas):
+    with _metrics_lock:
+        for key, delta in deltas.items():
+            _metrics[key] += delta
+
+
+class Workspace:
+    """
+    Scoped temp folder with a size quota:
+
+        with Workspace("predict") as ws:
+            csv_path = ws.write("input.csv", upload.chunks())
+            ...
+        # folder gone, whatever happened inside
+
+    close() can also be handed to whoever outlives the scope (e.g. a streamed response).
+    With `path`, that folder is used instead (e.g. a job's work folder, which must outlive
+    this process for a resume): the janitor and the created / closed counters leave it to
+    its owner (finish_job drops job work folders).
+    """
+
+    def __init__(self, kind, quota_mb=None, path=None):
+        start_janitor()
+        self.quota = (quota_mb or settings.PHARMALNET_WORKSPACE_QUOTA_MB) * MB
+        if path is None:
+            self.path = os.path.join(workspaces_root(), f"{kind}-{uuid.uuid4().hex}")
+            os.makedirs(self.path)
+            with open(os.path.join(self.path, ".workspace.json"), "w", encoding="utf-8") as f:
+                json.dump({"kind": kind, "pid": os.getpid(), "created": time.time()}, f)
+        else:
+            self.path = path
+            os.makedirs(self.path, exist_ok=True)
+        self.counted = path is None
+        self.closed = False
+        if self.counted:
+            _count(created=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file(self, name):
+        """Path for `name` inside the workspace (no sub-folders from user-given names)."""
+        return os.path.join(self.path, os.path.basename(name) or "file")
+
+    def mkdir(self, name):
+        path = self.file(name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def usage(self):
+        return _tree_bytes(self.path)
+
+    def check_quota(self, extra=0):
+        used = self.usage() + extra
+        if used > self.quota:
+            raise WorkspaceQuotaExceeded(
+                f"Temporary files need {used / MB:.0f} MB, over the {self.quota / MB:.0f} MB workspace quota."
+            )
+        return used
+
+    def write(self, name, chunks):
+        """Write byte chunks to `name`, stopping as soon as the quota would be exceeded."""
+        path = self.file(name)
+        budget = self.quota - self.usage()
+        written = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in chunks:
+                    written += len(chunk)
+                    if written > budget:
+                        raise WorkspaceQuotaExceeded(
+                            f"Upload exceeds the {self.quota / MB:.0f} MB workspace quota."
+                        )
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return path
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        reclaimed = self.usage()
+        shutil.rmtree(self.path, ignore_errors=True)
+        if self.counted:
+            _count(closed=1, bytes_reclaimed=reclaimed)
+
+
+# ---------------- JANITOR ----------------
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        return True
+    return True
+
+
+def _orphaned(path, now, max_age):
+    try:
+        with open(os.path.join(path, ".workspace.json"), encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        # Half-created (or foreign) folder: judge by its age alone
+        try:
+            return now - os.path.getmtime(path) > settings.PHARMALNET_JANITOR_GRACE_SECONDS
+        except FileNotFoundError:
+            return False   # closed meanwhile
+    age = now - info["created"]
+    # Owner gone (killed / restarted worker), or alive but far past any sane lifetime (pid reuse)
+    if not _pid_alive(info["pid"]):
+        return age > settings.PHARMALNET_JANITOR_GRACE_SECONDS
+    return age > max_age
+
+
+def _remove(path):
+    """Bytes freed by removing `path`, or None if it was already gone (closed, finished, ...)."""
+    try:
+        if os.path.isdir(path):
+            size = _tree_bytes(path)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            size = os.path.getsize(path)
+            os.remove(path)
+    except FileNotFoundError:
+        return None
+    return size
+
+
+@contextmanager
+def _locked(root):
+    # Every process runs a janitor: one sweep at a time per work root
+    with open(os.path.join(root, ".sweep.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def sweep(max_age_hours=None):
+    """
+    Remove orphaned workspaces, abandoned (never completed) chunked uploads, finished jobs
+    and completed uploads past their retention (+ blobs no upload refers to any more),
+    expired prediction results and pharmalnet_* temp folders left in the system temp
+    dir by older releases.
+    Returns {"removed", "bytes_reclaimed"}.
+    """
+    max_age = (max_age_hours or settings.PHARMALNET_WORKSPACE_MAX_AGE_HOURS) * 3600
+    root = workspaces_root()
+    with _locked(root):
+        now = time.time()
+        stale = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if os.path.isdir(path) and _orphaned(path, now, max_age):
+                stale.append(path)
+
+        stale += [uploads.upload_path(meta["upload_id"]) for meta in _expired_uploads(now, max_age)]
+        stale += [jobs.job_path(job["job_id"]) for job in _expired_jobs(now)]
+        stale += list(results.expired_results(max_age, now))
+        stale += list(_old_temp_dirs(now, max_age))
+
+        removed, reclaimed = 0, 0
+        for path in stale:
+            size = _remove(path)
+            if size is not None:
+                reclaimed += size
+                removed += 1
+
+        # Blobs after their uploads: a blob is kept as long as one upload still refers to it
+        for path in _unreferenced_blobs(now):
+            size = _remove(path)
+            if size is not None:
+                reclaimed += size
+                removed += 1
+
+    _count(swept=removed, bytes_reclaimed=reclaimed)
+    if removed:
+        print(f"🧹 Janitor removed {removed} orphaned workspaces / uploads / jobs / results ({reclaimed / MB:.1f} MB)")
+    return {"removed": removed, "bytes_reclaimed": reclaimed}
+
+
+def _old_temp_dirs(now, max_age):
+    tmp = tempfile.gettempdir()
+    for name in os.listdir(tmp):
+        path = os.path.join(tmp, name)
+        try:
+            if name.startswith("pharmalnet_") and os.path.isdir(path) and now - os.path.getmtime(path) > max_age:
+                yield path
+        except FileNotFoundError:
+            continue
+
+
+def _expired_uploads(now, max_age):
+    """Uploads never completed within max_age, and completed ones past their retention."""
+    retention = settings.PHARMALNET_UPLOAD_RETENTION_HOURS * 3600
+    root = uploads.uploads_root()
+    for upload_id in os.listdir(root):
+        meta = uploads.read_upload(upload_id) if upload_id != "blobs" else None
+        if meta is None:
+            continue
+        age = now - meta["updated"]
+        if (meta["status"] == uploads.UPLOAD_PENDING and age > max_age) or age > retention:
+            yield meta
+
+
+def _unreferenced_blobs(now):
+    root = uploads.uploads_root()
+    referenced = {
+        meta["sha256"] for meta in (uploads.read_upload(name) for name in os.listdir(root) if name != "blobs")
+        if meta and meta["sha256"]
+    }
+    blobs = os.path.join(root, "blobs")
+    for sha256 in os.listdir(blobs):
+        path = os.path.join(blobs, sha256)
+        try:
+            changed = os.stat(path).st_ctime
+        except FileNotFoundError:
+            continue
+        # ctime: moved into blobs/ just now by an upload whose meta isn't written yet → not ours to judge
+        if sha256 not in referenced and now - changed > settings.PHARMALNET_JANITOR_GRACE_SECONDS:
+            yield path
+
+
+def _expired_jobs(now):
+    """Finished jobs (done / failed) older than their retention; running ones are never touched."""
+    retention = settings.PHARMALNET_JOB_RETENTION_HOURS * 3600
+    for name in os.listdir(jobs.jobs_root()):
+        job = jobs.read_job(name)
+        if job is not None and jobs.is_finished(job) and now - job.get("finished", job["updated"]) > retention:
+            yield job
+
+
+def stats():
+    """Bytes in use by workspaces on this host + this process' created / reclaimed counters."""
+    root = workspaces_root()
+    active = [name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name))]
+    with _metrics_lock:
+        counters = dict(_metrics)
+    return {"active": len(active), "bytes_in_use": _tree_bytes(root), **counters}
+
+
+def _janitor_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep()
+        except Exception as e:
+            print("❌ Workspace janitor sweep failed:", e)
+
+
+def start_janitor():
+    """Start this process' background janitor thread (once; 0 s interval disables it)."""
+    global _janitor
+    interval = settings.PHARMALNET_JANITOR_INTERVAL_SECONDS
+    with _janitor_lock:
+        if _janitor is None and interval > 0:
+            _janitor = threading.Thread(target=_janitor_loop, args=(interval,), name="workspace-janitor", daemon=True)
+            _janitor.start()
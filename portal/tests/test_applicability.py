@@ -0,0 +1,49 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..ml import applicability
+
+
+def _brute_force_nearest(queries, train):
+    best = []
+    for q in queries.astype(bool):
+        similarities = [
+            (q & t).sum() / (q | t).sum() if (q | t).any() else 0.0
+            for t in train.astype(bool)
+        ]
+        best.append(max(similarities, default=0.0))
+    return np.array(best, dtype=np.float32)
+
+
+class TanimotoIndexTests(SimpleTestCase):
+    def fingerprints(self, n, bits=200, density=0.1, seed=0):
+        # 200 bits: not a multiple of 64, so the last packed word is padded
+        return (np.random.default_rng(seed).random((n, bits)) < density).astype(np.uint8)
+
+    def test_matches_brute_force(self):
+        train = self.fingerprints(150, seed=1)
+        queries = self.fingerprints(40, seed=2)
+        queries[5] = train[17]   # an exact training compound
+        queries[6] = 0           # no bits set
+        queries[7] = queries[8]  # a duplicate query
+
+        similarity = applicability.TanimotoIndex(applicability.pack(train)).nearest(queries)
+
+        np.testing.assert_allclose(similarity, _brute_force_nearest(queries, train), rtol=1e-6)
+        self.assertEqual(similarity[5], 1.0)
+        self.assertEqual(similarity[6], 0.0)
+
+    def test_threads_give_the_same_answer(self):
+        train = self.fingerprints(80, seed=3)
+        queries = self.fingerprints(300, density=0.2, seed=4)   # several query blocks
+        index = applicability.TanimotoIndex(applicability.pack(train))
+
+        np.testing.assert_array_equal(index.nearest(queries, threads=4), index.nearest(queries, threads=1))
+        np.testing.assert_allclose(index.nearest(queries, threads=4), _brute_force_nearest(queries, train), rtol=1e-6)
+
+    def test_empty_inputs(self):
+        index = applicability.TanimotoIndex(applicability.pack(self.fingerprints(5)))
+        self.assertEqual(len(index.nearest(np.zeros((0, 200), dtype=np.uint8))), 0)
+
+        empty_index = applicability.TanimotoIndex(applicability.pack(np.zeros((0, 200), dtype=np.uint8)))
+        np.testing.assert_array_equal(empty_index.nearest(self.fingerprints(3)), np.zeros(3, dtype=np.float32))
@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..ml import columnar
+
+
+class ColumnarTests(SimpleTestCase):
+    def test_round_trip(self):
+        payload = columnar.encode_columns(
+            {"Predicted": [1.5, None, float("inf"), -2.0], "row": [0, 1, 2, 3]},
+            meta={"total": 4},
+        )
+        meta, columns = columnar.decode_columns(payload)
+
+        self.assertEqual(meta, {"total": 4})
+        self.assertEqual(list(columns), ["Predicted", "row"])
+        np.testing.assert_array_equal(columns["Predicted"], np.array([1.5, np.nan, np.nan, -2.0], dtype=np.float32))
+        np.testing.assert_array_equal(columns["row"], np.arange(4, dtype=np.float32))
+
+    def test_columns_are_aligned(self):
+        payload = columnar.encode_columns({"a": [1.0], "b": [2.0, 3.0, 4.0], "c": []})
+        header_len = int.from_bytes(payload[4:8], "little")
+        header = json.loads(payload[8:8 + header_len])
+
+        for column in header["columns"]:
+            self.assertEqual(column["offset"] % columnar.ALIGN, 0)
+            self.assertGreaterEqual(column["offset"], 8 + header_len)
+        self.assertEqual(len(columnar.decode_columns(payload)[1]["c"]), 0)
+
+    def test_rejects_other_payloads(self):
+        with self.assertRaises(ValueError):
+            columnar.decode_columns(b"PK\x03\x04 not ours")
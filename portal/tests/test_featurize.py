@@ -0,0 +1,67 @@
+import os
+import importlib.util
+from unittest import mock, skipUnless
+
+import numpy as np
+from django.test import override_settings
+
+from .utils import WorkRootTestCase
+
+
+DRUGS = ["CCO", "c1ccccc1O", "CC(=O)O", "CCO", "CCN", "c1ccccc1O"] * 3
+TARGETS = ["MKTAYIAKQRQISFVKSHFSRQ", "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTK"] * 9
+LABELS = [float(i) for i in range(len(DRUGS))]
+
+
+@skipUnless(importlib.util.find_spec("DeepPurpose"), "needs DeepPurpose")
+@override_settings(PHARMALNET_FEATURIZE_WORKERS=1)
+class DataProcessTests(WorkRootTestCase):
+    def setUp(self):
+        super().setUp()
+        from DeepPurpose import utils
+        from ..ml import featurize
+        from ..ml.feature_cache import FeatureCache
+
+        self.utils, self.featurize = utils, featurize
+        self.cache = FeatureCache(os.path.join(self.work_root, "features.sqlite3"), 64 * 1024 * 1024)
+
+    def assert_same_frame(self, ours, theirs):
+        self.assertEqual(ours["SMILES"].tolist(), theirs["SMILES"].tolist())
+        self.assertEqual(ours["Target Sequence"].tolist(), theirs["Target Sequence"].tolist())
+        self.assertEqual(ours["Label"].tolist(), theirs["Label"].tolist())
+        for column in ("drug_encoding", "target_encoding"):
+            for a, b in zip(ours[column], theirs[column]):
+                np.testing.assert_allclose(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+
+    def test_matches_deeppurpose(self):
+        args = (DRUGS, TARGETS, LABELS, "Morgan", "Conjoint_triad")
+        self.assert_same_frame(
+            self.featurize.data_process(*args, split_method="no_split", cache=self.cache),
+            self.utils.data_process(*args, split_method="no_split"),
+        )
+
+    def test_random_split_matches_deeppurpose(self):
+        args = (DRUGS, TARGETS, LABELS, "Morgan", "Conjoint_triad")
+        ours = self.featurize.data_process(*args, frac=[0.5, 0.25, 0.25], random_seed=3, cache=self.cache)
+        theirs = self.utils.data_process(*args, frac=[0.5, 0.25, 0.25], random_seed=3)
+        for ours_split, theirs_split in zip(ours, theirs):
+            self.assert_same_frame(ours_split, theirs_split)
+
+    def test_each_unique_input_is_encoded_once(self):
+        calls = []
+        encoder = self.featurize.TARGET_ENCODERS["Conjoint_triad"]
+        counting = lambda value: calls.append(value) or encoder(value)
+
+        with mock.patch.dict(self.featurize.TARGET_ENCODERS, {"Conjoint_triad": counting}):
+            df = self.featurize.data_process(
+                DRUGS, TARGETS, LABELS, "Morgan", "Conjoint_triad", split_method="no_split", cache=self.cache
+            )
+            self.assertEqual(sorted(calls), sorted(set(TARGETS)))
+
+            # Second run: everything comes from the feature cache
+            self.featurize.data_process(
+                DRUGS, TARGETS, LABELS, "Morgan", "Conjoint_triad", split_method="no_split", cache=self.cache
+            )
+            self.assertEqual(len(calls), len(set(TARGETS)))
+
+        self.assertEqual(len(df), len(DRUGS))
@@ -0,0 +1,85 @@
+from django.test import SimpleTestCase
+
+from ..ml import hpsearch
+
+
+class SuccessiveHalvingTests(SimpleTestCase):
+    def schedule(self, n_trials, max_epochs=10):
+        """(trials, epochs) of every rung, each trial's loss being its trial number."""
+        alive = [{"trial": t, "status": "running", "val_loss": float(t)} for t in range(n_trials)]
+        epochs = max_epochs if n_trials == 1 else 1
+        rungs = []
+        while epochs is not None:
+            rungs.append((len(alive), epochs))
+            alive, epochs = hpsearch.next_rung(alive, epochs, max_epochs)
+        return rungs, alive
+
+    def test_rung_schedule(self):
+        self.assertEqual(self.schedule(1)[0], [(1, 10)])
+        self.assertEqual(self.schedule(2)[0], [(2, 1), (1, 10)])
+        self.assertEqual(self.schedule(9)[0], [(9, 1), (3, 3), (1, 10)])
+        self.assertEqual(self.schedule(27)[0], [(27, 1), (9, 3), (3, 9), (1, 10)])
+
+    def test_best_trial_wins(self):
+        _, winners = self.schedule(27)
+        self.assertEqual([w["trial"] for w in winners], [0])
+
+    def test_failed_and_pruned_trials(self):
+        alive = [
+            {"trial": 0, "status": "running", "val_loss": None},
+            {"trial": 1, "status": "failed", "val_loss": None},
+            {"trial": 2, "status": "running", "val_loss": 0.3},
+            {"trial": 3, "status": "running", "val_loss": 0.1},
+            {"trial": 4, "status": "running", "val_loss": 0.5},
+        ]
+        survivors, epochs = hpsearch.next_rung(alive, 1, 10)
+
+        self.assertEqual([s["trial"] for s in survivors], [3, 2])
+        self.assertEqual(epochs, 3)
+        self.assertEqual(alive[0]["status"], "pruned")   # no loss ranks last
+        self.assertEqual(alive[1]["status"], "failed")
+        self.assertEqual(alive[4]["status"], "pruned")
+
+    def test_sample_trials(self):
+        grid = {"LR": [0.001, 0.01], "batch_size": [64, 128, 256]}
+        self.assertEqual(len(hpsearch.sample_trials(grid)), 6)
+        self.assertEqual(len(hpsearch.sample_trials(grid, 4)), 4)
+        self.assertEqual(hpsearch.sample_trials(grid, 4, seed=1), hpsearch.sample_trials(grid, 4, seed=1))
+
+        ranged = {"LR": {"low": 1e-4, "high": 1e-2, "log": True}, "batch_size": [64, 128]}
+        trials = hpsearch.sample_trials(ranged, 5)
+        self.assertEqual(len(trials), 5)
+        self.assertTrue(all(1e-4 <= t["LR"] <= 1e-2 for t in trials))
+
+        with self.assertRaises(ValueError):
+            hpsearch.sample_trials(grid, 0)
+
+
+class SearchSpaceTests(SimpleTestCase):
+    def test_valid_space(self):
+        raw = '{"LR": {"low": 1e-4, "high": 1e-2, "log": true}, "batch_size": [32, 64], "cls_hidden_dims": [[512, 256]]}'
+        self.assertEqual(hpsearch.parse_search_space(raw)["batch_size"], [32, 64])
+
+    def test_invalid_spaces(self):
+        for space in (
+            {},
+            {"epochs": [1, 2]},
+            {"batch_size": []},
+            {"batch_size": [32, "64"]},
+            {"batch_size": [True]},
+            {"cls_hidden_dims": [[512, 0]]},
+            {"batch_size": {"low": 16, "high": 64}},
+            {"LR": {"low": 0.1, "high": 0.01}},
+            {"LR": {"low": 0, "high": 0.01, "log": True}},
+            {"decay": 0.1},
+        ):
+            with self.subTest(space=space), self.assertRaises(ValueError):
+                hpsearch.parse_search_space(space)
+
+    def test_trial_count(self):
+        self.assertIsNone(hpsearch.parse_trial_count(""))
+        self.assertIsNone(hpsearch.parse_trial_count(None))
+        self.assertEqual(hpsearch.parse_trial_count("12"), 12)
+        for raw in ("0", "-3", "many"):
+            with self.subTest(raw=raw), self.assertRaises(ValueError):
+                hpsearch.parse_trial_count(raw)
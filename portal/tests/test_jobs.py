@@ -0,0 +1,244 @@
+import os
+import time
+import threading
+import subprocess
+from unittest import mock
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.test import override_settings
+
+from ..ml import jobs
+from .utils import WorkRootTestCase
+
+
+def echo_handler(job_id, job_dir, params):
+    os.makedirs(jobs.work_path(job_id), exist_ok=True)
+    with open(os.path.join(jobs.work_path(job_id), "input.csv"), "w") as f:
+        f.write("SMILES\n")
+    jobs.emit_event(job_id, "stage", stage="echo")
+    return {"echo": params["value"]}
+
+
+def failing_handler(job_id, job_dir, params):
+    raise ValueError("Bad training data.")
+
+
+TEST_HANDLERS = {
+    "train": f"{__name__}.echo_handler",
+    "search": f"{__name__}.failing_handler",
+}
+
+
+def _statuses(job_id):
+    events, _ = jobs.read_events(job_id)
+    return [e["status"] for e in events if e["event"] == "status"]
+
+
+class JobTestCase(WorkRootTestCase):
+    """Job pools are thread pools of this process, running the test handlers above."""
+
+    def setUp(self):
+        super().setUp()
+        self.pools = []
+        for patcher in (
+            mock.patch.dict(jobs.JOB_HANDLERS, TEST_HANDLERS),
+            mock.patch.object(jobs, "_executor", None),
+            mock.patch.object(jobs, "_pool_id", None),
+            mock.patch.object(jobs, "ProcessPoolExecutor", self.thread_pool),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.wait_for_pools)
+
+    def thread_pool(self, max_workers, mp_context=None):
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.pools.append(pool)
+        return pool
+
+    def wait_for_pools(self):
+        for pool in self.pools:
+            pool.shutdown(wait=True)
+
+
+class CreateJobTests(JobTestCase):
+    def test_create(self):
+        job_id, path = jobs.create_job("train", 5, {"value": 1})
+
+        job = jobs.read_job(job_id)
+        self.assertEqual(path, jobs.job_path(job_id))
+        self.assertEqual((job["kind"], job["owner"], job["status"]), ("train", 5, jobs.JOB_QUEUED))
+        self.assertEqual(job["params"], {"value": 1})
+        self.assertEqual(_statuses(job_id), [jobs.JOB_QUEUED])
+        self.assertNotIn("params", jobs.public_job(job))
+
+    def test_unknown_jobs(self):
+        with self.assertRaises(ValueError):
+            jobs.create_job("bake", 5)
+        self.assertIsNone(jobs.read_job("not-a-job-id"))
+        self.assertIsNone(jobs.read_job("0" * 32))
+
+    def test_events_resume_from_offset(self):
+        job_id, _ = jobs.create_job("train", 5)
+        _, offset = jobs.read_events(job_id)
+        jobs.emit_event(job_id, "epoch", epoch=1)
+
+        events, _ = jobs.read_events(job_id, offset)
+        self.assertEqual([(e["seq"], e["event"]) for e in events], [(2, "epoch")])
+
+
+class SubmitJobTests(JobTestCase):
+    def test_submit_runs_the_handler(self):
+        job_id, _ = jobs.create_job("train", 5, {"value": 42})
+        jobs.submit_job(job_id).result()
+
+        job = jobs.read_job(job_id)
+        self.assertEqual(job["status"], jobs.JOB_DONE)
+        self.assertEqual(job["result"]["echo"], 42)
+        self.assertEqual((job["submitted_by"], job["attempts"]), (os.getpid(), 1))
+        self.assertIn("memory", job["result"])
+        self.assertEqual(_statuses(job_id), [jobs.JOB_QUEUED, jobs.JOB_RUNNING, jobs.JOB_DONE])
+        self.assertFalse(os.path.exists(jobs.work_path(job_id)))   # inputs dropped once done
+
+    def test_failed_handler(self):
+        job_id, _ = jobs.create_job("search", 5)
+        jobs.submit_job(job_id).result()
+
+        job = jobs.read_job(job_id)
+        self.assertEqual(job["status"], jobs.JOB_FAILED)
+        self.assertEqual(job["error"], "Bad training data.")
+        self.assertTrue(jobs.is_finished(job))
+        self.assertEqual(_statuses(job_id), [jobs.JOB_QUEUED, jobs.JOB_RUNNING, jobs.JOB_FAILED])
+
+
+# ---------------- RECOVERY ----------------
+def _dead_pid():
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+class BrokenPool:
+    """A pool whose processes are gone: submit() fails at once."""
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly.")
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class DyingPool(BrokenPool):
+    """A pool that breaks while the job is queued: the job's future fails."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly."))
+        return future
+
+
+class RecoveryTests(JobTestCase):
+    def wait_until_finished(self, *job_ids, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not all(jobs.is_finished(jobs.read_job(job_id)) for job_id in job_ids):
+            self.assertLess(time.monotonic(), deadline, "jobs did not finish")
+            time.sleep(0.01)
+
+    def test_job_of_a_dead_web_worker_is_resumed(self):
+        job_id, _ = jobs.create_job("train", 5, {"value": 1})
+        jobs.update_job(job_id, submitted_by=_dead_pid())
+
+        self.assertTrue(jobs.recover_job(jobs.read_job(job_id)))
+        self.wait_until_finished(job_id)
+        self.assertEqual(jobs.read_job(job_id)["status"], jobs.JOB_DONE)
+        events, _ = jobs.read_events(job_id)
+        self.assertTrue(any(e.get("resumed") for e in events))
+
+    def test_job_with_a_live_owner_is_left_alone(self):
+        job_id, _ = jobs.create_job("train", 5, {"value": 1})
+        jobs.update_job(job_id, submitted_by=os.getpid())
+        self.assertFalse(jobs.recover_job(jobs.read_job(job_id)))
+
+        jobs.update_job(job_id, status=jobs.JOB_RUNNING, pid=os.getpid())
+        self.assertFalse(jobs.recover_job(jobs.read_job(job_id)))
+
+    def test_dead_owner_is_claimed_once(self):
+        job_id, _ = jobs.create_job("train", 5, {"value": 1})
+        job = jobs.update_job(job_id, status=jobs.JOB_RUNNING, pid=_dead_pid(), attempts=1)
+
+        self.assertTrue(jobs.recover_job(job))
+        self.assertFalse(jobs.recover_job(job))   # e.g. another web worker with the old record
+        self.wait_until_finished(job_id)
+        self.assertEqual(jobs.read_job(job_id)["attempts"], 2)
+
+    @override_settings(PHARMALNET_JOB_MAX_ATTEMPTS=3)
+    def test_attempts_are_capped(self):
+        job_id, _ = jobs.create_job("train", 5, {"value": 1})
+        os.makedirs(jobs.work_path(job_id))
+        job = jobs.update_job(job_id, status=jobs.JOB_RUNNING, pid=_dead_pid(), attempts=3)
+
+        self.assertFalse(jobs.recover_job(job))
+        job = jobs.read_job(job_id)
+        self.assertEqual(job["status"], jobs.JOB_FAILED)
+        self.assertIn("died 3 times", job["error"])
+        self.assertFalse(os.path.exists(jobs.work_path(job_id)))
+        self.assertEqual(self.pools, [])   # never resubmitted
+
+    def strand_jobs(self):
+        """A queued and a running job of this process' pool "old", lost when it broke."""
+        queued_id, _ = jobs.create_job("train", 5, {"value": 1})
+        jobs.update_job(queued_id, submitted_by=os.getpid(), pool="old")
+        running_id, _ = jobs.create_job("train", 5, {"value": 2})
+        jobs.update_job(
+            running_id, submitted_by=os.getpid(), pool="old", status=jobs.JOB_RUNNING, pid=_dead_pid(), attempts=1
+        )
+        return queued_id, running_id
+
+    def test_broken_pool_on_submit_resubmits_its_jobs(self):
+        with mock.patch.object(jobs, "_executor", BrokenPool()), mock.patch.object(jobs, "_pool_id", "old"):
+            queued_id, running_id = self.strand_jobs()
+            job_id, _ = jobs.create_job("train", 5, {"value": 3})
+            jobs.submit_job(job_id).result()
+
+        self.wait_until_finished(queued_id, running_id, job_id)
+        self.assertEqual(len(self.pools), 1)
+        for resubmitted in (queued_id, running_id, job_id):
+            self.assertEqual(jobs.read_job(resubmitted)["status"], jobs.JOB_DONE)
+        self.assertEqual(jobs.read_job(running_id)["attempts"], 2)
+        self.assertEqual(jobs.read_job(job_id)["attempts"], 1)
+
+    def test_broken_job_future_resubmits_the_pool_jobs(self):
+        with mock.patch.object(jobs, "_executor", DyingPool()), mock.patch.object(jobs, "_pool_id", "old"):
+            queued_id, running_id = self.strand_jobs()
+            job_id, _ = jobs.create_job("train", 5, {"value": 3})
+            jobs.submit_job(job_id)
+            self.wait_until_finished(queued_id, running_id, job_id)
+
+        for resubmitted in (queued_id, running_id, job_id):
+            self.assertEqual(jobs.read_job(resubmitted)["status"], jobs.JOB_DONE)
+
+    def test_concurrent_callers_share_one_pool(self):
+        barrier = threading.Barrier(8)
+
+        def slow_pool(max_workers, mp_context):
+            time.sleep(0.05)
+            return self.thread_pool(max_workers)
+
+        def caller(_):
+            barrier.wait()
+            return jobs.get_executor()
+
+        with mock.patch.object(jobs, "ProcessPoolExecutor", slow_pool):
+            with ThreadPoolExecutor(max_workers=8) as callers:
+                executors = list(callers.map(caller, range(8)))
+
+        self.assertEqual(len(self.pools), 1)
+        self.assertEqual({id(executor) for executor, _ in executors}, {id(self.pools[0])})
+
+    def test_concurrent_writers_get_unique_event_ids(self):
+        job_id, _ = jobs.create_job("train", 5)
+        with ThreadPoolExecutor(max_workers=4) as writers:
+            list(writers.map(lambda n: [jobs.emit_event(job_id, "epoch", epoch=e) for e in range(50)], range(4)))
+
+        events, _ = jobs.read_events(job_id)
+        self.assertEqual([e["seq"] for e in events], list(range(1, 202)))
@@ -0,0 +1,63 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..ml import library
+from .utils import WorkRootTestCase
+
+
+def _numbered_batches(smiles, batch_rows=3, seed=0):
+    """make_batches for append_compounds: compounds without ids, numbered from first_row."""
+    fingerprints = (np.random.default_rng(seed).random((len(smiles), 1024)) < 0.1).astype(np.float32)
+
+    def make_batches(first_row):
+        for start in range(0, len(smiles), batch_rows):
+            stop = min(start + batch_rows, len(smiles))
+            time.sleep(0.01)   # encoding takes a while: let concurrent appends overlap
+            yield [str(first_row + r) for r in range(start, stop)], smiles[start:stop], fingerprints[start:stop]
+
+    return make_batches, fingerprints
+
+
+class LibraryTests(WorkRootTestCase):
+    def test_append_and_read_back(self):
+        library_id = library.create_library(1, "fragments")
+        smiles = ["CCO", "c1ccccc1", "CC(=O)Nc1ccc(O)cc1", "CCN", "Cl"]
+        make_batches, fingerprints = _numbered_batches(smiles)
+
+        self.assertEqual(library.append_compounds(library_id, make_batches), 5)
+        index = library.LibraryIndex(library_id)
+        ids, read_smiles, bits = zip(*index.batches(batch_rows=2))
+        self.assertEqual(sum(ids, []), ["0", "1", "2", "3", "4"])
+        self.assertEqual(sum(read_smiles, []), smiles)
+        np.testing.assert_array_equal(np.concatenate(bits), fingerprints)
+
+    def test_concurrent_appends_number_rows_once(self):
+        library_id = library.create_library(1, "fragments")
+        barrier = threading.Barrier(3)
+
+        def append(n):
+            make_batches, _ = _numbered_batches([f"C{'C' * n}O{k}" for k in range(4)], seed=n)
+            barrier.wait()
+            return library.append_compounds(library_id, make_batches)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            list(pool.map(append, range(3)))
+
+        index = library.LibraryIndex(library_id)
+        ids = sum((batch_ids for batch_ids, _, _ in index.batches()), [])
+        self.assertEqual(ids, [str(r) for r in range(12)])
+
+    def test_rejects_other_fingerprints(self):
+        library_id = library.create_library(1, "fragments")
+
+        def make_batches(first_row):
+            yield ["a"], ["CCO"], np.full((1, 1024), 0.5, dtype=np.float32)
+
+        with self.assertRaises(ValueError):
+            library.append_compounds(library_id, make_batches)
+        self.assertEqual(library.read_library(library_id)["count"], 0)
+        with self.assertRaises(ValueError):
+            library.create_library(1, "proteins", encoding="Conjoint_triad")
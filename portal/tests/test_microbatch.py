@@ -0,0 +1,81 @@
+import time
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from ..ml import microbatch
+
+
+class LengthBatcher(microbatch.MicroBatcher):
+    """Predicts len(smiles) + len(protein), recording the size of every batch."""
+
+    def __init__(self, *args, **kwargs):
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def predict_pairs(self, pairs):
+        self.batches.append(len(pairs))
+        if any(smiles == "fail" for smiles, _ in pairs):
+            raise ValueError("Invalid SMILES string.")
+        return [len(smiles) + len(protein) for smiles, protein in pairs]
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def batcher(self, max_batch=4, max_wait=0.05, idle_seconds=5.0):
+        key = (f"{id(self):064x}", "eager")
+        return LengthBatcher(key, model=None, backend="eager", max_batch=max_batch, max_wait=max_wait,
+                             idle_seconds=idle_seconds)
+
+    def test_queued_pairs_share_batches(self):
+        batcher = self.batcher(max_batch=4, max_wait=0.5)
+        pairs = [("C" * n, "MK" * n) for n in range(1, 11)]
+        futures = [batcher.submit(smiles, protein) for smiles, protein in pairs]
+
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual([value for value, _ in results], [3.0 * n for n in range(1, 11)])
+        self.assertEqual(batcher.batches, [4, 4, 2])   # full batches go at once, the rest after max_wait
+        self.assertEqual([size for _, size in results], [4] * 8 + [2] * 2)
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        batcher = self.batcher(max_wait=0.05)
+        start = time.monotonic()
+        value, size = batcher.submit("CCO", "MKT").result(timeout=5)
+
+        self.assertEqual((value, size), (6.0, 1))
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_errors_reach_every_pair_of_the_batch(self):
+        batcher = self.batcher(max_wait=0.2)
+        futures = [batcher.submit(smiles, "MKT") for smiles in ("CCO", "fail", "CCN")]
+
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        self.assertEqual(batcher.batches, [3])
+        self.assertEqual(batcher.submit("CCO", "MKT").result(timeout=5), (6.0, 1))   # the worker lives on
+
+    def test_idle_batcher_exits(self):
+        batcher = self.batcher(idle_seconds=0.05)
+        with mock.patch.dict(microbatch._batchers, {batcher.key: batcher}):
+            batcher._thread.join(timeout=5)
+            self.assertNotIn(batcher.key, microbatch._batchers)
+        self.assertFalse(batcher.alive)
+
+    def test_predict_pair_shares_one_batcher(self):
+        barrier = threading.Barrier(6)
+
+        def predict(n):
+            barrier.wait()
+            return microbatch.predict_pair("a" * 64, None, "C" * n, "MK")
+
+        with mock.patch.object(microbatch, "MicroBatcher", LengthBatcher), \
+                mock.patch.dict(microbatch._batchers, clear=True):
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                results = list(pool.map(predict, range(1, 7)))
+            batchers = list(microbatch._batchers.values())
+
+        self.assertEqual([value for value, _ in results], [n + 2.0 for n in range(1, 7)])
+        self.assertEqual(len(batchers), 1)
+        self.assertEqual(sum(batchers[0].batches), 6)
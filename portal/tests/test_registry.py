@@ -0,0 +1,179 @@
+import io
+import os
+import time
+import hashlib
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..ml import registry
+from .utils import WorkRootTestCase
+
+
+def _model_zip(weights=b"weights", folder="result/model"):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zipf:
+        zipf.writestr(f"{folder}/model.pt", weights)
+        zipf.writestr(f"{folder}/config.pkl", b"config")
+        zipf.writestr("README.txt", b"trained on BindingDB")
+    return buf.getvalue()
+
+
+def _chunks(data, size=100):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+# ---------------- REGISTRATION ----------------
+class RegisterModelTests(WorkRootTestCase):
+    def test_register_and_locate(self):
+        data = _model_zip()
+        model_id, created = registry.register_model(_chunks(data), 1, name="kiba")
+
+        self.assertTrue(created)
+        self.assertEqual(model_id, hashlib.sha256(data).hexdigest())
+        model_dir = registry.model_dir_for(model_id, 1)
+        self.assertEqual(sorted(os.listdir(model_dir)), ["config.pkl", "model.pt"])
+        with open(registry.model_zip_for(model_id, 1), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_same_bytes_are_stored_once(self):
+        data = _model_zip()
+        first_id, first_created = registry.register_model(_chunks(data), 1, name="a")
+        again_id, again_created = registry.register_model(_chunks(data), 1, name="b")
+        other_id, other_created = registry.register_model(_chunks(data), 2, name="c")
+
+        self.assertEqual({first_id, again_id, other_id}, {first_id})
+        self.assertEqual((first_created, again_created, other_created), (True, False, False))
+        self.assertEqual(registry.read_manifest(1)[first_id]["name"], "a")   # first registration kept
+        self.assertEqual(registry.read_manifest(2)[first_id]["name"], "c")
+        stored = [name for name in os.listdir(registry.models_root()) if registry.model_path(name)]
+        self.assertEqual(stored, [first_id])
+
+    def test_register_file_from_disk(self):
+        data = _model_zip(b"other weights")
+        zip_path = os.path.join(self.work_root, "trained.zip")
+        with open(zip_path, "wb") as f:
+            f.write(data)
+
+        model_id, created = registry.register_model_file(zip_path, 1)
+        os.remove(zip_path)   # the caller may drop its copy
+
+        self.assertTrue(created)
+        with open(registry.model_zip_for(model_id, 1), "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_other_users_models_are_not_found(self):
+        model_id, _ = registry.register_model(_chunks(_model_zip()), 1)
+
+        with self.assertRaises(registry.ModelNotFound):
+            registry.model_dir_for(model_id, 2)
+        with self.assertRaises(registry.ModelNotFound):
+            registry.model_dir_for("f" * 64, 1)
+        self.assertIsNone(registry.model_path("../../etc"))
+
+    def test_rejects_invalid_zips(self):
+        with self.assertRaises(ValueError):
+            registry.register_model([b"not a zip"], 1)
+
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zipf:
+            zipf.writestr("model.pt", b"weights")   # no .pkl
+        with self.assertRaises(ValueError):
+            registry.register_model([buf.getvalue()], 1)
+
+        self.assertEqual(registry.read_manifest(1), {})
+        leftovers = [name for name in os.listdir(registry.models_root()) if not name.endswith(".lock")]
+        self.assertEqual(leftovers, ["manifests"])   # no artifact, staging folder or .zip.part
+
+
+# ---------------- MANIFESTS & GARBAGE COLLECTION ----------------
+class ManifestTests(WorkRootTestCase):
+    def test_list_and_unregister(self):
+        first_id, _ = registry.register_model(_chunks(_model_zip(b"first")), 1, name="first")
+        second_id, _ = registry.register_model(_chunks(_model_zip(b"second")), 1, name="second")
+
+        self.assertEqual([m["model_id"] for m in registry.list_models(1)], [second_id, first_id])
+        registry.unregister_model(first_id.upper(), 1)   # ids are case-insensitive everywhere
+
+        self.assertEqual([m["name"] for m in registry.list_models(1)], ["second"])
+        with self.assertRaises(registry.ModelNotFound):
+            registry.unregister_model(first_id, 1)
+        with self.assertRaises(registry.ModelNotFound):
+            registry.unregister_model(second_id, 2)
+
+
+class CollectGarbageTests(WorkRootTestCase):
+    def leftover(self, name, age):
+        path = os.path.join(registry.models_root(), name)
+        if name.endswith(".zip.part"):
+            with open(path, "wb") as f:
+                f.write(b"partial")
+        else:
+            os.makedirs(os.path.join(path, "files"))
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return name
+
+    def test_sweeps_unreferenced_models_and_stale_leftovers(self):
+        kept_id, _ = registry.register_model(_chunks(_model_zip(b"kept")), 1)
+        shared_id, _ = registry.register_model(_chunks(_model_zip(b"shared")), 1)
+        registry.register_model(_chunks(_model_zip(b"shared")), 2)
+        dropped_id, _ = registry.register_model(_chunks(_model_zip(b"dropped")), 1)
+        registry.unregister_model(shared_id, 1)
+        registry.unregister_model(dropped_id, 1)
+
+        stale = {self.leftover(".crashed.zip.part", 2 * 3600), self.leftover(f".{'a' * 64}.stage", 2 * 3600)}
+        fresh = {self.leftover(".uploading.zip.part", 0), self.leftover(f".{'b' * 64}.stage", 0)}
+
+        preview = registry.collect_garbage(dry_run=True, stale_seconds=3600)
+        self.assertEqual(set(preview["removed"]), {dropped_id} | stale)
+        self.assertTrue(os.path.isdir(registry.model_path(dropped_id)))   # dry run: nothing removed
+
+        report = registry.collect_garbage(stale_seconds=3600)
+        self.assertEqual(report["live"], 2)
+        self.assertEqual(set(report["removed"]), {dropped_id} | stale)
+        self.assertGreater(report["bytes_reclaimed"], 0)
+        self.assertEqual(report["bytes_reclaimed"], preview["bytes_reclaimed"])
+
+        remaining = {name for name in os.listdir(registry.models_root()) if not name.endswith(".lock")}
+        self.assertEqual(remaining, {"manifests", kept_id, shared_id} | fresh)
+        registry.model_dir_for(shared_id, 2)   # still owned by user 2
+
+
+# ---------------- LOADED-MODEL CACHE ----------------
+class ModelCacheTests(WorkRootTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loads = []
+
+    def loader(self, model_dir):
+        time.sleep(0.02)
+        self.loads.append(model_dir)
+        return object()
+
+    def test_lru(self):
+        cache = registry.ModelCache(2, loader=self.loader)
+        a = cache.get("a" * 64, "/models/a")
+        cache.get("b" * 64, "/models/b")
+
+        self.assertIs(cache.get("A" * 64, "/models/a"), a)   # a is now the most recent
+        cache.get("c" * 64, "/models/c")                      # evicts b
+        cache.get("b" * 64, "/models/b")
+
+        self.assertEqual(self.loads, ["/models/a", "/models/b", "/models/c", "/models/b"])
+        stats = cache.stats()
+        self.assertEqual((stats["loaded"], stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 4, 2))
+
+    def test_concurrent_misses_load_once(self):
+        cache = registry.ModelCache(2, loader=self.loader)
+        barrier = threading.Barrier(6)
+
+        def get(_):
+            barrier.wait()
+            return cache.get("a" * 64, "/models/a")
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            loaded = list(pool.map(get, range(6)))
+
+        self.assertEqual(self.loads, ["/models/a"])
+        self.assertEqual(len({id(model) for model in loaded}), 1)
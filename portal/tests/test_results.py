@@ -0,0 +1,81 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from django.test import override_settings
+
+from ..ml import results
+from .utils import WorkRootTestCase
+
+
+class ResultsTests(WorkRootTestCase):
+    def save(self, predicted, chunk_rows=3):
+        frame = pd.DataFrame({
+            "SMILES": [f"C{'C' * i}O" for i in range(len(predicted))],
+            "Target Sequence": [f"MK{i}é" for i in range(len(predicted))],
+            "Predicted": predicted,
+        })
+        chunks = (frame.iloc[start:start + chunk_rows] for start in range(0, len(frame), chunk_rows))
+        result_id, total = results.save_predictions(7, list(frame.columns), chunks, meta={"model": "m"})
+        return frame, result_id, total
+
+    def test_round_trip(self):
+        frame, result_id, total = self.save([0.5, 2.0, np.nan, -1.0, 3.5, 1.0, 0.0])
+
+        self.assertEqual(total, 7)
+        meta = results.read_result(result_id)
+        self.assertEqual(meta["owner"], 7)
+        self.assertEqual(meta["model"], "m")
+        self.assertEqual(meta["columns"], ["SMILES", "Target Sequence"])
+
+        page = results.query(result_id, offset=0, limit=100)
+        self.assertEqual(page["total"], 7)
+        self.assertEqual([r["SMILES"] for r in page["rows"]], frame["SMILES"].tolist())
+        self.assertEqual([r["Target Sequence"] for r in page["rows"]], frame["Target Sequence"].tolist())
+        self.assertIsNone(page["rows"][2]["Predicted"])
+
+        downloaded = pd.read_csv(io.StringIO("".join(results.iter_csv(result_id, chunk_rows=2))))
+        pd.testing.assert_frame_equal(downloaded, frame, check_dtype=False, atol=1e-6)
+
+    def test_sort_filter_and_paging(self):
+        predicted = [0.5, 2.0, np.nan, -1.0, 3.5, 1.0, 0.0]
+        _, result_id, _ = self.save(predicted)
+
+        ascending = results.query(result_id, limit=100, sort="predicted")["rows"]
+        self.assertEqual([r["row"] for r in ascending], [3, 6, 0, 5, 1, 4, 2])   # missing last
+        descending = results.query(result_id, limit=100, sort="-predicted")["rows"]
+        self.assertEqual([r["row"] for r in descending], [4, 1, 5, 0, 6, 3, 2])
+
+        page = results.query(result_id, offset=1, limit=2, sort="-predicted", min_value=0.0, max_value=2.0)
+        self.assertEqual(page["total"], 4)
+        self.assertEqual([r["row"] for r in page["rows"]], [5, 0])
+
+        with self.assertRaises(ValueError):
+            results.query(result_id, sort="SMILES")
+
+    def test_empty_result(self):
+        _, result_id, total = self.save([])
+
+        self.assertEqual(total, 0)
+        self.assertEqual(results.query(result_id)["rows"], [])
+        self.assertEqual("".join(results.iter_csv(result_id)), "SMILES,Target Sequence,Predicted\n")
+
+    def test_delete_result(self):
+        _, result_id, _ = self.save([])
+        results.delete_result(result_id)
+
+        self.assertIsNone(results.read_result(result_id))
+        self.assertEqual(os.listdir(results.results_root()), [])
+        results.delete_result(result_id)        # already gone
+        results.delete_result("not-a-result")   # malformed id
+
+    def test_expired_result(self):
+        _, result_id, _ = self.save([1.0])
+        expires = results.read_result(result_id)["expires"]
+
+        self.assertEqual(list(results.expired_results(3600, now=expires - 1)), [])
+        self.assertEqual(list(results.expired_results(3600, now=expires)), [results.result_path(result_id)])
+        with override_settings(PHARMALNET_RESULT_TTL_HOURS=0):
+            _, gone_id, _ = self.save([1.0])
+        self.assertIsNone(results.read_result(gone_id))
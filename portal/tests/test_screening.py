@@ -0,0 +1,61 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..ml import screening
+
+
+class TopKTests(SimpleTestCase):
+    def run_board(self, k, largest, batch_size=37):
+        rng = np.random.default_rng(k)
+        scores = rng.normal(size=500)
+        scores[rng.choice(500, size=40, replace=False)] = np.nan
+        ids = [f"cpd{r}" for r in range(500)]
+        smiles = [f"C{r}" for r in range(500)]
+
+        board = screening.TopK(k, largest)
+        for start in range(0, 500, batch_size):
+            end = start + batch_size
+            board.push_batch(scores[start:end], np.arange(start, min(end, 500)), ids[start:end], smiles[start:end])
+
+        valid = [r for r in range(500) if not np.isnan(scores[r])]
+        expected = sorted(valid, key=lambda r: scores[r], reverse=largest)[:k]
+        return board.hits(), expected, scores
+
+    def test_largest_matches_sorted(self):
+        hits, expected, scores = self.run_board(25, largest=True)
+
+        self.assertEqual([h["row"] for h in hits], expected)
+        self.assertEqual([h["rank"] for h in hits], list(range(1, 26)))
+        self.assertEqual([h["id"] for h in hits], [f"cpd{r}" for r in expected])
+        self.assertEqual([h["smiles"] for h in hits], [f"C{r}" for r in expected])
+        self.assertEqual([h["score"] for h in hits], [float(scores[r]) for r in expected])
+
+    def test_smallest_matches_sorted(self):
+        hits, expected, scores = self.run_board(10, largest=False, batch_size=3)
+
+        self.assertEqual([h["row"] for h in hits], expected)
+        self.assertEqual([h["score"] for h in hits], [float(scores[r]) for r in expected])
+
+    def test_fewer_compounds_than_k(self):
+        hits, expected, _ = self.run_board(1000, largest=True)
+
+        self.assertEqual(len(hits), 460)   # NaN scores never count as hits
+        self.assertEqual([h["row"] for h in hits], expected)
+
+
+class ParseTargetsTests(SimpleTestCase):
+    def test_fasta(self):
+        text = ">EGFR kinase\nMRPSGTAG\nAGALLALL\n\n>\nMKTAYIAK\n"
+        self.assertEqual(screening.parse_targets(text), [("EGFR kinase", "MRPSGTAGAGALLALL"), ("target_2", "MKTAYIAK")])
+
+    def test_one_per_line(self):
+        text = "EGFR\tMRPSGTAG\nMKTAYIAK\n  ABL1 MLEICLKL  \n"
+        self.assertEqual(
+            screening.parse_targets(text),
+            [("EGFR", "MRPSGTAG"), ("target_2", "MKTAYIAK"), ("ABL1", "MLEICLKL")],
+        )
+
+    def test_empty(self):
+        for text in ("", "  \n\n", None):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                screening.parse_targets(text)
@@ -0,0 +1,105 @@
+import io
+import os
+import time
+import hashlib
+import threading
+
+from ..ml import uploads
+from .utils import WorkRootTestCase
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadTests(WorkRootTestCase):
+    def upload(self, data, chunk_size, order=None):
+        meta = uploads.create_upload(1, "library.csv", len(data), sha256=_sha256(data), chunk_size=chunk_size)
+        for index in order or range(meta["chunks"]):
+            chunk = data[index * chunk_size:(index + 1) * chunk_size]
+            uploads.write_chunk(meta["upload_id"], 1, index, io.BytesIO(chunk), _sha256(chunk))
+        return uploads.complete_upload(meta["upload_id"], 1)
+
+    def test_chunks_assemble_in_any_order(self):
+        data = bytes(range(256)) * 41   # 10496 bytes: 10 full chunks and a short one
+        meta = self.upload(data, chunk_size=1024, order=[10, 3, 0, 7, 1, 9, 2, 8, 4, 6, 5])
+
+        self.assertEqual(meta["chunks"], 11)
+        self.assertEqual(meta["status"], uploads.UPLOAD_COMPLETE)
+        self.assertEqual(meta["sha256"], _sha256(data))
+        path, _ = uploads.uploaded_file(meta["upload_id"], 1)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_zero_size_upload(self):
+        meta = self.upload(b"", chunk_size=1024)
+
+        self.assertEqual(meta["chunks"], 1)
+        self.assertEqual(meta["sha256"], _sha256(b""))
+        path, _ = uploads.uploaded_file(meta["upload_id"], 1)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"")
+
+    def test_same_content_completes_at_once(self):
+        data = b"SMILES\nCCO\n"
+        first = self.upload(data, chunk_size=4)
+        again = uploads.create_upload(1, "copy.csv", len(data), sha256=_sha256(data), chunk_size=4)
+
+        self.assertEqual(again["upload_id"], first["upload_id"])
+
+    def test_rejects_bad_chunks(self):
+        meta = uploads.create_upload(1, "library.csv", 10, chunk_size=4)
+        upload_id = meta["upload_id"]
+
+        with self.assertRaises(uploads.UploadError):   # checksum
+            uploads.write_chunk(upload_id, 1, 0, io.BytesIO(b"abcd"), _sha256(b"abce"))
+        with self.assertRaises(uploads.UploadError):   # too long
+            uploads.write_chunk(upload_id, 1, 2, io.BytesIO(b"xyz"), _sha256(b"xyz"))
+        with self.assertRaises(uploads.UploadError):   # out of range
+            uploads.write_chunk(upload_id, 1, 3, io.BytesIO(b""), _sha256(b""))
+        with self.assertRaises(uploads.UploadNotFound):   # someone else's
+            uploads.write_chunk(upload_id, 2, 0, io.BytesIO(b"abcd"), _sha256(b"abcd"))
+        with self.assertRaises(uploads.UploadError):   # incomplete
+            uploads.complete_upload(upload_id, 1)
+
+    def test_chunk_after_completion_is_refused(self):
+        data = b"SMILES\nCCO\n"
+        meta = self.upload(data, chunk_size=4)
+
+        with self.assertRaisesMessage(uploads.UploadError, "already complete"):
+            uploads.write_chunk(meta["upload_id"], 1, 0, io.BytesIO(b"XXXX"), _sha256(b"XXXX"))
+        path, _ = uploads.uploaded_file(meta["upload_id"], 1)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_completion_waits_for_chunks_being_written(self):
+        data = b"SMILES\nCCO\n"
+        meta = uploads.create_upload(1, "library.csv", len(data), chunk_size=4)
+        upload_id = meta["upload_id"]
+        for index in range(meta["chunks"]):
+            chunk = data[index * 4:(index + 1) * 4]
+            uploads.write_chunk(upload_id, 1, index, io.BytesIO(chunk), _sha256(chunk))
+
+        completed = []
+        completer = threading.Thread(target=lambda: completed.append(uploads.complete_upload(upload_id, 1)))
+
+        class SlowStream(io.BytesIO):
+            """A re-sent chunk still arriving when the client completes the upload."""
+
+            def read(self, size=-1):
+                if not completer.is_alive() and not completed:
+                    completer.start()
+                    time.sleep(0.1)
+                return super().read(size)
+
+        uploads.write_chunk(upload_id, 1, 0, SlowStream(b"smil"), _sha256(b"smil"))
+        completer.join(timeout=5)
+
+        final = b"smil" + data[4:]
+        self.assertEqual(completed[0]["sha256"], _sha256(final))
+        path, _ = uploads.uploaded_file(upload_id, 1)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), final)
+        with self.assertRaisesMessage(uploads.UploadError, "already complete"):   # data.part is gone
+            uploads.write_chunk(upload_id, 1, 1, io.BytesIO(data[4:8]), _sha256(data[4:8]))
+        self.assertFalse(os.path.exists(os.path.join(uploads.upload_path(upload_id), "data.part")))
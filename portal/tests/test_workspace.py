@@ -0,0 +1,117 @@
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+import subprocess
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import override_settings
+
+from ..ml import results, uploads, workspace
+from .utils import WorkRootTestCase
+
+
+def _dead_pid():
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+@override_settings(PHARMALNET_JANITOR_INTERVAL_SECONDS=0, PHARMALNET_JANITOR_GRACE_SECONDS=60)
+class WorkspaceTests(WorkRootTestCase):
+    def test_folder_is_removed_on_close(self):
+        with workspace.Workspace("predict") as ws:
+            empty = ws.usage()   # just .workspace.json
+            path = ws.write("../input.csv", [b"SMILES\n", b"CCO\n"])
+            self.assertEqual(os.path.dirname(path), ws.path)   # no way out of the workspace
+            self.assertEqual(ws.usage() - empty, 11)
+        self.assertFalse(os.path.exists(ws.path))
+
+    def test_quota(self):
+        with workspace.Workspace("predict", quota_mb=1) as ws:
+            with self.assertRaises(workspace.WorkspaceQuotaExceeded):
+                ws.write("big.csv", [b"x" * workspace.MB, b"x"])
+            self.assertFalse(os.path.exists(ws.file("big.csv")))   # nothing half-written left
+
+            empty = ws.usage()
+            ws.write("small.csv", [b"x" * 1000])
+            self.assertEqual(ws.check_quota(), empty + 1000)
+            with self.assertRaises(workspace.WorkspaceQuotaExceeded):
+                ws.check_quota(extra=workspace.MB)
+
+    def test_counters_skip_path_bound_workspaces(self):
+        before = workspace.stats()
+        with workspace.Workspace("predict"):
+            pass
+        job_ws = workspace.Workspace("job", path=os.path.join(self.work_root, "job-work"))
+        job_ws.write("input.csv", [b"SMILES\n"])   # left to its owner, never closed here
+
+        after = workspace.stats()
+        self.assertEqual(after["created"] - before["created"], 1)
+        self.assertEqual(after["closed"] - before["closed"], 1)
+
+
+@override_settings(PHARMALNET_JANITOR_INTERVAL_SECONDS=0, PHARMALNET_JANITOR_GRACE_SECONDS=60)
+class SweepTests(WorkRootTestCase):
+    def orphan(self, age=3600):
+        """A workspace left behind by a killed worker."""
+        ws = workspace.Workspace("predict")
+        ws.write("input.csv", [b"SMILES\nCCO\n"])
+        with open(os.path.join(ws.path, ".workspace.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": "predict", "pid": _dead_pid(), "created": time.time() - age}, f)
+        return ws.path
+
+    def test_removes_orphans_and_keeps_live_workspaces(self):
+        orphan = self.orphan()
+        recent = self.orphan(age=0)   # within the grace period: its owner may just have died
+        with workspace.Workspace("predict") as live:
+            report = workspace.sweep()
+            self.assertTrue(os.path.isdir(live.path))
+
+        self.assertEqual(report["removed"], 1)
+        self.assertGreater(report["bytes_reclaimed"], 0)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.isdir(recent))
+
+    @override_settings(PHARMALNET_UPLOAD_RETENTION_HOURS=1)
+    def test_expired_upload_takes_its_blob(self):
+        data = b"SMILES\nCCO\n"
+        meta = uploads.create_upload(1, "library.csv", len(data), chunk_size=len(data))
+        uploads.write_chunk(meta["upload_id"], 1, 0, io.BytesIO(data), hashlib.sha256(data).hexdigest())
+        meta = uploads.complete_upload(meta["upload_id"], 1)
+        blob = uploads.blob_path(meta["sha256"])
+
+        with mock.patch.object(workspace.time, "time", return_value=time.time() + 2 * 3600):
+            report = workspace.sweep()
+
+        self.assertEqual(report["removed"], 2)
+        self.assertIsNone(uploads.read_upload(meta["upload_id"]))
+        self.assertFalse(os.path.exists(blob))
+
+    def test_paths_removed_by_someone_else_are_skipped(self):
+        orphan = self.orphan()
+        gone = os.path.join(results.results_root(), "deleted-meanwhile")
+
+        with mock.patch.object(results, "expired_results", return_value=iter([gone])):
+            report = workspace.sweep()
+
+        self.assertEqual(report["removed"], 1)
+        self.assertFalse(os.path.exists(orphan))
+        self.assertIsNone(workspace._remove(gone))
+
+    def test_concurrent_sweeps_remove_each_path_once(self):
+        orphans = [self.orphan() for _ in range(6)]
+        barrier = threading.Barrier(4)
+
+        def sweep(_):
+            barrier.wait()
+            return workspace.sweep()["removed"]
+
+        with ThreadPoolExecutor(max_workers=4) as janitors:
+            removed = list(janitors.map(sweep, range(4)))
+
+        self.assertEqual(sum(removed), len(orphans))
+        self.assertFalse(any(os.path.exists(path) for path in orphans))
@@ -0,0 +1,41 @@
+import io
+import zipfile
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..zipstream import iter_zip
+
+
+class ZipStreamTests(SimpleTestCase):
+    def test_archive_opens_with_zipfile(self):
+        with tempfile.TemporaryDirectory() as folder:
+            text_path = f"{folder}/results.csv"
+            image_path = f"{folder}/graph.png"
+            text = b"SMILES,Predicted\n" + b"CCO,1.5\n" * 200_000
+            image = np.random.default_rng(0).bytes(3000)
+            with open(text_path, "wb") as f:
+                f.write(text)
+            with open(image_path, "wb") as f:
+                f.write(image)
+
+            archive = b"".join(iter_zip([
+                ("details.txt", b"Module: DTI\n"),
+                ("run/results.csv", text_path),
+                ("run/graph.png", image_path),
+                ("run/gone.csv", f"{folder}/missing.csv"),
+            ]))
+
+        with zipfile.ZipFile(io.BytesIO(archive)) as zipf:
+            self.assertIsNone(zipf.testzip())
+            self.assertEqual(zipf.namelist(), ["details.txt", "run/results.csv", "run/graph.png"])
+            self.assertEqual(zipf.read("details.txt"), b"Module: DTI\n")
+            self.assertEqual(zipf.read("run/results.csv"), text)
+            self.assertEqual(zipf.read("run/graph.png"), image)
+            self.assertEqual(zipf.getinfo("run/results.csv").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zipf.getinfo("run/graph.png").compress_type, zipfile.ZIP_STORED)
+
+    def test_empty_archive(self):
+        with zipfile.ZipFile(io.BytesIO(b"".join(iter_zip([])))) as zipf:
+            self.assertEqual(zipf.namelist(), [])
@@ -0,0 +1,15 @@
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+
+class WorkRootTestCase(SimpleTestCase):
+    """Runs each test against its own empty PHARMALNET_WORK_ROOT."""
+
+    def setUp(self):
+        work_root = tempfile.TemporaryDirectory()
+        self.addCleanup(work_root.cleanup)
+        self.work_root = work_root.name
+        settings_override = override_settings(PHARMALNET_WORK_ROOT=work_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
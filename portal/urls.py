@@ -1,6 +1,5 @@
 from django.urls import path
 from . import views
-from portal.ml.dti_api import run_pharmalnet_prediction  # ✅ Add this import
 
 urlpatterns = [
     # ---------------- AUTH ----------------
@@ -22,5 +21,22 @@ urlpatterns = [
 
     # ---------------- API ----------------
     path('pharmalnet/train/', views.pharmalnet_train_api_view, name='pharmalnet_train_api'),
-    path('pharmalnet/predict/', run_pharmalnet_prediction, name='pharmalnet_predict_api'),  # ✅ Keep only this one
+    path('pharmalnet/screen/', views.pharmalnet_screen_api_view, name='pharmalnet_screen_api'),
+    path('pharmalnet/libraries/', views.pharmalnet_libraries_view, name='pharmalnet_libraries'),
+    path('pharmalnet/libraries/<str:library_id>/', views.pharmalnet_libraries_view, name='pharmalnet_library'),
+    path('pharmalnet/uploads/', views.pharmalnet_uploads_view, name='pharmalnet_uploads'),
+    path('pharmalnet/uploads/<str:upload_id>/', views.pharmalnet_uploads_view, name='pharmalnet_upload'),
+    path('pharmalnet/uploads/<str:upload_id>/chunks/<int:index>/', views.pharmalnet_upload_chunk_view, name='pharmalnet_upload_chunk'),
+    path('pharmalnet/uploads/<str:upload_id>/complete/', views.pharmalnet_upload_complete_view, name='pharmalnet_upload_complete'),
+    path('pharmalnet/jobs/<str:job_id>/', views.pharmalnet_job_status_view, name='pharmalnet_job_status'),
+    path('pharmalnet/jobs/<str:job_id>/events/', views.pharmalnet_job_events_view, name='pharmalnet_job_events'),
+    path('pharmalnet/jobs/<str:job_id>/result/', views.pharmalnet_job_result_view, name='pharmalnet_job_result'),
+    path('pharmalnet/jobs/<str:job_id>/plot/', views.pharmalnet_job_plot_view, name='pharmalnet_job_plot'),
+    path('pharmalnet/models/', views.pharmalnet_models_view, name='pharmalnet_models'),
+    path('pharmalnet/models/<str:model_id>/', views.pharmalnet_model_view, name='pharmalnet_model'),
+    path('pharmalnet/models/<str:model_id>/download/', views.pharmalnet_model_download_view, name='pharmalnet_model_download'),
+    path('pharmalnet/results/<str:result_id>/', views.pharmalnet_result_view, name='pharmalnet_result'),
+    path('pharmalnet/results/<str:result_id>/download/', views.pharmalnet_result_download_view, name='pharmalnet_result_download'),
+    path('pharmalnet/predict/pair/', views.pharmalnet_pair_predict_api_view, name='pharmalnet_pair_predict_api'),
+    path('pharmalnet/predict/', views.pharmalnet_predict_api_view, name='pharmalnet_predict_api'),  # ✅ Keep only this one
 ]
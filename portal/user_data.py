@@ -0,0 +1,109 @@
+import os
+import uuid
+import shutil
+import threading
+
+from django.conf import settings
+
+from .zipstream import folder_files
+
+
+_cleaner = None
+_cleaner_lock = threading.Lock()
+_trash_pending = threading.Event()
+
+
+# ---------------- USER WORKSPACES ----------------
+# media/user_data/user_<id>/<Module_Name>/ is not provisioned at login: a module that
+# writes user files creates its folder then. details.txt is never stored: it is
+# generated for every accessible module when the user downloads their data.
+def user_folder(user_id):
+    return os.path.join(str(settings.USER_DATA_ROOT), f"user_{user_id}")
+
+
+def folder_name(module_name):
+    return module_name.replace(" ", "_")
+
+
+def module_folder(user_id, module_name):
+    """A user's folder for one module (it may not exist yet)."""
+    return os.path.join(user_folder(user_id), folder_name(module_name))
+
+
+def has_access(profile, module):
+    return module.is_free or profile.is_premium or profile.is_trial_active
+
+
+def details_text(module):
+    return (
+        f"Module: {module.name}\n"
+        f"Description: {module.description or 'N/A'}\n"
+    ).encode("utf-8")
+
+
+def module_files(user_id, module, prefix=""):
+    """(arcname, path or bytes) of a module's files for a ZIP download, details.txt included."""
+    folder = module_folder(user_id, module.name)
+    # A details.txt written by older releases is replaced by the generated one
+    yield f"{prefix}details.txt", details_text(module)
+    if os.path.isdir(folder):
+        for arcname, path in folder_files(folder):
+            if arcname != "details.txt":
+                yield prefix + arcname, path
+
+
+def user_files(user_id, modules):
+    """module_files() of every given module, each under its folder name."""
+    for module in modules:
+        yield from module_files(user_id, module, prefix=f"{folder_name(module.name)}/")
+
+
+# ---------------- DEFERRED CLEANUP ----------------
+def _trash_root():
+    return os.path.join(str(settings.USER_DATA_ROOT), ".trash")
+
+
+def _empty_trash():
+    root = _trash_root()
+    for name in os.listdir(root):
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _cleaner_loop():
+    # One cleaner per process, however many logouts: deletions never race on .trash
+    while True:
+        _trash_pending.wait()
+        _trash_pending.clear()
+        try:
+            _empty_trash()
+        except OSError as e:
+            print("❌ Emptying user data trash failed:", e)
+
+
+def _start_cleaner():
+    global _cleaner
+    with _cleaner_lock:
+        if _cleaner is None:
+            _cleaner = threading.Thread(target=_cleaner_loop, name="user-data-cleanup", daemon=True)
+            _cleaner.start()
+
+
+def clear_user_data(user_id):
+    """
+    Remove a user's folder without making the caller wait: it is renamed into .trash
+    (one cheap syscall) and deleted by the process' background cleaner. Anything a
+    killed process left in .trash goes with the next clear.
+    """
+    folder = os.path.abspath(user_folder(user_id))
+    root = os.path.abspath(str(settings.USER_DATA_ROOT))
+    if not folder.startswith(root + os.sep) or not os.path.isdir(folder):
+        return False
+
+    os.makedirs(_trash_root(), exist_ok=True)
+    try:
+        os.rename(folder, os.path.join(_trash_root(), f"user_{user_id}-{uuid.uuid4().hex}"))
+    except OSError:
+        return False
+    _start_cleaner()
+    _trash_pending.set()
+    return True
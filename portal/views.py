@@ -3,17 +3,19 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
-from django.conf import settings
+from django.db.models import Q
 from .forms import UserRegisterForm, ProfileForm
 from .models import Profile, Module
+from .zipstream import zip_response
+from . import user_data
 
-import os
-import shutil
-import zipfile
-from io import BytesIO
 
-# === Import ML utilities ===
-from .ml.dti_api import pharmalnet_train_api as run_pharmalnet_training_api  # ✅ updated import
+# === ML utilities ===
+# portal.ml.dti_api pulls in torch, DeepPurpose, sklearn and matplotlib, so it is imported
+# on first use of a Pharmal-Net endpoint instead of at worker boot / every manage.py command.
+def ml_api():
+    from .ml import dti_api
+    return dti_api
 
 # ---------------- REGISTER VIEW ----------------
 def register_view(request):
@@ -52,24 +54,7 @@ def login_view(request):
         if user is not None:
             login(request, user)
 
-            profile = Profile.objects.get(user=user)
-            modules = Module.objects.all()
-            user_folder = os.path.join(str(settings.USER_DATA_ROOT), f"user_{user.id}")
-            os.makedirs(user_folder, exist_ok=True)
-
-            for module in modules:
-                if module.is_free or profile.is_premium or profile.is_trial_active:
-                    module_folder = os.path.join(user_folder, module.name.replace(" ", "_"))
-                    os.makedirs(module_folder, exist_ok=True)
-
-                    info_path = os.path.join(module_folder, "details.txt")
-                    if not os.path.exists(info_path):
-                        with open(info_path, "w", encoding="utf-8") as f:
-                            f.write(
-                                f"Module: {module.name}\n"
-                                f"Description: {module.description or 'N/A'}\n"
-                            )
-
+            # ✅ Nothing to provision: module folders appear on first write (user_data.module_folder)
             messages.success(request, f"Welcome back {user.username}! Your workspace is ready.")
             return redirect('home')
 
@@ -80,13 +65,8 @@ def login_view(request):
 # ---------------- LOGOUT VIEW ----------------
 def logout_view(request):
     if request.user.is_authenticated:
-        user_id = request.user.id
-        user_folder = os.path.join(str(settings.USER_DATA_ROOT), f"user_{user_id}")
-
-        root = os.path.abspath(str(settings.USER_DATA_ROOT))
-        candidate = os.path.abspath(user_folder)
-        if candidate.startswith(root) and os.path.exists(candidate):
-            shutil.rmtree(candidate, ignore_errors=True)
+        # Renamed away now, deleted in the background
+        user_data.clear_user_data(request.user.id)
 
     logout(request)
     messages.info(request, "👋 Logged out successfully. Your local data has been cleared.")
@@ -139,51 +119,34 @@ def module_detail(request, name):
 # ---------------- DOWNLOAD USER DATA (ALL MODULES) ----------------
 @login_required
 def download_user_data(request):
-    """Create a ZIP archive of all user data (every module folder)."""
+    """Create a ZIP archive of all user data (every accessible module)."""
     user_id = request.user.id
-    user_folder = os.path.join(str(settings.USER_DATA_ROOT), f"user_{user_id}")
+    profile = Profile.objects.get(user=request.user)
+    modules = [m for m in Module.objects.all().order_by('name') if user_data.has_access(profile, m)]
 
-    if not os.path.exists(user_folder):
+    if not modules:
         return HttpResponse("⚠️ No user data available.", content_type="text/plain")
 
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(user_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, user_folder)
-                zipf.write(file_path, arcname)
-
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="user_{user_id}_modules.zip"'
-    return response
+    # ✅ Streamed: constant memory, first bytes out before the whole folder is compressed
+    return zip_response(user_data.user_files(user_id, modules), f"user_{user_id}_modules.zip")
 
 
 # ---------------- DOWNLOAD MODULE DATA (SINGLE MODULE) ----------------
 @login_required
 def download_module_data(request, name):
     """Create a ZIP archive for one module folder (the one the user opened)."""
-    user_id = request.user.id
-    module_name = name.replace(" ", "_")
-    user_folder = os.path.join(str(settings.USER_DATA_ROOT), f"user_{user_id}")
-    module_folder = os.path.join(user_folder, module_name)
+    module = Module.objects.filter(
+        Q(name__iexact=name) | Q(name__iexact=name.replace("_", " "))
+    ).first()
+    profile = Profile.objects.get(user=request.user)
 
-    if not os.path.exists(module_folder):
+    if module is None or not user_data.has_access(profile, module):
         return HttpResponse("⚠️ No data found for this module.", content_type="text/plain")
 
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(module_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, module_folder)
-                zipf.write(file_path, arcname)
-
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{module_name}_data.zip"'
-    return response
+    return zip_response(
+        user_data.module_files(request.user.id, module),
+        f"{user_data.folder_name(module.name)}_data.zip",
+    )
 
 
 # ---------------- PHARMAL-NET: ML TRAINING API ----------------
@@ -196,11 +159,129 @@ def pharmalnet_train_api_view(request):
     if request.method == "POST":
         try:
             # Call backend logic directly
-            return run_pharmalnet_training_api(request)
+            return ml_api().pharmalnet_train_api(request)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
     return JsonResponse({"error": "Invalid request"}, status=400)
 
+
+# ---------------- PHARMAL-NET: VIRTUAL SCREENING ----------------
+@login_required
+def pharmalnet_screen_api_view(request):
+    """Queue a library × target panel screening job (results via the job endpoints)."""
+    if request.method == "POST":
+        return ml_api().pharmalnet_screen_api(request)
+    return JsonResponse({"error": "Invalid request"}, status=400)
+
+
+@login_required
+def pharmalnet_libraries_view(request, library_id=None):
+    """List / create compound libraries, or append compounds to one."""
+    if request.method not in ("GET", "POST"):
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_libraries_api(request, library_id)
+
+
+# ---------------- PHARMAL-NET: CHUNKED UPLOADS ----------------
+@login_required
+def pharmalnet_uploads_view(request, upload_id=None):
+    """Start a resumable upload / list uploads / one upload's status."""
+    if request.method not in ("GET", "POST"):
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_uploads_api(request, upload_id)
+
+
+@login_required
+def pharmalnet_upload_chunk_view(request, upload_id, index):
+    """Receive one chunk of an upload."""
+    if request.method != "PUT":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_upload_chunk_api(request, upload_id, index)
+
+
+@login_required
+def pharmalnet_upload_complete_view(request, upload_id):
+    """Assemble a fully received upload."""
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_upload_complete_api(request, upload_id)
+
+
+# ---------------- PHARMAL-NET: TRAINING JOB STATUS / RESULT ----------------
+@login_required
+def pharmalnet_job_status_view(request, job_id):
+    """Polled by the training page while a job is queued or running."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_job_status_api(request, job_id)
+
+
+@login_required
+def pharmalnet_job_events_view(request, job_id):
+    """Live progress stream (server-sent events) for a training job."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_job_events_api(request, job_id)
+
+
+@login_required
+def pharmalnet_job_result_view(request, job_id):
+    """Metrics, graph data and model ZIP URL once the job is done."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_job_result_api(request, job_id)
+
+
+@login_required
+def pharmalnet_job_plot_view(request, job_id):
+    """Evaluation plot (PNG) of a finished training job."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_job_plot_api(request, job_id)
+
+
+# ---------------- PHARMAL-NET: MODEL REGISTRY ----------------
+@login_required
+def pharmalnet_models_view(request):
+    """List (GET) or register (POST) the user's trained models."""
+    if request.method not in ("GET", "POST"):
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_models_api(request)
+
+
+@login_required
+def pharmalnet_model_view(request, model_id):
+    """Remove a registered model from the user's list."""
+    if request.method != "DELETE":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_model_api(request, model_id)
+
+
+@login_required
+def pharmalnet_model_download_view(request, model_id):
+    """Download a registered model ZIP."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_model_download_api(request, model_id)
+
+
+# ---------------- PHARMAL-NET: PREDICTION RESULTS ----------------
+@login_required
+def pharmalnet_result_view(request, result_id):
+    """Paged / sorted / filtered rows of a stored prediction result."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_result_api(request, result_id)
+
+
+@login_required
+def pharmalnet_result_download_view(request, result_id):
+    """Full prediction result as CSV."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=400)
+    return ml_api().pharmalnet_result_download_api(request, result_id)
+
+
 # ---------------- PHARMAL-NET PAGES ----------------
 @login_required
 def pharmalnet_train(request):
@@ -243,11 +324,19 @@ def pharmalnet_predict_api_view(request):
     """
     Handles Pharmal-Net prediction using trained ML model and user-provided data.
     """
-    from .ml.dti_api import run_pharmalnet_prediction  # import your ML function
-
     if request.method == "POST":
         try:
-            return run_pharmalnet_prediction(request)
+            return ml_api().run_pharmalnet_prediction(request)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
     return JsonResponse({"error": "Invalid request method"}, status=400)
+
+
+@login_required
+def pharmalnet_pair_predict_api_view(request):
+    """
+    Single SMILES + protein prediction with a registered model (micro-batched).
+    """
+    if request.method == "POST":
+        return ml_api().pharmalnet_pair_prediction_api(request)
+    return JsonResponse({"error": "Invalid request method"}, status=400)
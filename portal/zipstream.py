@@ -0,0 +1,85 @@
+import os
+import time
+import zipfile
+
+from django.http import StreamingHttpResponse
+
+
+# ✅ Already-compressed formats: stored as-is (deflating them costs CPU and saves ~nothing)
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z",
+    ".pt", ".pth", ".npz",
+}
+
+READ_SIZE = 1024 * 1024
+
+
+class _Pipe:
+    """Write-only, non-seekable sink for ZipFile: bytes are collected until the generator takes them."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def folder_files(folder):
+    """(arcname, path) of every file under `folder`, arcnames relative to it."""
+    for root, _, files in os.walk(folder):
+        for file in files:
+            file_path = os.path.join(root, file)
+            yield os.path.relpath(file_path, folder), file_path
+
+
+def iter_zip(files):
+    """
+    ZIP archive of (arcname, path) pairs, generated piece by piece: memory stays at
+    one read block whatever the archive size, and the first bytes go out right away.
+    Sizes / CRCs follow each entry (data descriptors), since the output can't seek back.
+    A bytes value instead of a path adds a generated file (e.g. a details.txt).
+    """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for arcname, path in files:
+            if isinstance(path, bytes):
+                zipf.writestr(zipfile.ZipInfo(arcname, time.localtime()[:6]), path, zipfile.ZIP_DEFLATED)
+                yield pipe.take()
+                continue
+            try:
+                source = open(path, "rb")
+            except OSError:
+                continue   # removed while we were walking
+            # from_file records the size, so entries past 4 GB get ZIP64 headers up front
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            stored = os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with source, zipf.open(info, "w") as entry:
+                while block := source.read(READ_SIZE):
+                    entry.write(block)
+                    if pipe.parts:
+                        yield pipe.take()
+            yield pipe.take()
+    yield pipe.take()   # central directory
+
+
+def zip_response(files, filename):
+    """Streamed ZIP download of (arcname, path or bytes) pairs."""
+    response = StreamingHttpResponse(iter_zip(files), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response